@@ -0,0 +1,19 @@
+""" A package to benchmark the performance of the code base.
+
+Author: Jens Mueller
+Python Version: 3.9.7
+
+MODULES:
+
+    suite.py     - Micro-benchmarks of the hot paths in routing and generation (JSON baselines, regression checks).
+    solver.py    - Solver settings benchmark (gap to the best known Solomon solutions vs. time budget).
+    scaling.py   - Scaling study (time and peak memory vs. instance size per stage, one subprocess per point).
+    startup.py   - Startup guard (import-time benchmarks, heavy dependencies imported by each entry point).
+    __main__.py  - Command line interface (python -m benchmarking --help).
+"""
+
+from .suite import benchmark, run_benchmarks, save_baseline, load_baseline, compare_results, \
+    confirm_regressions
+from .solver import solver_study, summary_table, plot_gap_curves
+from .startup import check_imports
+from .scaling import scaling_study, fit_exponents, scaling_report
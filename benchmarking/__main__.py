@@ -0,0 +1,49 @@
+""" Command line interface of the benchmarks.
+
+Examples:
+    python -m benchmarking --save benchmarking/baselines/baseline.json           # record a baseline
+    python -m benchmarking --compare benchmarking/baselines/baseline.json        # check for regressions (exit code 1)
+    python -m benchmarking distance_matrix locations --sizes 1000 --list         # list selected cases
+    python -m benchmarking startup --check-imports                               # startup times and lazy imports
+"""
+
+import sys
+import argparse
+import benchmarking
+from benchmarking.suite import BENCHMARKS
+
+
+def main(argv=None):
+    """Runs the selected benchmarks, saves and/or compares them with a baseline."""
+    parser = argparse.ArgumentParser(prog='python -m benchmarking', description='Micro-benchmarks of routing and generation.')
+    parser.add_argument('names', nargs='*', help='benchmark names or name prefixes (default: all)')
+    parser.add_argument('--sizes', type=int, nargs='+', help='sizes to run each benchmark with (default: per benchmark)')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timed rounds per case')
+    parser.add_argument('--min-time', type=float, default=0.05, help='minimum seconds per round')
+    parser.add_argument('--save', metavar='FILE', help='save the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare the results with a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative slowdown counted as a regression')
+    parser.add_argument('--reruns', type=int, default=2, help='times a regressed case is measured again before it counts')
+    parser.add_argument('--list', action='store_true', help='only list the selected benchmarks')
+    parser.add_argument('--check-imports', action='store_true', help='fail if an entry point imports heavy dependencies')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (setup, sizes) in BENCHMARKS.items():
+            if not args.names or any(name.startswith(n) for n in args.names):
+                print(f'{name:<50} sizes: {args.sizes or list(sizes)}')
+        return 0
+    violations = benchmarking.check_imports() if args.check_imports else {}
+    results = benchmarking.run_benchmarks(args.names, args.sizes, args.repeat, args.min_time)
+    if args.save:
+        benchmarking.save_baseline(results, args.save)
+    if args.compare:
+        baseline = benchmarking.load_baseline(args.compare)
+        benchmarking.confirm_regressions(results, baseline, args.threshold, args.reruns)
+        regressions = benchmarking.compare_results(results, baseline, args.threshold)
+        return 1 if regressions or violations else 0
+    return 1 if violations else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,298 @@
+""" A module to study how time and peak memory of each pipeline stage scale with the instance size.
+
+Every (stage, size) point runs in its own subprocess, so peak RSS is not inflated by earlier points and a point which
+runs out of memory or time only ends its subprocess. A stage's sweep stops at its first failure (its breaking point).
+Peak RSS covers native allocations (e.g. of OR-Tools) which tracemalloc does not see; tracemalloc isolates the peak of
+the stage itself from the interpreter and its imports. A warm-up call on a tiny input runs first (lazy imports, caches),
+and the timed and traced runs each get a fresh input. Solve points which reach SOLVE_TIME_LIMIT are marked time_limited
+and left out of the time fits (their time is the limit, not the stage's cost).
+
+    python -m benchmarking.scaling --stages distance_matrix extract_features --sizes 100 1000 10000 --path results/
+"""
+
+import routing
+import generation
+import os
+import sys
+import json
+import shutil
+import atexit
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+import numpy as np
+
+
+SIZES = (100, 200, 500, 1000, 2000, 5000, 10000)
+SOLVE_TIME_LIMIT = 10   # seconds of the solve stage (first solution and greedy descent, capped for large instances)
+WARMUP_SIZE = 10        # number of customers of the warm-up call before the measured runs
+POINT_COLUMNS = ['stage', 'size', 'status', 'seconds', 'time_limited', 'rss_growth_mb', 'peak_rss_mb', 'traced_mb',
+                 'substages']
+STAGES = {}  # stage name -> setup(size, rng) returning the function to measure
+
+
+def stage(name):
+    """Registers a stage: the decorated setup(size, rng) prepares the input and returns the function to measure."""
+    def register(setup):
+        STAGES[name] = setup
+        return setup
+    return register
+
+
+def scaling_study(
+    stages=None,        # (list)  - stages to sweep (None: all, see STAGES)
+    sizes=SIZES,        # (list)  - numbers of customers
+    path=None,          # (str)   - directory to save points.csv and report.txt to (None: do not save)
+    timeout=600,        # (float) - seconds after which a point counts as failed
+    max_memory_gb=None, # (float) - address space limit of a point (None: no limit, a point may then be OOM-killed)
+    seed=0,             # (int)   - seed of the generated inputs
+    verbose=1           # (int)   - report each point (0: nothing)
+):  # -> Returns: tuple of (pd.DataFrame with one row per point, pd.DataFrame with the fitted exponents per stage)
+    """Sweeps the instance size for each stage, measuring wall time and peak memory in one subprocess per point."""
+    import pandas as pd # imported at first use (slow import, not needed to import the benchmarks or measure a point)
+    rows = []
+    for name in (stages or STAGES):
+        for size in sorted(sizes):
+            row = run_point(name, size, timeout, max_memory_gb, seed)
+            rows.append(row)
+            if verbose:
+                print(f"{name:<20} {size:>7}: " + (f"{row['seconds']:.4f} s, RSS growth {row['rss_growth_mb']:.1f} MB, "
+                      f"traced {row['traced_mb']:.1f} MB" if row['status'] == 'ok' else row['status']))
+            if row['status'] != 'ok':
+                break # larger sizes of this stage would fail as well
+    points = pd.DataFrame(rows)
+    exponents = fit_exponents(points)
+    if path:
+        os.makedirs(path, exist_ok=True)
+        points.to_csv(path+'points.csv', index=False)
+        with open(path+'report.txt', 'w') as f:
+            f.write(scaling_report(points, exponents))
+    if verbose:
+        print(scaling_report(points, exponents))
+    return points, exponents
+
+
+def fit_exponents(
+    points,         # (pd.DataFrame) - points of a scaling study
+    min_seconds=1e-3 # (float)      - points faster than this are excluded from the time fit (dominated by overhead)
+):  # -> Returns: pd.DataFrame with one row per stage
+    """Fits empirical complexity exponents (slopes of log(time) and log(memory) vs. log(size))."""
+    import pandas as pd
+    rows = []
+    for name, group in points.groupby('stage', sort=False):
+        ok = group[group['status'] == 'ok'].reindex(columns=POINT_COLUMNS) # columns exist even if all points failed
+        limited = ok['time_limited'].fillna(False).astype(bool)
+        timed = ok[(ok['seconds'] >= min_seconds) & ~limited] # time-limited points measure the limit, not the stage
+        row = {'stage': name,
+               'time_exponent': loglog_slope(timed['size'], timed['seconds']),
+               'memory_exponent': loglog_slope(ok['size'], ok['traced_mb']),
+               'rss_exponent': loglog_slope(ok['size'], ok['rss_growth_mb']),
+               'substage_exponents': substage_exponents(ok[~limited], min_seconds),
+               'time_limited_from': ok.loc[limited, 'size'].min() if limited.any() else None,
+               'max_size_ok': ok['size'].max() if len(ok) else None,
+               'failed_at': group.loc[group['status'] != 'ok', 'size'].min() if (group['status'] != 'ok').any() else None,
+               'failure': group.loc[group['status'] != 'ok', 'status'].iloc[0] if (group['status'] != 'ok').any() else None}
+        # Extrapolation from the largest successful point with the fitted exponents
+        if len(ok) and row['failed_at'] is not None:
+            last = ok.iloc[-1]
+            ratio = row['failed_at'] / last['size']
+            if row['time_exponent'] is not None and row['memory_exponent'] is not None:
+                row['extrapolated_seconds'] = last['seconds'] * ratio ** row['time_exponent']
+                row['extrapolated_mb'] = last['traced_mb'] * ratio ** row['memory_exponent']
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def scaling_report(points, exponents):
+    """Returns a text report of a scaling study (points and fitted exponents per stage)."""
+    import pandas as pd
+    lines = ['SCALING STUDY', '=' * 80, '']
+    for _, fit in exponents.iterrows():
+        lines.append(f"{fit['stage']}: time ~ {format_exponent(fit['time_exponent'])}, "
+                     f"memory ~ {format_exponent(fit['memory_exponent'])} (RSS ~ {format_exponent(fit['rss_exponent'])})")
+        if fit.get('time_limited_from') is not None and pd.notna(fit['time_limited_from']):
+            lines.append(f"    reaches the time limit from n={fit['time_limited_from']:.0f} (excluded from the time fit)")
+        if fit['failure'] is not None:
+            lines.append(f"    breaks at n={fit['failed_at']} ({fit['failure']}), largest ok: n={fit['max_size_ok']}")
+            if pd.notna(fit.get('extrapolated_seconds')):
+                lines.append(f"    extrapolated at n={fit['failed_at']}: {fit['extrapolated_seconds']:.1f} s, "
+                             f"{fit['extrapolated_mb']:.0f} MB")
+        for substage, exponent in fit['substage_exponents'].items():
+            lines.append(f"    {substage}: time ~ n^{exponent:.2f}")
+        group = points[points['stage'] == fit['stage']]
+        for _, point in group.iterrows():
+            if point['status'] == 'ok':
+                lines.append(f"    n={point['size']:>6}  {point['seconds']:>10.4f} s  RSS growth {point['rss_growth_mb']:>9.1f} MB"
+                             f"  traced {point['traced_mb']:>9.1f} MB" + ('  (time limit)' if point.get('time_limited') == True else ''))
+        lines.append('')
+    return '\n'.join(lines)
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def run_point(name, size, timeout, max_memory_gb, seed):
+    """Measures one point in a fresh subprocess."""
+    command = [sys.executable, '-m', 'benchmarking.scaling', '--point', name, str(size), '--seed', str(seed)]
+    if max_memory_gb:
+        command += ['--max-memory-gb', str(max_memory_gb)]
+    row = {'stage': name, 'size': size}
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=timeout, cwd=root)
+    except subprocess.TimeoutExpired:
+        return {**row, 'status': f'timeout ({timeout}s)'}
+    lines = [line for line in result.stdout.splitlines() if line.startswith('{')]
+    if result.returncode != 0 or not lines:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f'exit code {result.returncode}'
+        if result.returncode == -9:
+            error = 'killed (out of memory?)'
+        return {**row, 'status': error}
+    return {**row, **json.loads(lines[-1])}
+
+
+def measure_point(name, size, seed, max_memory_gb=None):
+    """Measures one point in this process (wall time, peak RSS, and peak traced allocations)."""
+    if max_memory_gb:
+        limit = int(max_memory_gb * 2**30)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    try:
+        STAGES[name](WARMUP_SIZE, np.random.default_rng(seed))() # lazy imports and caches are not part of the point
+        func = STAGES[name](size, np.random.default_rng(seed))
+        rss_before = peak_rss_mb()
+        routing.metrics.enable()
+        routing.metrics.reset()
+        t = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - t
+        substages = {k: v['total_s'] for k, v in routing.metrics.snapshot()['timers'].items()}
+        routing.metrics.enable(False)
+        rss_growth = peak_rss_mb() - rss_before # growth of the high-water mark caused by the stage
+        time_limited = substages.get('solve.search', 0) >= 0.99 * SOLVE_TIME_LIMIT
+        # Second run with tracemalloc (slower, so not timed) on a fresh input (e.g. an unsolved instance without a
+        # cached distance matrix): peak bytes allocated by the stage itself
+        del func
+        func = STAGES[name](size, np.random.default_rng(seed))
+        tracemalloc.start()
+        func()
+        traced = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    except MemoryError:
+        return {'status': 'MemoryError'}
+    return {'status': 'ok', 'seconds': seconds, 'time_limited': time_limited, 'rss_growth_mb': rss_growth,
+            'peak_rss_mb': rss_before + rss_growth, 'traced_mb': traced, 'substages': json.dumps(substages)}
+
+
+def peak_rss_mb():
+    """Returns the peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def loglog_slope(sizes, values):
+    """Returns the slope of a least-squares line through log(values) vs. log(sizes) (None if too few points)."""
+    sizes, values = np.asarray(sizes, dtype=float), np.asarray(values, dtype=float)
+    keep = values > 0
+    if keep.sum() < 2:
+        return None
+    return float(np.polyfit(np.log(sizes[keep]), np.log(values[keep]), 1)[0])
+
+
+def format_exponent(exponent):
+    """Formats a fitted exponent (n/a if there were too few points to fit it)."""
+    import pandas as pd
+    return 'n/a' if exponent is None or pd.isna(exponent) else f'n^{exponent:.2f}'
+
+
+def substage_exponents(ok, min_seconds):
+    """Fits the time exponents of the sub-stages recorded by routing.metrics (e.g. solve.build, solve.search)."""
+    import pandas as pd
+    substages = pd.DataFrame([json.loads(s) for s in ok['substages']], index=ok['size']) if len(ok) else pd.DataFrame()
+    exponents = {}
+    for substage in substages.columns:
+        times = substages[substage].dropna()
+        times = times[times >= min_seconds]
+        exponent = loglog_slope(times.index, times.values)
+        if exponent is not None:
+            exponents[substage] = exponent
+    return exponents
+
+
+def scaling_instance(size, rng, variant='cvrptw'):
+    """Generates the instance a stage runs on."""
+    return generation.generate_instance(variant, num_customers=size, rng=rng)
+
+
+
+################################ STAGES ###################################
+
+
+
+@stage('generate_instance')
+def stage_generate_instance(size, rng):
+    return lambda: generation.generate_instance('cvrptw', num_customers=size, rng=rng)
+
+
+@stage('distance_matrix')
+def stage_distance_matrix(size, rng):
+    locations = generation.generate_locations(size+1, 'central', 'uniform', 1000, 1000, rng)[0]
+    return lambda: routing.compute_distance_matrix(locations)
+
+
+@stage('extract_features')
+def stage_extract_features(size, rng):
+    instance = scaling_instance(size, rng)
+    return lambda: generation.extract_features_instance(instance)
+
+
+@stage('find_connections')
+def stage_find_connections(size, rng):
+    # Routes of 10 customers each (the connection tensor has one n x n matrix per route)
+    locations = generation.generate_locations(size+1, 'central', 'uniform', 1000, 1000, rng)[0]
+    routes = [[0, *chunk, 0] for chunk in np.array_split(np.arange(1, size+1), max(1, size // 10))]
+    return lambda: routing.find_connections(locations, routes)
+
+
+@stage('solve')
+def stage_solve(size, rng):
+    # One vehicle per customer, so the model grows with n^2 arcs times n vehicles (see solve.build)
+    instance = scaling_instance(size, rng, 'cvrp')
+    return lambda: routing.solve_instance(instance, 'PATH_CHEAPEST_ARC', None, time_limit=SOLVE_TIME_LIMIT, verbose=0)
+
+
+@stage('save_load')
+def stage_save_load(size, rng):
+    instance = scaling_instance(size, rng)
+    path = tempfile.mkdtemp(prefix='scaling_') + '/'
+    atexit.register(shutil.rmtree, path, True) # the point's subprocess removes it when it exits
+    def save_load():
+        routing.save_instance(instance, path, 'instance', 'pickle', index=False)
+        routing.load_instance(path+'instance.pickle')
+    return save_load
+
+
+def main(argv=None):
+    """Command line interface (see the module docstring)."""
+    parser = argparse.ArgumentParser(prog='python -m benchmarking.scaling', description='Time and memory vs. instance size.')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), help='stages to sweep (default: all)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES), help='numbers of customers')
+    parser.add_argument('--path', help='directory to save points.csv and report.txt to')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds after which a point counts as failed')
+    parser.add_argument('--max-memory-gb', type=float, help='address space limit per point')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the generated inputs')
+    parser.add_argument('--point', nargs=2, metavar=('STAGE', 'SIZE'), help=argparse.SUPPRESS) # used by run_point
+    args = parser.parse_args(argv)
+    if args.point:
+        print(json.dumps(measure_point(args.point[0], int(args.point[1]), args.seed, args.max_memory_gb)))
+        return 0
+    scaling_study(args.stages, args.sizes, args.path, args.timeout, args.max_memory_gb, args.seed)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
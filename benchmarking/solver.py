@@ -0,0 +1,160 @@
+""" A module to benchmark solver settings (quality vs. time) on the Solomon instances (resumable, parallel runs)."""
+
+import routing
+import os
+import json
+import time
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+RUNS_LOG = 'runs.jsonl'     # one json row per finished run (appended as runs finish, read to resume)
+
+
+def solver_study(
+    path,                                       # (str)  - directory for the run log, tables, and plots
+    first_solutions=('PATH_CHEAPEST_ARC',),     # (list) - initial solution strategies (see solve.py)
+    local_searches=('GUIDED_LOCAL_SEARCH',),    # (list) - local search strategies (see solve.py, None: greedy descent only)
+    time_limits=(1, 5, 10, 30),                 # (list) - time budgets in seconds
+    num_customers=(25, 50, 100),                # (list) - customer counts of the Solomon instances
+    names=None,                                 # (list) - Solomon instances to run (None: all, e.g. ['c101', 'r201'])
+    workers=4,                                  # (int)  - number of solver processes
+    source=routing.BENCHMARK_ZIP,               # (str)  - zip archive or directory containing benchmarks/
+    verbose=1                                   # (int)  - report progress (0: nothing)
+):  # -> Returns: pd.DataFrame of all runs (including those of previous calls), also saves summary tables and plots
+    """Solves the Solomon instances with a grid of solver settings and compares the distances to the best known."""
+    os.makedirs(path, exist_ok=True)
+    names = names or routing.benchmark_names('solomon', source)
+    grid = [{'name': name, 'num_customers': num, 'first_solution': fs, 'local_search': ls, 'time_limit': tl}
+            for name, num, fs, ls, tl in itertools.product(names, num_customers, first_solutions, local_searches, time_limits)]
+    # Resume: runs which are in the log already are not repeated
+    done = {run_key(run) for run in read_runs(path).to_dict('records')}
+    todo = [run for run in grid if run_key(run) not in done]
+    # Longest runs first, so the pool is not left waiting for a few long runs at the end
+    todo.sort(key=lambda run: (-run['time_limit'], -run['num_customers']))
+    if verbose:
+        print(f'{len(grid)} runs in the grid, {len(grid)-len(todo)} done, {len(todo)} to run.')
+    t0 = time.time()
+    if workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(solve_run, run, source) for run in todo]
+            for i, future in enumerate(as_completed(futures)):
+                try:
+                    log_run(path, future.result(), i, len(todo), t0, verbose)
+                except Exception as e: # a failed run is not logged, so it is repeated when resuming
+                    print(f'[{i+1}/{len(todo)}] failed: {e!r}')
+    else:
+        for i, run in enumerate(todo):
+            try:
+                log_run(path, solve_run(run, source), i, len(todo), t0, verbose)
+            except Exception as e: # as in parallel: the other runs go on, a failed run is repeated when resuming
+                print(f'[{i+1}/{len(todo)}] failed: {e!r}')
+    runs = add_gaps(read_runs(path), source)
+    summary = summary_table(runs)
+    summary.to_csv(path+'summary.csv', index=False)
+    plot_gap_curves(runs, path+'gap_vs_time.png')
+    return runs
+
+
+def summary_table(runs):
+    """Summarizes the gaps to the best known solutions per solver setting and instance size."""
+    keys = ['first_solution', 'local_search', 'time_limit', 'num_customers']
+    runs = runs.assign(local_search=runs['local_search'].fillna('None'))
+    summary = runs.groupby(keys).agg(
+        runs=('gap', 'size'),
+        solved=('gap', 'count'),
+        gap_mean=('gap', 'mean'),
+        gap_median=('gap', 'median'),
+        gap_max=('gap', 'max'),
+        within_1pct=('gap', lambda gap: (gap <= 0.01).mean()),
+        seconds_mean=('seconds', 'mean'),
+    ).reset_index()
+    return summary
+
+
+def plot_gap_curves(
+    runs,           # (pd.DataFrame) - runs with gaps (see solver_study)
+    filename=None   # (str)          - file to save the plot to (None: show it)
+):  # -> Returns: matplotlib figure
+    """Plots the mean gap to the best known solutions against the time budget (one line per solver setting)."""
+    if filename:
+        from matplotlib.figure import Figure # imported at first use (slow import, headless: no pyplot)
+    else:
+        import matplotlib.pyplot as plt
+    runs = runs.assign(local_search=runs['local_search'].fillna('None'))
+    sizes = sorted(runs['num_customers'].unique())
+    fig = Figure(figsize=(4*len(sizes), 3.5)) if filename else plt.figure(figsize=(4*len(sizes), 3.5))
+    axs = fig.subplots(1, len(sizes), squeeze=False)[0]
+    for ax, num in zip(axs, sizes):
+        for (fs, ls), group in runs[runs['num_customers'] == num].groupby(['first_solution', 'local_search']):
+            curve = group.groupby('time_limit')['gap'].mean()
+            ax.plot(curve.index, 100*curve.values, marker='o', label=f'{fs} + {ls}')
+        ax.set_title(f'{num} customers', fontsize=12)
+        ax.set(xlabel='Time budget (s)', ylabel='Mean gap to best known (%)')
+        ax.set_xscale('log')
+    axs[0].legend(fontsize=7)
+    fig.tight_layout()
+    if filename:
+        fig.savefig(filename, dpi=120)
+    else:
+        plt.show()
+    return fig
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def run_key(run):
+    """Identifies a run of the grid."""
+    import pandas as pd # imported at first use (slow import, not needed to import the benchmarks)
+    return (run['name'], int(run['num_customers']), run['first_solution'],
+            None if pd.isna(run['local_search']) else run['local_search'], int(run['time_limit']))
+
+
+def solve_run(run, source):
+    """Solves one Solomon instance with one solver setting (runs in the solver processes)."""
+    instance = routing.benchmark_instance(run['name'], run['num_customers'], source)
+    t = time.perf_counter()
+    routing.solve_instance(instance, run['first_solution'], run['local_search'], time_limit=run['time_limit'], verbose=0)
+    seconds = time.perf_counter() - t
+    distance = getattr(instance, 'solution_distance', None)
+    vehicles = sum(1 for route in instance.solution_routes if len(route) > 2) if distance is not None else None
+    # Without a metaheuristic the search stops at a local optimum (deterministic);
+    # with one it runs until the time budget, so the result depends on the machine speed.
+    return {**run, 'instance': instance.name, 'distance': distance, 'vehicles': vehicles, 'seconds': seconds,
+            'deterministic': run['local_search'] in (None, 'None')}
+
+
+def log_run(path, result, i, total, t0, verbose):
+    """Appends a finished run to the run log (a single writer, so the log is always consistent)."""
+    with open(path+RUNS_LOG, 'a') as f:
+        f.write(json.dumps(result) + '\n')
+    if verbose:
+        print(f"[{i+1}/{total}] {result['instance']} {result['first_solution']} {result['local_search']} "
+              f"{result['time_limit']}s: {result['distance']}, time: {time.time()-t0:.1f}")
+    return None
+
+
+def read_runs(path):
+    """Reads the run log of a study (the last row of a run counts if it was logged more than once)."""
+    import pandas as pd
+    if not os.path.exists(path+RUNS_LOG):
+        return pd.DataFrame(columns=['name', 'num_customers', 'first_solution', 'local_search', 'time_limit'])
+    with open(path+RUNS_LOG, 'r') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    runs = pd.DataFrame(rows)
+    runs['key'] = [run_key(run) for run in rows]
+    return runs.drop_duplicates('key', keep='last').drop(columns='key').reset_index(drop=True)
+
+
+def add_gaps(runs, source):
+    """Adds the best known distances and the relative gaps to them."""
+    import pandas as pd
+    best = routing.solomon_solutions('best_known', source)[['name', 'sol_best_distance']]
+    best = best.rename(columns={'name': 'instance', 'sol_best_distance': 'best_known'})
+    best['best_known'] = pd.to_numeric(best['best_known'], errors='coerce')
+    runs = runs.drop(columns=['best_known', 'gap'], errors='ignore').merge(best, on='instance', how='left')
+    runs['gap'] = pd.to_numeric(runs['distance'], errors='coerce') / runs['best_known'] - 1
+    return runs
@@ -0,0 +1,75 @@
+""" A module to guard the startup time of the packages (import times and which heavy dependencies get imported).
+
+Heavy dependencies (ortools, pandas, matplotlib, scipy, sklearn) are imported at first use, so short-lived workers
+and command line calls only pay for what they use. The import benchmarks (startup.*) run with the suite, and
+check_imports reports entry points which import a dependency they do not need.
+"""
+
+import os
+import sys
+import json
+import subprocess
+from .suite import benchmark
+
+
+HEAVY_MODULES = ['ortools', 'pandas', 'matplotlib', 'seaborn', 'scipy', 'sklearn', 'tensorflow', 'xgboost']
+IMPORT_CHECKS = {   # entry point -> (code run in a fresh interpreter, modules it must not import)
+    'import routing': ('import routing', HEAVY_MODULES),
+    'import generation': ('import generation', HEAVY_MODULES),
+    'import models': ('import models', HEAVY_MODULES),
+    'import benchmarking': ('import benchmarking', HEAVY_MODULES),
+    'generate_locations': ("import generation; generation.generate_locations(100, 'central', 'uniform', 100, 100)",
+                           HEAVY_MODULES),
+    'generate_instance': ("import generation; generation.generate_instance('cvrptw', num_customers=100)",
+                          HEAVY_MODULES),
+    'save_instance and load_instance': (
+        "import routing, generation, tempfile; path = tempfile.mkdtemp() + '/'; "
+        "routing.save_instance(generation.generate_instance('cvrptw', num_customers=100), path, 'a', 'pickle'); "
+        "routing.load_instance(path+'a.pickle')", HEAVY_MODULES),
+    'extract_features_instance': ("import generation; "
+                                  "generation.extract_features_instance(generation.generate_instance('cvrptw'))",
+                                  ['ortools', 'pandas', 'matplotlib', 'seaborn', 'sklearn']),
+}
+
+
+def check_imports(
+    checks=None,    # (list) - entry points to check (None: all, see IMPORT_CHECKS)
+    verbose=1       # (int)  - print the result of each check (0: nothing)
+):  # -> Returns: dict mapping each entry point which failed its check to the heavy modules it imported
+    """Runs each entry point in a fresh interpreter and reports the heavy dependencies it imported unnecessarily."""
+    violations = {}
+    for name in (checks or IMPORT_CHECKS):
+        code, forbidden = IMPORT_CHECKS[name]
+        imported = run_python(code + '; import sys, json; '
+                              f'print(json.dumps([m for m in {forbidden!r} if m in sys.modules]))')
+        if imported:
+            violations[name] = imported
+        if verbose:
+            print(f"{name:<36} {'imports ' + ', '.join(imported) if imported else 'ok'}")
+    return violations
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def run_python(code):
+    """Runs code in a fresh interpreter (from the repository root) and returns its last line of output as json."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=root, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+
+################################ BENCHMARKS ###################################
+
+
+
+for package in ['routing', 'generation', 'models']:
+    @benchmark(f'startup.import_{package}', sizes=(1,))
+    def bench_import(size, rng, package=package):
+        # Fresh interpreter per call (the size is not used)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return lambda: subprocess.run([sys.executable, '-c', f'import {package}'], cwd=root, check=True,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
@@ -0,0 +1,271 @@
+""" A module with micro-benchmarks of the hot paths in routing and generation (JSON baselines, regression checks)."""
+
+import routing
+import generation
+import os
+import json
+import time
+import shutil
+import platform
+import tempfile
+import statistics
+import numpy as np
+from generation.locations import LOC_DISTRS
+from generation.demands import DEM_DISTRS
+from generation.service_times import ST_DISTRS
+from generation.time_windows import TW_CENTER_DISTRS, TW_WIDTH_DISTRS
+
+
+BENCHMARKS = {}   # benchmark name -> (setup function, default sizes)
+SEED = 0          # fixed seed of all benchmark inputs
+TEMP_DIRS = []    # directories created by benchmark setups (removed after each run)
+
+
+def benchmark(name, sizes):
+    """Registers a benchmark: the decorated setup(size, rng) returns the function to time (called without arguments)."""
+    def register(setup):
+        BENCHMARKS[name] = (setup, tuple(sizes))
+        return setup
+    return register
+
+
+def run_benchmarks(
+    names=None,         # (list)  - benchmark names or name prefixes to run (None: all)
+    sizes=None,         # (list)  - sizes to run each benchmark with (None: the defaults of each benchmark)
+    repeat=5,           # (int)   - number of timed rounds per case
+    min_time=0.05,      # (float) - minimum seconds per round (the number of calls per round is calibrated to it)
+    verbose=1           # (int)   - print each result (0: nothing)
+):  # -> Returns: dict mapping each case (name[size]) to its timing statistics
+    """Runs the benchmarks and returns seconds per call (median, min, and spread over the rounds)."""
+    results = {}
+    for name, (setup, default_sizes) in BENCHMARKS.items():
+        if names and not any(name.startswith(n) for n in names):
+            continue
+        for size in (sizes or default_sizes):
+            case = f'{name}[{size}]'
+            results[case] = time_case(name, size, repeat, min_time)
+            if verbose:
+                print(f'{case:<50} {format_time(results[case]["median"]):>10}  (min {format_time(results[case]["min"])})')
+    return results
+
+
+def confirm_regressions(
+    results,        # (dict)  - benchmark results (see run_benchmarks), updated in place
+    baseline,       # (dict)  - baseline (see load_baseline) or baseline results
+    threshold=0.2,  # (float) - relative slowdown of the median which counts as a regression
+    reruns=2        # (int)   - number of times a regressed case is measured again
+):  # -> Returns: list of the cases which still regressed
+    """Measures regressed cases again and keeps their fastest measurement (filters out transient machine load)."""
+    regressions = compare_results(results, baseline, threshold, verbose=0)
+    for _ in range(reruns):
+        for case in regressions:
+            name, size = case[:-1].rsplit('[', 1)
+            rerun = time_case(name, int(size), results[case]['repeat'], results[case].get('min_time', 0.05))
+            if rerun['median'] < results[case]['median']:
+                results[case] = rerun
+        regressions = compare_results(results, baseline, threshold, verbose=0)
+    return regressions
+
+
+def save_baseline(results, filename):
+    """Saves benchmark results as a JSON baseline (with the machine and library versions they were measured on)."""
+    baseline = {'machine': machine_info(), 'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'results': results}
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    with open(filename+'.tmp', 'w') as f:
+        json.dump(baseline, f, indent=4)
+    os.replace(filename+'.tmp', filename)
+    return None
+
+
+def load_baseline(filename):
+    """Loads a JSON baseline (see save_baseline)."""
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def compare_results(
+    results,        # (dict)  - benchmark results (see run_benchmarks)
+    baseline,       # (dict)  - baseline (see load_baseline) or baseline results
+    threshold=0.2,  # (float) - relative slowdown of the median which counts as a regression
+    verbose=1       # (int)   - print the comparison (0: nothing)
+):  # -> Returns: list of the regressed cases
+    """Compares benchmark results with a baseline and reports the cases which became slower than the threshold."""
+    baseline_results = baseline.get('results', baseline)
+    if verbose and 'machine' in baseline and baseline['machine'] != machine_info():
+        print('Warning: the baseline was measured on a different machine or with different library versions.')
+    regressions = []
+    for case, result in results.items():
+        if case not in baseline_results:
+            continue
+        before, after = baseline_results[case]['median'], result['median']
+        change = after / before - 1 if before > 0 else 0.0
+        # Cases whose noise exceeds the threshold only count when even the fastest round regressed.
+        regressed = change > threshold and result['min'] > baseline_results[case]['min'] * (1 + threshold)
+        if regressed:
+            regressions.append(case)
+        if verbose:
+            flag = 'REGRESSION' if regressed else ('faster' if change < -threshold else '')
+            print(f'{case:<50} {format_time(before):>10} -> {format_time(after):>10}  {100*change:+7.1f}%  {flag}')
+    if verbose:
+        print(f'{len(regressions)} regression(s) above {100*threshold:.0f}% in {len(results)} case(s).')
+    return regressions
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def time_case(name, size, repeat, min_time):
+    """Times a single benchmark case (seconds per call of each round)."""
+    setup = BENCHMARKS[name][0]
+    try:
+        func = setup(size, np.random.default_rng(SEED))
+        loops = calibrate(func, min_time)
+        rounds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(loops):
+                func()
+            rounds.append((time.perf_counter() - start) / loops)
+    finally:
+        while TEMP_DIRS:
+            shutil.rmtree(TEMP_DIRS.pop(), ignore_errors=True)
+    return {'median': statistics.median(rounds), 'min': min(rounds),
+            'stdev': statistics.stdev(rounds) if len(rounds) > 1 else 0.0,
+            'loops': loops, 'repeat': repeat, 'min_time': min_time}
+
+
+def calibrate(func, min_time):
+    """Returns the number of calls per round such that a round takes at least min_time seconds."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return loops
+        loops = max(loops * 2, int(loops * min_time / max(elapsed, 1e-9) * 1.2))
+
+
+def format_time(seconds):
+    """Formats seconds with a readable unit."""
+    for unit, scale in [('s', 1), ('ms', 1e-3), ('us', 1e-6)]:
+        if seconds >= scale:
+            return f'{seconds/scale:.3f} {unit}'
+    return f'{seconds/1e-9:.1f} ns'
+
+
+def machine_info():
+    """Returns the machine and library versions results depend on."""
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+            'processor': platform.processor(), 'system': platform.system()}
+
+
+def temp_dir():
+    """Creates a temporary directory for a benchmark (removed after the benchmark ran)."""
+    TEMP_DIRS.append(tempfile.mkdtemp(prefix='benchmark_') + '/')
+    return TEMP_DIRS[-1]
+
+
+def benchmark_instance(size, rng, variant='cvrptw'):
+    """Generates the (fixed) instance a benchmark runs on."""
+    return generation.generate_instance(variant, num_customers=size, rng=rng)
+
+
+
+################################ BENCHMARKS ###################################
+
+
+
+@benchmark('distance_matrix.euclidean', sizes=(100, 1000))
+def bench_distance_matrix_euclidean(size, rng):
+    instance = benchmark_instance(size, rng, 'tsp')
+    return lambda: instance.compute_distance_matrix('euclidean')
+
+
+@benchmark('distance_matrix.manhattan', sizes=(100, 1000))
+def bench_distance_matrix_manhattan(size, rng):
+    instance = benchmark_instance(size, rng, 'tsp')
+    return lambda: instance.compute_distance_matrix('manhattan')
+
+
+for loc_distr in sorted(set(LOC_DISTRS)):
+    @benchmark(f'locations.{loc_distr}', sizes=(100, 1000))
+    def bench_locations(size, rng, loc_distr=loc_distr):
+        return lambda: generation.generate_locations(size+1, 'central', loc_distr, 100, 100, rng)
+
+
+for dem_distr in sorted(set(DEM_DISTRS)):
+    @benchmark(f'demands.{dem_distr}', sizes=(100, 1000))
+    def bench_demands(size, rng, dem_distr=dem_distr):
+        locations = generation.generate_locations(size+1, 'central', 'uniform', 100, 100, rng)[0]
+        return lambda: generation.generate_demands(size, dem_distr, locations, 100, 100, rng)
+
+
+for st_distr in sorted(set(ST_DISTRS)):
+    @benchmark(f'service_times.{st_distr}', sizes=(100, 1000))
+    def bench_service_times(size, rng, st_distr=st_distr):
+        demands = generation.generate_demands(size, 'lowval_highcv', None, 100, 100, rng)[0]
+        return lambda: generation.generate_service_times(size, st_distr, 1000, demands, rng)
+
+
+def bench_time_windows(size, rng, tw_center_distr, tw_width_distr):
+    instance = benchmark_instance(size, rng)
+    depot_dist = instance.distance_matrix[0][1:]
+    tw_width_depot = instance.time_windows[0][1]
+    return lambda: generation.generate_time_windows(size, tw_center_distr, tw_width_distr, tw_width_depot, 0.8,
+                                                    depot_dist, instance.service_times[1:], rng)
+
+
+for tw_center_distr in sorted(set(TW_CENTER_DISTRS)):
+    benchmark(f'time_windows.center.{tw_center_distr}', sizes=(100, 1000))(
+        lambda size, rng, c=tw_center_distr: bench_time_windows(size, rng, c, 'uniform'))
+
+
+for tw_width_distr in sorted(set(TW_WIDTH_DISTRS)):
+    benchmark(f'time_windows.width.{tw_width_distr}', sizes=(100, 1000))(
+        lambda size, rng, w=tw_width_distr: bench_time_windows(size, rng, 'uniform', w))
+
+
+for variant in ['tsp', 'cvrp', 'cvrptw']:
+    @benchmark(f'generate_instance.{variant}', sizes=(50, 500))
+    def bench_generate_instance(size, rng, variant=variant):
+        return lambda: generation.generate_instance(variant, num_customers=size, rng=rng)
+
+
+@benchmark('extract_features_instance', sizes=(50, 500))
+def bench_extract_features(size, rng):
+    instance = benchmark_instance(size, rng)
+    return lambda: generation.extract_features_instance(instance)
+
+
+@benchmark('MinimumBoundingBox', sizes=(100, 1000))
+def bench_minimum_bounding_box(size, rng):
+    locations = generation.generate_locations(size+1, 'central', 'uniform', 100, 100, rng)[0]
+    return lambda: generation.MinimumBoundingBox(locations)
+
+
+for variant in ['tsp', 'cvrp', 'cvrptw']:
+    @benchmark(f'solve_instance.{variant}', sizes=(25, 50))
+    def bench_solve_instance(size, rng, variant=variant):
+        # First solution and local search without metaheuristic: deterministic, stops at a local optimum
+        # (the time limit only caps pathological runs).
+        instance = benchmark_instance(size, rng, variant)
+        return lambda: routing.solve_instance(instance, 'PATH_CHEAPEST_ARC', None, time_limit=10, verbose=0)
+
+
+for filetype in ['pickle', 'json', 'txt', 'bin']:
+    @benchmark(f'save_instance.{filetype}', sizes=(100, 1000))
+    def bench_save_instance(size, rng, filetype=filetype):
+        instance = benchmark_instance(size, rng)
+        path = temp_dir()
+        return lambda: routing.save_instance(instance, path, 'instance', filetype, index=False)
+
+    @benchmark(f'load_instance.{filetype}', sizes=(100, 1000))
+    def bench_load_instance(size, rng, filetype=filetype):
+        instance = benchmark_instance(size, rng)
+        path = temp_dir()
+        routing.save_instance(instance, path, 'instance', filetype, index=False)
+        return lambda: routing.load_instance(path+'instance.'+filetype)
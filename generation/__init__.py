@@ -6,7 +6,10 @@ Python Version: 3.9.7
 MODULES:
 
     generate_instance.py - Generate a single routing instance (variants include TSP, CVRP, and CVRPTW).
+    generate_instances.py - Generate a batch of routing instances at once (vectorized).
     generate_dataset.py  - Generate a full dataset of routing instances.
+    pipeline.py          - Generate, solve, featurize, and save a dataset as a streaming pipeline.
+    adaptive.py          - Generate a dataset adaptively (more instances where an estimator errs most).
     area.py              - Generate a service area of varying size and shape.
     locations.py         - Generate a set of locations following one of several possible distributions.
     demands.py           - Generate a set of demands following one of several possible distributions.
@@ -17,11 +20,14 @@ MODULES:
 """
 
 from .generate_instance import generate_instance
-from .generate_dataset import generate_dataset
+from .generate_instances import generate_instances
+from .generate_dataset import generate_dataset, regenerate_instance
 from .area import generate_area
 from .locations import generate_locations
 from .demands import generate_demands
 from .time_windows import generate_time_windows
 from .service_times import generate_service_times
 from .features import *
+from .pipeline import generate_dataset_pipeline, pipelineStats
+from .adaptive import generate_dataset_adaptive, stratifiedSampler
 from .third_party.MinimumBoundingBox import MinimumBoundingBox 
\ No newline at end of file
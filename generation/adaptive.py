@@ -0,0 +1,200 @@
+""" A module for generating a dataset adaptively (more instances from strata where the estimator errs most)."""
+
+import generation
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .generate_dataset import solve_dataset_instance
+from .locations import LOC_DISTRS
+from .demands import DEM_DISTRS
+from .time_windows import TW_CENTER_DISTRS, TW_WIDTH_DISTRS
+
+
+# Generation parameters the sampler can steer: categorical options (duplicates increase the prior probability)
+# or bin edges for numeric parameters (sampled uniformly within a bin, see generate_instance.py).
+STRATA = {
+    'loc_distr': LOC_DISTRS,
+    'dem_distr': DEM_DISTRS,
+    'cap_ratio': [0.02, 0.1, 0.2, 0.4, 0.6, 0.8],
+    'tw_center_distr': TW_CENTER_DISTRS,
+    'tw_width_distr': TW_WIDTH_DISTRS,
+}
+STRATA_VARIANTS = {
+    'num_customers': ['tsp', 'cvrp', 'cvrptw'], 'loc_distr': ['tsp', 'cvrp', 'cvrptw'], 'depot_pos': ['tsp', 'cvrp', 'cvrptw'],
+    'dem_distr': ['cvrp', 'cvrptw'], 'cap_ratio': ['cvrp', 'cvrptw'],
+    'st_distr': ['cvrptw'], 'tw_center_distr': ['cvrptw'], 'tw_width_distr': ['cvrptw'], 'tw_share': ['cvrptw'],
+}
+
+
+class stratifiedSampler:
+    """A class to track estimator errors per generation parameter stratum and sample parameters accordingly."""
+
+    def __init__(
+        self,
+        strata=None,      # (dict)  - parameters to steer (default: STRATA), options or bin edges as values
+        variant='cvrptw', # (str)   - routing variant (parameters not used by the variant are ignored)
+        explore=0.2,      # (float) - share of the sampling probability that follows the original distribution
+        power=1.0         # (float) - how strongly to favour high-error strata (0: original distribution)
+    ):
+        """Initializes the sampler with the original (prior) distribution of each parameter."""
+        import pandas as pd # imported at first use (slow import, not needed to generate instances)
+        strata = STRATA if strata is None else strata
+        self.strata = {k: v for k, v in strata.items() if variant in STRATA_VARIANTS.get(k, [variant])}
+        self.explore = explore
+        self.power = power
+        self.prior = {}
+        for param, options in self.strata.items():
+            if is_numeric(options):
+                edges = np.asarray(options, dtype=float)
+                self.prior[param] = pd.Series(np.diff(edges) / (edges[-1] - edges[0]), index=bin_labels(edges))
+            else:
+                self.prior[param] = pd.Series(options).value_counts(normalize=True, sort=False)
+        self.error_sum = {param: pd.Series(0.0, index=prior.index) for param, prior in self.prior.items()}
+        self.count = {param: pd.Series(0, index=prior.index) for param, prior in self.prior.items()}
+
+    def stratum(self, param, value):
+        """Returns the stratum (option or bin label) of a parameter value."""
+        options = self.strata[param]
+        if is_numeric(options):
+            edges = np.asarray(options, dtype=float)
+            i = int(np.clip(np.searchsorted(edges, value, side='right') - 1, 0, len(edges) - 2))
+            return bin_labels(edges)[i]
+        return value
+
+    def update(
+        self,
+        gen_params, # (pd.DataFrame/list) - generation parameters of the solved instances
+        y_true,     # (np.array) - solution distances
+        y_pred      # (np.array) - estimated distances
+    ):  # -> Returns None, but updates the error statistics
+        """Adds absolute percentage errors of the estimator to the strata of the given instances."""
+        import pandas as pd
+        gen_params = pd.DataFrame(gen_params).reset_index(drop=True)
+        ape = np.abs(np.asarray(y_true, dtype=float) - np.asarray(y_pred, dtype=float)) / np.abs(np.asarray(y_true, dtype=float))
+        for param in self.strata:
+            if param not in gen_params:
+                continue
+            strata = gen_params[param].map(lambda value: self.stratum(param, value))
+            grouped = pd.Series(ape).groupby(strata.values)
+            index = self.prior[param].index
+            self.error_sum[param] += grouped.sum().reindex(index, fill_value=0.0)
+            self.count[param] += grouped.count().reindex(index, fill_value=0)
+
+    def mape(self, param):
+        """Returns the mean absolute percentage error per stratum (unobserved strata: highest observed error)."""
+        mape = self.error_sum[param] / self.count[param].replace(0, np.nan)
+        return mape.fillna(mape.max() if mape.notna().any() else 1.0)
+
+    def probabilities(self, param):
+        """Returns the sampling probability per stratum (prior reweighted by the estimator error)."""
+        prior = self.prior[param]
+        weighted = prior * self.mape(param).reindex(prior.index) ** self.power
+        weighted = weighted / weighted.sum() if weighted.sum() > 0 else prior
+        return ((1 - self.explore) * weighted + self.explore * prior).reindex(prior.index)
+
+    def expected_error(self):
+        """Returns the estimated MAPE under the original distribution (prior-weighted over the strata)."""
+        observed = [param for param in self.strata if self.count[param].sum() > 0]
+        if not observed:
+            return None
+        return float(np.mean([(self.prior[param] * self.mape(param)).sum() for param in observed]))
+
+    def errors(self):
+        """Returns the error statistics and sampling probabilities of all strata."""
+        import pandas as pd
+        return pd.concat([pd.DataFrame({
+            'param': param, 'stratum': self.prior[param].index, 'count': self.count[param].values,
+            'mape': (self.error_sum[param] / self.count[param].replace(0, np.nan)).values,
+            'prior': self.prior[param].values, 'probability': self.probabilities(param).values})
+            for param in self.strata], ignore_index=True)
+
+    def sample(self, rng):
+        """Samples fixed generation parameters (for generate_instance) from the error-weighted strata."""
+        params = {}
+        for param, options in self.strata.items():
+            probs = self.probabilities(param)
+            stratum = probs.index[rng.choice(len(probs), p=probs.values)]
+            if is_numeric(options):
+                edges = np.asarray(options, dtype=float)
+                i = list(bin_labels(edges)).index(stratum)
+                value = rng.uniform(edges[i], edges[i+1])
+                params[param] = int(value) if param == 'num_customers' else round(value, 4)
+            else:
+                params[param] = str(stratum)
+        return params
+
+
+
+def generate_dataset_adaptive(
+    path,                # (str)      - path to save generated instances to
+    num_instances,       # (int)      - maximum number of instances to be generated (and solved)
+    estimator,           # (callable) - maps a features DataFrame (see features.py) to distance estimates
+    batch_size=100,      # (int)      - number of instances generated between sampler updates
+    start_count=1,       # (int)      - number to start naming instances with
+    variant='cvrptw',    # (str)      - routing variant (tsp, vcrp, or cvrptw)
+    verbose=True,        # (bool)     - print progress to console
+    seed=None,           # (int)      - root seed of the dataset (see generate_dataset.py)
+    workers=1,           # (int)      - number of solver processes
+    target_mape=None,    # (float)    - stop once the expected estimator MAPE is below this value
+    sampler=None         # (object)   - stratifiedSampler (e.g. initialised with errors on an existing dataset)
+):  # -> Returns: stratifiedSampler with the error statistics per stratum
+    """Generates a dataset whose instances are drawn preferably from strata with high estimator errors."""
+    import pandas as pd
+
+    # The steered parameters are stored in gen_params, so instances stay reproducible:
+    # regenerate_instance(seed, index, variant, **{param: gen_params[param] for param in sampler.strata})
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    if sampler is None:
+        sampler = stratifiedSampler(variant=variant)
+    sampler_rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(start_count, 1))) # not an instance stream
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    try:
+        generated = 0
+        while generated < num_instances:
+            # Generate a batch from the current strata probabilities
+            indices = range(start_count + generated, start_count + min(generated + batch_size, num_instances))
+            instances = [generation.regenerate_instance(seed, index, variant, **sampler.sample(sampler_rng))
+                         for index in indices]
+            generated += len(instances)
+            # Solve the batch
+            if executor is not None:
+                instances = list(executor.map(solve_dataset_instance, instances))
+            else:
+                instances = [solve_dataset_instance(instance) for instance in instances]
+            # Update the strata errors with the estimator errors on the solved instances
+            solved = [instance for instance in instances if instance.gen_params['has_solution']]
+            if solved:
+                features = pd.DataFrame([generation.extract_features_instance(instance) for instance in solved])
+                y_true = np.array([instance.solution_distance for instance in solved])
+                sampler.update([instance.gen_params for instance in solved], y_true, estimator(features))
+            # Save the batch
+            for instance in instances:
+                instance.save(path, instance.name, filetype='pickle', reduce_size=True)
+                instance.save(path, instance.name, filetype='txt', reduce_size=True)
+            # print progress
+            expected_error = sampler.expected_error()
+            if verbose:
+                print(f"Saved: {instances[-1].name} (expected MAPE: {expected_error})")
+            if target_mape is not None and expected_error is not None and expected_error <= target_mape:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return sampler
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def is_numeric(options):
+    """Checks if the strata of a parameter are bin edges (numeric) or categorical options."""
+    return all(isinstance(option, (int, float)) for option in options)
+
+
+def bin_labels(edges):
+    """Returns the stratum labels of numeric bins."""
+    return [f'[{edges[i]:g}, {edges[i+1]:g})' for i in range(len(edges) - 1)]
@@ -2,50 +2,42 @@
 
 import routing
 import generation
-import os
 import time
 import numpy as np
-import pandas as pd
-from scipy.spatial import ConvexHull
-from scipy.stats import pearsonr, spearmanr
-from scipy.spatial import distance
 
 
 def extract_features_dataset(
     path,                 # (str) - path from where to load
-    filetype='pickle',    # (str) - which filetype to load (pickle, json, or txt)
+    filetype='pickle',    # (str) - which filetype to load (pickle, json, txt, or shard)
     num_instances='all',  # (str/int) - 'all': load all instances in path, int: how many instances to load
     verbose=10            # (int) - after how many instances report progress?
 ):  # -> Returns: pd.DataFrame
     """Loads a dataset of instances as pandas DataFrame."""
+    import pandas as pd # imported at first use (slow import, not needed to generate instances)
     t0 = time.time()
-    filelist = os.listdir(path)
-    if num_instances != 'all':
-        filelist = filelist[:num_instances]
     rows = []
     loaded = 0
-    # Loop through files
-    for filename in filelist:
-        if filename.endswith('.'+filetype):
-            instance = routing.load_instance(path+filename)
-            instance.compute_distance_matrix()
-            features = extract_features_instance(instance)
-            if hasattr(instance, 'solution_distance'):
-                features['distance'] = instance.solution_distance
-            rows.append(features)
-            loaded += 1
-            # Print loading progress
-            if verbose:
-                if loaded % verbose == 0:
-                    print(f'{loaded} instances loaded ({round(time.time()-t0, 2)}s)')
+    # Loop through instances
+    for instance in routing.iter_dataset(path, filetype, num_instances):
+        features = extract_features_instance(instance)
+        if hasattr(instance, 'solution_distance'):
+            features['distance'] = instance.solution_distance
+        rows.append(features)
+        loaded += 1
+        # Print loading progress
+        if verbose:
+            if loaded % verbose == 0:
+                print(f'{loaded} instances loaded ({round(time.time()-t0, 2)}s)')
     return pd.DataFrame(rows)
 
 
 def extract_features_instance(instance):
     """Extract features from an instance."""
+    from scipy.spatial import ConvexHull, distance # imported at first use (slow import, not needed to generate instances)
     
     # Create features dictionary.
     features = {}
+    t = time.perf_counter()
     
     # Store instance name
     if hasattr(instance, 'name'):
@@ -116,6 +108,7 @@ def extract_features_instance(instance):
         features['IntCustMin'] = np.min(relative_inter_cust)
         features['IntCustMed'] = np.median(relative_inter_cust)
         features['IntCustMax'] = np.max(relative_inter_cust)
+        t = routing.metrics.lap('features.locations', t)
         
 
     # Extract features about capacities and demands
@@ -133,6 +126,7 @@ def extract_features_instance(instance):
         features['DemMin'] = np.min(relative_demands)
         features['DemMed'] = np.median(relative_demands)
         features['DemMax'] = np.max(relative_demands)
+        t = routing.metrics.lap('features.demands', t)
 
 
     # Extract features about time windows and service times
@@ -170,6 +164,7 @@ def extract_features_instance(instance):
         features['TwCentMin'] = np.min(rel_tw_centers)
         features['TwCentMed'] = np.median(rel_tw_centers)
         features['TwCentMax'] = np.max(rel_tw_centers)
+        routing.metrics.lap('features.time_windows', t)
         
     return features
         
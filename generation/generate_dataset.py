@@ -1,6 +1,10 @@
 """ A module for generating a full dataset of routing instances."""
 
+import routing
 import generation
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 
 def generate_dataset(
@@ -9,35 +13,87 @@ def generate_dataset(
     start_count=1,       # (int)  - number to start naming instances with
     variant='cvrptw',    # (str)  - routing variant (tsp, vcrp, or cvrptw)
     verbose=True,        # (bool) - print generation progress to console
-    solved=True          # (bool) - solve the generated instances
+    solved=True,         # (bool) - solve the generated instances
+    seed=None,           # (int)  - root seed of the dataset (None: fresh entropy, stored in gen_params)
+    workers=1            # (int)  - number of worker processes (1: generate in the current process)
 ):  # -> Returns None, but saves the generated instances to path
     """Generate a full dataset of routing instances from a variety of distributions."""
     
+    # Each instance draws from its own stream, spawned from the root seed and its index (the number in its name).
+    # Any instance can thus be regenerated from (seed, index), no matter which worker produced it.
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    indices = range(start_count, start_count + num_instances)
+    
     # continue until desired number of instances was generated
-    for i in range(num_instances):
-        
-        #generate instance
-        instance = generation.generate_instance(variant=variant)
-        instance.name = variant+'%06d' % (start_count + i)
-        instance.gen_params['name'] = instance.name
-        
-        # solve instance
-        if solved:
-            instance.solve(
-                first_solution='PATH_CHEAPEST_ARC',
-                local_search='GUIDED_LOCAL_SEARCH',
-                time_limit=int(instance.gen_params['num_customers'] * 3),
-                verbose=0)
-            instance.gen_params['has_solution'] = hasattr(instance, 'solution_distance')
-            if instance.gen_params['has_solution']:
-                instance.gen_params['num_vehicles_used'] = sum([1 for route in instance.solution_routes if len(route) > 2])
-
-        # Save instance.
-        instance.save(path, instance.name, filetype='pickle', reduce_size=True)
-        instance.save(path, instance.name, filetype='txt', reduce_size=True)
-
-        # print progress
-        if verbose:
-            print(f"Saved: {instance.name}")
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            names = executor.map(routing.metrics.worker_task(generate_dataset_instance), 
+                                 repeat(path), indices, repeat(seed), repeat(variant), repeat(solved))
+            for name in map(routing.metrics.collect, names):
+                # print progress
+                if verbose:
+                    print(f"Saved: {name}")
+    else:
+        for index in indices:
+            name = generate_dataset_instance(path, index, seed, variant, solved)
+            # print progress
+            if verbose:
+                print(f"Saved: {name}")
     
-    return None
\ No newline at end of file
+    return None
+
+
+def regenerate_instance(
+    seed,             # (int) - root seed of the dataset (gen_params['seed'])
+    index,            # (int) - index of the instance in the dataset (gen_params['seed_index'])
+    variant='cvrptw', # (str) - routing variant (tsp, vcrp, or cvrptw)
+    **params          # fixed generation parameters (e.g. loc_distr), passed on to generate_instance
+):  # -> Returns: routing instance object (unsolved)
+    """Regenerates a single instance of a dataset from its root seed and index."""
+    instance = generation.generate_instance(variant=variant, rng=instance_rng(seed, index), **params)
+    instance.name = variant+'%06d' % index
+    instance.gen_params['name'] = instance.name
+    instance.gen_params['seed'] = seed
+    instance.gen_params['seed_index'] = index
+    return instance
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def instance_rng(seed, index):
+    """Returns the random number generator of an instance (equal to the index-th child of SeedSequence(seed).spawn)."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+
+
+def generate_dataset_instance(path, index, seed, variant, solved):
+    """Generates, solves, and saves a single instance of a dataset (runs in the worker processes)."""
+    
+    #generate instance
+    instance = regenerate_instance(seed, index, variant)
+    
+    # solve instance
+    if solved:
+        instance = solve_dataset_instance(instance)
+
+    # Save instance.
+    instance.save(path, instance.name, filetype='pickle', reduce_size=True)
+    instance.save(path, instance.name, filetype='txt', reduce_size=True)
+    
+    return instance.name
+
+
+def solve_dataset_instance(instance, first_solution='PATH_CHEAPEST_ARC', local_search='GUIDED_LOCAL_SEARCH', time_limit_m=3):
+    """Solves a generated instance with the dataset's solver settings and records the solution in gen_params."""
+    instance.solve(
+        first_solution=first_solution,
+        local_search=local_search,
+        time_limit=max(1, int(instance.gen_params['num_customers'] * time_limit_m)),
+        verbose=0)
+    instance.gen_params['has_solution'] = hasattr(instance, 'solution_distance')
+    if instance.gen_params['has_solution']:
+        instance.gen_params['num_vehicles_used'] = sum([1 for route in instance.solution_routes if len(route) > 2])
+    return instance
\ No newline at end of file
@@ -0,0 +1,377 @@
+""" A module for generating batches of routing instances at once (vectorized over all instances)."""
+
+import routing
+import numpy as np
+from .locations import DEPOT_POSITIONS, LOC_DISTRS
+from .demands import DEM_DISTRS
+from .service_times import ST_DISTRS
+from .time_windows import TW_CENTER_DISTRS, TW_WIDTH_DISTRS
+
+
+@routing.metrics.timed('generate.batch')
+def generate_instances(
+    n,                           # (int)   - number of instances to be generated
+    variant='cvrptw',            # (str)   - routing variant (tsp, vcrp, or cvrptw)
+    distance_metric='euclidean', # (str)   - distance metric (euclidean or manhattan)
+    num_customers=None,          # (int)   - number of locations
+    depot_pos=None,              # (str)   - depot position (options in locations.py)
+    loc_distr=None,              # (str)   - locations distribution (options in locations.py)
+    dem_distr=None,              # (str)   - demands distribution (options in demands.py)
+    cap_ratio=None,              # (float) - number of customers whose demand a vehcile can cover on average
+    st_distr=None,               # (str)   - service times distribution (options in service_times.py)
+    tw_share=None,               # (str)   - share of customers with time windows
+    tw_center_distr=None,        # (str)   - time windows distribution (options in time_windows.py)
+    tw_width_distr=None,         # (str)   - time windows distribution (options in time_windows.py)
+    rng=None,                    # (np.random.Generator) - random number generator (default: fresh generator)
+    as_instances=False           # (bool)  - materialise routingInstance objects (incl. distance matrices)
+):  # -> Returns: routingBatch (or list of routing instance objects if as_instances)
+    """Generates a batch of routing instances from the same distributions as generate_instance."""
+
+    ### SETUP GENERATION
+    if rng is None:
+        rng = np.random.default_rng()
+    gen_params = {}
+
+    ### GENERATE TSP CHARACTERISTICS
+    # Service area
+    area = rng.uniform(low=10_000, high=1_000_000, size=n)
+    side_ratio = np.minimum(rng.exponential(scale=0.45, size=n)+1, 5)
+    long_side = np.sqrt(area*side_ratio)
+    short_side = np.sqrt(area/side_ratio)
+    lx = np.where(rng.integers(2, size=n) == 0, long_side, short_side)
+    ly = area / lx
+    area, side_ratio, lx, ly = (np.round(a, 4) for a in (area, side_ratio, lx, ly))
+    # Number of customers
+    num_customers = sample_param(num_customers, rng.integers(low=20, high=100, size=n), n)
+    offsets = np.concatenate(([0], np.cumsum(num_customers + 1)))
+    # Depot and customer locations
+    depot_pos = sample_param(depot_pos, rng.choice(DEPOT_POSITIONS, size=n), n)
+    loc_distr = sample_param(loc_distr, rng.choice(LOC_DISTRS, size=n), n)
+    locations = generate_locations_batch(num_customers, offsets, depot_pos, loc_distr, lx, ly, rng)
+    gen_params.update(area=area, side_ratio=side_ratio, lx=lx, ly=ly,
+                      num_customers=num_customers, depot_pos=depot_pos, loc_distr=loc_distr)
+    batch = routing.routingBatch(variant, offsets, locations, distance_metric=distance_metric, gen_params=gen_params)
+
+    ### GENERATE CVRP CHARACTERISTICS
+    if variant in ['cvrp', 'cvrptw']:
+        # Generate demands
+        dem_distr = sample_param(dem_distr, rng.choice(DEM_DISTRS, size=n), n)
+        batch.demands = generate_demands_batch(offsets, dem_distr, locations, lx, ly, rng)
+        dem_avg = np.add.reduceat(batch.demands, offsets[:-1]) / num_customers
+        dem_max = np.maximum.reduceat(batch.demands, offsets[:-1])
+        # How many customer demands can one vehicle cover on average
+        cap_ratio = sample_param(cap_ratio, np.round(rng.uniform(0.02, 0.8, size=n), 4), n)
+        avg_route_size = np.round(np.maximum(dem_max / dem_avg, cap_ratio*num_customers), 4)
+        cap_avg = np.ceil(avg_route_size * dem_avg)
+        # Vehicle capacities (num_vehicles = num_customers, see generate_instance.py)
+        batch.vehicle_offsets = np.concatenate(([0], np.cumsum(num_customers)))
+        batch.vehicle_capacities = np.repeat(cap_avg, num_customers).astype(int)
+        gen_params.update(dem_distr=dem_distr, cap_ratio=cap_ratio, avg_route_size=avg_route_size)
+
+    ### GENERATE CVRPTW CHARACTERISTICS
+    if variant in ['cvrptw']:
+        # Length of time horizon
+        possible_rounds = np.round(rng.triangular(0.7071, 2, 8, size=n), 4)
+        tw_width_depot = np.round(possible_rounds * (2*lx + 2*ly), 4)
+        # Service times
+        st_distr = sample_param(st_distr, rng.choice(ST_DISTRS, size=n), n)
+        batch.service_times = generate_service_times_batch(offsets, st_distr, tw_width_depot, batch.demands, rng)
+        # Share of customers with time_windows
+        tw_share = np.full(n, tw_share) if tw_share is not None else np.round(rng.triangular(0.25, 1, 1, size=n), 4)
+        # Time windows
+        tw_center_distr = sample_param(tw_center_distr, rng.choice(TW_CENTER_DISTRS, size=n), n)
+        tw_width_distr = sample_param(tw_width_distr, rng.choice(TW_WIDTH_DISTRS, size=n), n)
+        depot_dist = compute_depot_distances(locations, offsets, distance_metric)
+        batch.time_windows = generate_time_windows_batch(
+            offsets, tw_center_distr, tw_width_distr, tw_width_depot, tw_share,
+            depot_dist, batch.service_times, rng)
+        gen_params.update(possible_rounds=possible_rounds, st_distr=st_distr, tw_share=tw_share,
+                          tw_center_distr=tw_center_distr, tw_width_distr=tw_width_distr)
+
+    ### RETURN
+    if as_instances:
+        return batch.to_instances(distance_matrix=True)
+    return batch
+
+
+
+def generate_locations_batch(num_customers, offsets, depot_pos, loc_distr, lx, ly, rng):
+    """Generates the locations (depot first) of all instances as one concatenated array."""
+    n = len(num_customers)
+    seg = np.repeat(np.arange(n), num_customers + 1)
+    # Customer locations (the depot is sampled with them if depot_pos is 'loc_distr')
+    from_distr = depot_pos == 'loc_distr'
+    counts = num_customers + from_distr
+    loc_gen = generate_customer_locations_batch(counts, loc_distr, rng)
+    locations = np.empty((offsets[-1], 2))
+    is_depot = np.zeros(offsets[-1], dtype=bool)
+    is_depot[offsets[:-1]] = True
+    locations[~is_depot | from_distr[seg]] = loc_gen
+    # Depot locations
+    loc_depot = np.select(
+        [depot_pos[:, None] == 'central', depot_pos[:, None] == 'uniform'],
+        [np.full((n, 2), 0.5), rng.random((n, 2))],
+        0.0)
+    locations[offsets[:-1][~from_distr]] = loc_depot[~from_distr]
+    # Account for area side lenghts
+    locations[:,0] *= lx[seg]
+    locations[:,1] *= ly[seg]
+    return np.around(locations, 4)
+
+
+def generate_customer_locations_batch(counts, loc_distr, rng):
+    """Generates unit square locations of all instances (grouped by distribution, then rotated and shuffled)."""
+    n = len(counts)
+    seg = np.repeat(np.arange(n), counts)
+    starts = np.concatenate(([0], np.cumsum(counts)))[:-1]
+    locations = np.empty((seg.shape[0], 2))
+    for distr in np.unique(loc_distr):
+        idx = np.flatnonzero(loc_distr == distr)
+        locations[np.isin(seg, idx)] = sample_unit_locations(counts[idx], distr, rng)
+    # Rotate, shuffle rows, and shuffle x/y (per instance) to mix double distributions and x/y
+    locations = rotate_batch(locations, rng.integers(4, size=n)[seg])
+    locations = locations[shuffle_segments(seg, rng)]
+    swap = rng.integers(2, size=n)[seg] == 1
+    locations[swap] = locations[swap][:, ::-1]
+    return np.around(locations, 2)
+
+
+def sample_unit_locations(counts, loc_distr, rng):
+    """Samples the unit square locations of several instances following the same distribution."""
+    m = int(np.sum(counts))
+    seg = np.repeat(np.arange(len(counts)), counts)
+
+    if loc_distr == 'uniform':
+        return rng.uniform(size=(m,2))
+
+    elif loc_distr == 'clustered':
+        # determine number of seeds, their locations, and the spread around them (per instance)
+        num_seeds = rng.integers(np.maximum(counts//20, 2), np.maximum(counts//6, 3))
+        seed_offsets = np.concatenate(([0], np.cumsum(num_seeds)))[:-1]
+        centers = rng.random((int(np.sum(num_seeds)), 2))
+        scale = rng.uniform(0.035, 0.07, size=len(counts))
+        # select a center for each customer and sample from the truncated normal around it
+        center = centers[seed_offsets[seg] + rng.integers(num_seeds[seg])]
+        locations = np.empty((m, 2))
+        missing = np.ones((m, 2), dtype=bool)
+        while missing.any():
+            rows = np.nonzero(missing)[0]
+            sample = rng.normal(loc=center[missing], scale=scale[seg[rows]])
+            accept = (sample >= 0) & (sample <= 1)
+            locations[missing] = np.where(accept, sample, locations[missing])
+            missing[missing] = ~accept
+        return locations
+
+    elif loc_distr == 'uniform_clustered':
+        # split the customers (order within an instance is shuffled afterwards)
+        counts_unif = counts // 2
+        counts_clust = counts - counts_unif
+        locations = np.concatenate((
+            sample_unit_locations(counts_unif, 'uniform', rng),
+            sample_unit_locations(counts_clust, 'clustered', rng)))
+        seg_comb = np.concatenate((np.repeat(np.arange(len(counts)), counts_unif),
+                                   np.repeat(np.arange(len(counts)), counts_clust)))
+        return locations[np.argsort(seg_comb, kind='stable')]
+
+    elif loc_distr == 'triangular':
+        return rng.triangular(0, 0.5, 1, size=(m,2))
+
+    elif loc_distr == 'squeezed':
+        return sample_rejection(m, lambda loc: loc[:,0] * loc[:,1], rng)
+
+    elif loc_distr == 'uniform_triangular':
+        return np.vstack((rng.random(m), rng.triangular(0, 0.5, 1, m))).T
+
+    elif loc_distr == 'triangular_squeezed':
+        loc_tria = rng.triangular(0, 0.5, 1, m)
+        loc_sque = sample_rejection(m, lambda loc: loc[:,0], rng, dims=1).flatten()
+        return np.vstack((loc_tria, loc_sque)).T
+
+    elif loc_distr == 'side_central':
+        return sample_rejection(
+            m, lambda loc: (1 - np.abs(loc[:,0] - 0.5) / 0.5) * (np.abs(loc[:,1] - 0.5) / 0.5), rng)
+
+    elif loc_distr == 'cavity_dispersion':
+        return sample_rejection(
+            m, lambda loc: (np.abs(loc[:,0] - 0.5) / 0.5) * (np.abs(loc[:,1] - 0.5) / 0.5), rng)
+
+    elif loc_distr == 'truncated_exponential':
+        a = -np.log(rng.random((m,2)))/1.5
+        return a - np.floor(a)
+
+
+def generate_demands_batch(offsets, dem_distr, locations, lx, ly, rng):
+    """Generates the demands (depot first) of all instances as one concatenated array."""
+    n = len(offsets) - 1
+    seg = np.repeat(np.arange(n), np.diff(offsets))
+    is_depot = np.zeros(offsets[-1], dtype=bool)
+    is_depot[offsets[:-1]] = True
+    demands = np.zeros(offsets[-1], dtype=int)
+    for distr in np.unique(dem_distr):
+        sel = (dem_distr[seg] == distr) & ~is_depot
+        m = int(np.sum(sel))
+
+        if distr == 'unitary': # equal demand
+            demands[sel] = rng.integers(low=1, high=100, size=n)[seg[sel]]
+
+        elif distr == 'lowval_highcv':
+            demands[sel] = rng.integers(low=1, high=10, size=m)
+
+        elif distr == 'lowval_lowcv':
+            demands[sel] = rng.integers(low=5, high=10, size=m)
+
+        elif distr == 'highval_highcv':
+            demands[sel] = rng.integers(low=1, high=100, size=m)
+
+        elif distr == 'highval_lowcv':
+            demands[sel] = rng.integers(low=50, high=100, size=m)
+
+        elif distr == 'manysmall_fewlarge':
+            # a random subset of each instance's customers (of random size) has small demands
+            num_cust = np.diff(offsets) - 1
+            customers_small = (rng.uniform(0.7, 0.95, size=n) * num_cust).astype(int)
+            sel_seg = seg[sel]
+            order = shuffle_segments(sel_seg, rng)
+            ranks = np.empty(m, dtype=int)
+            ranks[order] = np.arange(m) - np.searchsorted(sel_seg, sel_seg)
+            demands[sel] = np.where(
+                ranks < customers_small[sel_seg],
+                rng.integers(low=1, high=10, size=m),
+                rng.integers(low=50, high=100, size=m))
+
+        elif distr == 'quadrant':
+            high_demand = rng.integers(2, size=n) # odd or even quadrant with high demands
+            x_high = locations[sel, 0] >= lx[seg[sel]]/2
+            y_high = locations[sel, 1] >= ly[seg[sel]]/2
+            odd_quadrant = x_high != y_high # quadrants 1 and 3 (see demands.py)
+            demands[sel] = np.where(
+                odd_quadrant == high_demand[seg[sel]],
+                rng.integers(low=1, high=50, size=m),
+                rng.integers(low=51, high=100, size=m))
+
+    return demands
+
+
+def generate_service_times_batch(offsets, st_distr, tw_width_depot, demands, rng):
+    """Generates the service times (depot first) of all instances as one concatenated array."""
+    n = len(offsets) - 1
+    seg = np.repeat(np.arange(n), np.diff(offsets))
+    is_depot = np.zeros(offsets[-1], dtype=bool)
+    is_depot[offsets[:-1]] = True
+    width = tw_width_depot[seg]
+    service_times = np.zeros(offsets[-1])
+
+    # all customers have the same service time
+    sel = (st_distr[seg] == 'unitary') & ~is_depot
+    service_times[sel] = rng.uniform(0.001 * tw_width_depot, 0.1 * tw_width_depot)[seg[sel]]
+
+    # all customers varying service times
+    sel = (st_distr[seg] == 'uniform') & ~is_depot
+    service_times[sel] = rng.uniform(0.001 * width[sel], 0.1 * width[sel])
+
+    # all customers have a service time proportional to their demand
+    sel = st_distr[seg] == 'proportional'
+    dem_max = np.maximum.reduceat(demands, offsets[:-1])
+    factor = rng.uniform(0.001, 0.1, size=n) * tw_width_depot
+    service_times[sel] = (demands[sel] / dem_max[seg[sel]]) * factor[seg[sel]]
+
+    return service_times.astype(int)
+
+
+def generate_time_windows_batch(
+    offsets, tw_center_distr, tw_width_distr, tw_width_depot, tw_share, depot_dist, service_times, rng):
+    """Generates the time windows (depot first) of all instances as one concatenated array."""
+    n = len(offsets) - 1
+    seg = np.repeat(np.arange(n), np.diff(offsets))
+    is_depot = np.zeros(offsets[-1], dtype=bool)
+    is_depot[offsets[:-1]] = True
+    width = tw_width_depot[seg]
+    center_distr = tw_center_distr[seg]
+    width_distr = tw_width_distr[seg]
+    num_discrete = rng.integers(2, 10, size=n)[seg] # only relevant for discrete distribution
+
+    # Time window centers (between the earliest arrival and the latest feasible departure, see time_windows.py)
+    earliest = depot_dist
+    latest = np.maximum(width - depot_dist - service_times, earliest+1)
+    tw_center_range = latest - earliest
+    tw_centers = np.zeros(offsets[-1])
+    sel = center_distr == 'uniform'
+    tw_centers[sel] = rng.uniform(earliest[sel], latest[sel])
+    sel = center_distr == 'one_peak'
+    tw_centers[sel] = rng.triangular(earliest[sel], (earliest[sel]+latest[sel])/2, latest[sel])
+    for distr, peaks in [('two_peaks', 2), ('three_peaks', 3)]:
+        sel = center_distr == distr
+        r = tw_center_range[sel]
+        tw_centers[sel] = (earliest[sel] + rng.integers(0, peaks, size=r.shape[0]) * r/peaks
+                           + rng.triangular(0, r/2, r)/peaks)
+    sel = center_distr == 'discrete'
+    tw_centers[sel] = (rng.integers(0, num_discrete[sel]) + 0.5) * width[sel]/num_discrete[sel]
+
+    # Time window widths
+    tw_widths = np.zeros(offsets[-1])
+    sel = width_distr == 'uniform'
+    tw_widths[sel] = rng.uniform(0, 0.6*width[sel])
+    for distr, (left, mode, right) in [('short', (0, 0.1, 0.2)), ('medium', (0.2, 0.3, 0.4)), ('long', (0.4, 0.5, 0.6))]:
+        sel = width_distr == distr
+        tw_widths[sel] = rng.triangular(left*width[sel], mode*width[sel], right*width[sel])
+    sel = width_distr == 'unitary'
+    tw_widths[sel] = np.where(
+        center_distr[sel] == 'discrete',
+        width[sel]/num_discrete[sel],
+        rng.uniform(0.01, 0.6, size=n)[seg[sel]] * width[sel])
+
+    # Compute time windows and remove customers without time windows (and the depot)
+    time_windows = np.around(np.vstack((tw_centers-tw_widths/2, tw_centers+tw_widths/2)).T, 4)
+    unconstrained = is_depot | (tw_share[seg] < rng.random(offsets[-1]))
+    time_windows[unconstrained] = np.vstack((np.zeros(offsets[-1]), np.around(width, 4))).T[unconstrained]
+
+    return time_windows
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def sample_param(value, sampled, n):
+    """Returns a fixed generation parameter for all instances or the sampled ones."""
+    if value:
+        return np.full(n, value)
+    return sampled
+
+
+def sample_rejection(num, accept_prob, rng, dims=2):
+    """Samples points in the unit cube which are accepted with probability accept_prob (rejection sampling)."""
+    samples = np.empty((num, dims))
+    missing = np.arange(num)
+    while missing.size:
+        candidates = rng.random((missing.size, dims))
+        accept = rng.random(missing.size) < accept_prob(candidates)
+        samples[missing[accept]] = candidates[accept]
+        missing = missing[~accept]
+    return samples
+
+
+def shuffle_segments(seg, rng):
+    """Returns a permutation which shuffles the elements within each (sorted) segment."""
+    return np.lexsort((rng.random(seg.shape[0]), seg))
+
+
+def rotate_batch(locations, num_rotations):
+    """Rotates each location in the unit square by its number of quarter turns (see locations.rotate)."""
+    x, y = locations[:,0], locations[:,1]
+    rotated = np.empty_like(locations)
+    rotated[:,0] = np.select([num_rotations == 1, num_rotations == 2, num_rotations == 3], [y, 1-x, 1-y], x)
+    rotated[:,1] = np.select([num_rotations == 1, num_rotations == 2, num_rotations == 3], [1-x, 1-y, x], y)
+    return rotated
+
+
+def compute_depot_distances(locations, offsets, distance_metric='euclidean'):
+    """Computes the distance of every location to the depot of its instance (1st row of the distance matrix)."""
+    seg = np.repeat(np.arange(len(offsets)-1), np.diff(offsets))
+    diff = locations - locations[offsets[:-1]][seg]
+    if distance_metric == 'euclidean':
+        depot_dist = np.linalg.norm(diff, axis=-1)
+    elif distance_metric == 'manhattan':
+        depot_dist = np.sum(np.abs(diff), axis=-1)
+    return np.around(depot_dist, decimals=2)
@@ -0,0 +1,203 @@
+""" A module for generating a dataset as a streaming pipeline (generate -> solve -> featurize -> save)."""
+
+import generation
+import routing
+import numpy as np
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from .generate_dataset import solve_dataset_instance
+
+
+def generate_dataset_pipeline(
+    path,                 # (str)   - path to save generated instances to
+    num_instances,        # (int)   - number of instances to be generated
+    start_count=1,        # (int)   - number to start naming instances with
+    variant='cvrptw',     # (str)   - routing variant (tsp, vcrp, or cvrptw)
+    verbose=True,         # (bool)  - print progress and stage throughputs to console
+    solved=True,          # (bool)  - solve the generated instances
+    seed=None,            # (int)   - root seed of the dataset (see generate_dataset.py)
+    solve_workers=4,      # (int)   - number of solver processes
+    save_workers=2,       # (int)   - number of I/O threads saving instances
+    queue_size=8,         # (int)   - capacity of the queues between the stages (backpressure)
+    filetypes=('pickle', 'txt') # (tuple) - file-types to save each instance as (shard: appended to sharded archives)
+):  # -> Returns: tuple of pd.DataFrame with the features of all instances and the pipelineStats
+    """Generates, solves, featurizes, and saves a dataset with overlapping stages."""
+
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    stats = pipelineStats()
+    generated = queue.Queue(maxsize=queue_size) # generation -> solving
+    finished = queue.Queue()                    # solving -> featurizing (bounded by in_flight)
+    in_flight = threading.BoundedSemaphore(solve_workers + queue_size)
+    saving = threading.BoundedSemaphore(save_workers + queue_size)
+    errors = []
+    rows = []
+    shards = routing.shardWriter(path) if 'shard' in filetypes else None
+
+    def generate():
+        """Generation stage (thread): generates the instances in order."""
+        try:
+            for index in range(start_count, start_count + num_instances):
+                if errors:
+                    break
+                with stats.timer('generate'):
+                    instance = generation.regenerate_instance(seed, index, variant)
+                with stats.timer('generate', wait=True):
+                    generated.put(instance) # blocks while the solvers fall behind
+        except Exception as e:
+            errors.append(e)
+        finally:
+            generated.put(None) # the next stages always see the end of the stream
+
+    def solve(executor):
+        """Solving stage (dispatcher thread): hands the instances to the solver processes."""
+        futures = []
+        try:
+            while True:
+                instance = generated.get()
+                if instance is None:
+                    break
+                if errors:
+                    continue # drain the generation stage
+                with stats.timer('solve', wait=True):
+                    in_flight.acquire() # blocks while featurizing and saving fall behind
+                if executor is None:
+                    finished.put(instance)
+                    continue
+                future = executor.submit(routing.metrics.worker_task(solve_timed), instance)
+                future.add_done_callback(lambda f: finished.put(f.exception() or routing.metrics.collect(f.result())))
+                futures.append(future)
+        except Exception as e:
+            errors.append(e)
+            while generated.get() is not None: # unblock the generation thread until it ends the stream
+                pass
+        finally:
+            wait(futures)
+            finished.put(None)
+
+    def save(instance):
+        """Saving stage (I/O thread): saves an instance in all requested file-types."""
+        try:
+            with stats.timer('save'):
+                for filetype in filetypes:
+                    if filetype == 'shard':
+                        shards.write(instance)
+                    else:
+                        instance.save(path, instance.name, filetype=filetype, reduce_size=True)
+            if verbose:
+                print(f"Saved: {instance.name}")
+        except Exception as e:
+            errors.append(e)
+        finally:
+            saving.release()
+
+    solve_executor = ProcessPoolExecutor(max_workers=solve_workers) if solved else None
+    save_executor = ThreadPoolExecutor(max_workers=save_workers)
+    threads = [threading.Thread(target=generate, daemon=True),
+               threading.Thread(target=solve, args=(solve_executor,), daemon=True)]
+    for thread in threads:
+        thread.start()
+
+    # Featurizing stage (current thread): extracts features from the in-memory instances.
+    while True:
+        item = finished.get()
+        if item is None:
+            break
+        in_flight.release()
+        if isinstance(item, Exception):
+            errors.append(item)
+        if errors:
+            continue # drain the pipeline
+        instance, solve_time = item if solved else (item, None)
+        if solve_time is not None:
+            stats.record('solve', solve_time)
+        try:
+            with stats.timer('featurize'):
+                features = generation.extract_features_instance(instance)
+                if hasattr(instance, 'solution_distance'):
+                    features['distance'] = instance.solution_distance
+                rows.append(features)
+        except Exception as e:
+            errors.append(e)
+            continue
+        with stats.timer('featurize', wait=True):
+            saving.acquire() # blocks while the I/O threads fall behind
+        save_executor.submit(save, instance)
+
+    for thread in threads:
+        thread.join()
+    save_executor.shutdown(wait=True)
+    if shards is not None:
+        shards.close()
+    if solve_executor is not None:
+        solve_executor.shutdown(wait=True)
+    if errors:
+        raise errors[0]
+    if verbose:
+        print(stats.summary())
+
+    import pandas as pd # imported at first use (slow import, not needed to generate instances)
+    features = pd.DataFrame(rows)
+    if 'name' in features:
+        features = features.sort_values('name', ignore_index=True)
+    return features, stats
+
+
+
+class pipelineStats:
+    """A class to collect the throughput counters of each pipeline stage (thread-safe)."""
+
+    def __init__(self):
+        """Initializes empty counters."""
+        self.t0 = time.time()
+        self.items = {}
+        self.busy = {}
+        self.waits = {}
+        self.lock = threading.Lock()
+
+    def record(self, stage, seconds, wait=False):
+        """Records one processed item (or the time a stage was blocked by backpressure)."""
+        with self.lock:
+            if wait:
+                self.waits[stage] = self.waits.get(stage, 0.0) + seconds
+            else:
+                self.items[stage] = self.items.get(stage, 0) + 1
+                self.busy[stage] = self.busy.get(stage, 0.0) + seconds
+        if not wait:
+            routing.metrics.record('pipeline.'+stage, seconds)
+
+    @contextmanager
+    def timer(self, stage, wait=False):
+        """Times the enclosed block and records it for the stage."""
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - t, wait)
+
+    def summary(self):
+        """Returns items, busy time, blocked time, and throughput (items per wall-clock second) per stage."""
+        import pandas as pd
+        elapsed = time.time() - self.t0
+        with self.lock:
+            return pd.DataFrame({
+                'items': pd.Series(self.items, dtype=int),
+                'busy_s': pd.Series(self.busy, dtype=float),
+                'blocked_s': pd.Series(self.waits, dtype=float),
+                'items_per_s': pd.Series(self.items, dtype=float) / elapsed,
+            }).fillna(0).astype({'items': int})
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def solve_timed(instance):
+    """Solves an instance (runs in the solver processes) and returns it with the solving time."""
+    t = time.perf_counter()
+    instance = solve_dataset_instance(instance)
+    return instance, time.perf_counter() - t
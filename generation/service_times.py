@@ -1,34 +1,42 @@
 """ A module for generating the service times in a routing instance."""
 
+import routing
 import numpy as np
-import random
+
+
+# Service times distributions (sampled uniformly)
+ST_DISTRS = [
+    'unitary', 
+    'uniform', 
+    'proportional'
+]
     
 
+@routing.metrics.timed('generate.service_times')
 def generate_service_times(
     num_customers,  # (int)      - number of service times to be generated (incl. depot)
     st_distr,       # (str)      - service times distribution (options below)
     tw_width_depot, # (float)    - maximum route duration
-    demands         # (np.array) - customer demands (only required for proportional distribution)
+    demands,        # (np.array) - customer demands (only required for proportional distribution)
+    rng=None        # (np.random.Generator) - random number generator (default: fresh generator)
 ):  # Returns: tuple of np.array with service times as well as generation parameters
     """Generate service times."""
+    if rng is None:
+        rng = np.random.default_rng()
     
     # Service times distributions
     if not st_distr:
-        st_distr = random.choice([
-            'unitary', 
-            'uniform', 
-            'proportional'
-        ])
+        st_distr = str(rng.choice(ST_DISTRS))
     
     if st_distr == 'unitary': # all customers have the same service time
-        service_times = np.ones(num_customers) * np.random.uniform(0.001 * tw_width_depot, 0.1 * tw_width_depot)
+        service_times = np.ones(num_customers) * rng.uniform(0.001 * tw_width_depot, 0.1 * tw_width_depot)
         service_times = np.concatenate((np.array([0]), service_times)) # add depot
         
     elif st_distr == 'uniform': # all customers varying service times
-        service_times = np.random.uniform(0.001 * tw_width_depot, 0.1 * tw_width_depot, num_customers)
+        service_times = rng.uniform(0.001 * tw_width_depot, 0.1 * tw_width_depot, num_customers)
         service_times = np.concatenate((np.array([0]), service_times)) # add depot
         
     elif st_distr == 'proportional': # all customers have a service time proportional to their demand
-        service_times = (demands/np.max(demands)) * (np.random.uniform(0.001, 0.1)*tw_width_depot)
+        service_times = (demands/np.max(demands)) * (rng.uniform(0.001, 0.1)*tw_width_depot)
         
     return service_times.astype(int), st_distr
\ No newline at end of file
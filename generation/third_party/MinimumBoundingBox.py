@@ -30,7 +30,6 @@
 #################################################################################
 
 
-from scipy.spatial import ConvexHull
 from math import sqrt
 import numpy as np
 from math import atan2, cos, sin, pi
@@ -133,6 +132,7 @@ def MinimumBoundingBox(points):
     #               corner_points: set that contains the corners of the rectangle
 
     if len(points) <= 2: raise ValueError('More than two points required.')
+    from scipy.spatial import ConvexHull # imported at first use (slow import)
 
     hull_ordered = [points[index] for index in ConvexHull(points).vertices]
     hull_ordered.append(hull_ordered[0])
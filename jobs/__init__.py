@@ -0,0 +1,14 @@
+""" A package to run the data pipeline (generate, solve, extract features, evaluate) from job manifests.
+
+Author: Jens Mueller
+Python Version: 3.9.7
+
+MODULES:
+
+    manifest.py  - Reads job manifests (json) and splits their work deterministically into shards.
+    runner.py    - Runs the steps of a manifest on one shard (local process pool) and merges the outputs of all shards.
+    __main__.py  - Command line interface (python -m jobs --help).
+"""
+
+from .manifest import load_manifest, check_manifest, parse_shard, in_shard
+from .runner import run_shard, shard_status, merge_shards
@@ -0,0 +1,56 @@
+""" Command line interface of the job runner.
+
+Examples:
+    python -m jobs run job.json                              # run the whole job on this machine
+    python -m jobs run job.json --shard 2/8 --workers 16     # run shard 2 of 8 (e.g. on the third of eight machines)
+    python -m jobs status job.json --shards 8                # list the finished shards
+    python -m jobs merge job.json --shards 8                 # collect the outputs of all shards (exit code 1 if any is missing)
+"""
+
+import sys
+import argparse
+import jobs
+
+
+def main(argv=None):
+    """Runs, checks, or merges the shards of a job manifest."""
+    parser = argparse.ArgumentParser(prog='python -m jobs', description='Runs job manifests (generate, solve, features, evaluate).')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help='run the steps of a manifest on one shard')
+    run.add_argument('manifest', help='job manifest (json)')
+    run.add_argument('--shard', default='0/1', help="shard to run as 'i/N' (default: 0/1, the whole job)")
+    run.add_argument('--workers', type=int, default=1, help='number of local worker processes')
+    run.add_argument('--force', action='store_true', help='run all steps again, even if they finished')
+    run.add_argument('--quiet', action='store_true', help='do not report progress')
+    for name, text in [('status', 'list the finished shards'), ('merge', 'collect the outputs of all shards')]:
+        command = commands.add_parser(name, help=text)
+        command.add_argument('manifest', help='job manifest (json)')
+        command.add_argument('--shards', type=int, default=1, help='number of shards the job was split into')
+        if name == 'merge':
+            command.add_argument('--allow-partial', action='store_true', help='merge even if some shards did not finish')
+    args = parser.parse_args(argv)
+
+    manifest = jobs.load_manifest(args.manifest)
+    if args.command == 'run':
+        try:
+            shard, num_shards = jobs.parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        jobs.run_shard(manifest, shard, num_shards, args.workers, args.force, verbose=0 if args.quiet else 1)
+        return 0
+    status = jobs.shard_status(manifest, args.shards)
+    if args.command == 'status':
+        for shard, marker in status.items():
+            print(f"shard {shard}/{args.shards}: " + (f"finished {marker['finished']} on {marker['host']} "
+                  f"({marker['seconds']}s)" if marker else 'not finished'))
+        return 0 if all(status.values()) else 1
+    missing = [shard for shard, marker in status.items() if marker is None]
+    if missing and not args.allow_partial:
+        print(f'Shards {missing} of {args.shards} did not finish.')
+        return 1
+    jobs.merge_shards(manifest, args.shards, args.allow_partial)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
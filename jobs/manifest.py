@@ -0,0 +1,119 @@
+""" A module to read job manifests and split their work into shards.
+
+A manifest is a json file declaring the output directory and a list of steps (generate, solve, features, evaluate):
+
+    {
+        "name": "cvrptw-train",
+        "output": "data/jobs/cvrptw-train/",
+        "seed": 42,
+        "steps": [
+            {"step": "generate", "path": "instances/", "num_instances": 10000, "variant": "cvrptw", "solve": false},
+            {"step": "solve", "input": "instances/", "path": "solved/",
+             "solver": {"first_solution": "PATH_CHEAPEST_ARC", "local_search": "GUIDED_LOCAL_SEARCH", "time_limit_m": 0.5}},
+            {"step": "features", "input": "solved/", "path": "features/"},
+            {"step": "evaluate", "input": "features/", "model": "models/xgb.pkl", "path": "evaluation/"}
+        ]
+    }
+
+Step paths are directories relative to the output directory. An input which is the path of an earlier step refers to
+that step's output in the same shard; any other input is an existing directory, whose files are split among the shards.
+"""
+
+import json
+import zlib
+import hashlib
+
+
+STEP_DEFAULTS = {   # step type -> default settings (keys not listed here are rejected)
+    'generate': {'path': None, 'num_instances': None, 'start_count': 1, 'variant': 'cvrptw', 'seed': None,
+                 'solve': False, 'solver': None, 'filetypes': ['pickle']},
+    'solve': {'path': None, 'input': None, 'filetype': 'pickle', 'solver': None, 'filetypes': ['pickle']},
+    'features': {'path': None, 'input': None, 'filetype': 'pickle'},
+    'evaluate': {'path': None, 'input': None, 'model': None, 'feature_names': None,
+                 'by': ['variant', 'loc_distr', 'size'], 'bootstrap': 0},
+}
+SOLVER_DEFAULTS = {'first_solution': 'PATH_CHEAPEST_ARC', 'local_search': 'GUIDED_LOCAL_SEARCH', 'time_limit_m': 3}
+REQUIRED = {'generate': ['path', 'num_instances'], 'solve': ['path', 'input'], 'features': ['path', 'input'],
+            'evaluate': ['path', 'input', 'model']}
+
+
+def load_manifest(filename):
+    """Loads a job manifest (json) and completes it with the default settings of each step."""
+    with open(filename, 'r') as f:
+        manifest = json.load(f)
+    return check_manifest(manifest)
+
+
+def check_manifest(manifest):
+    """Validates a job manifest (dict) and completes it with the default settings of each step."""
+    if not manifest.get('output') or not manifest.get('steps'):
+        raise ValueError('A manifest needs an output directory and at least one step.')
+    manifest = {'name': 'job', 'seed': None, **manifest}
+    manifest['output'] = as_dir(manifest['output'])
+    steps, paths = [], set()
+    for i, step in enumerate(manifest['steps']):
+        kind = step.get('step')
+        if kind not in STEP_DEFAULTS:
+            raise ValueError(f"Step {i}: unknown step type {kind!r} (options: {', '.join(STEP_DEFAULTS)}).")
+        unknown = set(step) - set(STEP_DEFAULTS[kind]) - {'step'}
+        if unknown:
+            raise ValueError(f'Step {i} ({kind}): unknown settings {sorted(unknown)}.')
+        step = {'step': kind, **STEP_DEFAULTS[kind], **step}
+        missing = [key for key in REQUIRED[kind] if step[key] is None]
+        if missing:
+            raise ValueError(f'Step {i} ({kind}): missing settings {missing}.')
+        step['path'] = as_dir(step['path'])
+        if step['path'] in paths:
+            raise ValueError(f"Step {i} ({kind}): the path {step['path']} is the output of an earlier step.")
+        if 'input' in step:
+            step['input'] = as_dir(step['input']) if not step['input'].endswith('.csv') else step['input']
+            step['internal'] = step['input'] in paths # output of an earlier step (same shard) or external data
+        paths.add(step['path'])
+        if step.get('solver') is not None or (kind == 'generate' and step['solve']):
+            step['solver'] = {**SOLVER_DEFAULTS, **(step.get('solver') or {})}
+        if kind == 'generate' and step['seed'] is None:
+            if manifest['seed'] is None:
+                raise ValueError(f'Step {i} (generate): a seed is required, so all shards generate the same dataset.')
+            step['seed'] = manifest['seed']
+        steps.append(step)
+    manifest['steps'] = steps
+    return manifest
+
+
+def manifest_hash(manifest):
+    """Returns a fingerprint of a manifest (shards of different manifests are never merged)."""
+    settings = {key: value for key, value in manifest.items() if key != 'output'} # machines may mount it elsewhere
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def parse_shard(text):
+    """Parses a shard specification 'i/N' (shards 0 to N-1 of N) and returns (i, N)."""
+    try:
+        shard, num_shards = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard {text!r}, expected 'i/N' (e.g. 0/4).")
+    if num_shards < 1 or not 0 <= shard < num_shards:
+        raise ValueError(f'Invalid shard {text!r}, expected 0 <= i < N.')
+    return shard, num_shards
+
+
+def shard_dir(manifest, shard, num_shards):
+    """Returns the output directory of a shard."""
+    return manifest['output'] + f'shards/{shard}-of-{num_shards}/'
+
+
+def in_shard(key, shard, num_shards):
+    """Assigns work deterministically: integers (instance indices) round-robin, file names by their crc32 hash."""
+    if isinstance(key, int):
+        return key % num_shards == shard
+    return zlib.crc32(key.encode()) % num_shards == shard
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def as_dir(path):
+    """Appends the trailing slash of a directory path."""
+    return path if path.endswith('/') else path + '/'
@@ -0,0 +1,298 @@
+""" A module to run the steps of a job manifest on one shard and to merge the outputs of all shards.
+
+Each shard writes to its own directory (output/shards/i-of-N/) and finishes with a completion marker (_SUCCESS), so
+N machines can run one job without coordination. merge_shards collects the outputs of all shards into the output
+directory once every shard has finished. Steps finished by a shard are skipped when it runs again (e.g. after a crash).
+"""
+
+import routing
+import generation
+import os
+import json
+import time
+import shutil
+import socket
+from concurrent.futures import ProcessPoolExecutor
+from generation.generate_dataset import solve_dataset_instance
+from .manifest import manifest_hash, shard_dir, in_shard
+
+
+STEP_MARKER = '_DONE'       # written to the output directory of a step once the step finished
+SHARD_MARKER = '_SUCCESS'   # written to the directory of a shard once all its steps finished
+MERGE_MARKER = '_MERGED'    # written to the output directory once all shards were merged
+FEATURES_FILE = 'features.csv'
+PREDICTIONS_FILE = 'predictions.csv'
+EVALUATION_FILE = 'evaluation.csv'
+
+
+def run_shard(
+    manifest,       # (dict) - job manifest (see manifest.py)
+    shard=0,        # (int)  - shard to run (0 to num_shards-1)
+    num_shards=1,   # (int)  - number of shards the job is split into
+    workers=1,      # (int)  - number of local worker processes
+    force=False,    # (bool) - run all steps again (even if the shard or some of its steps finished already)
+    verbose=1       # (int)  - report progress (0: nothing)
+):  # -> Returns: dict of the completion marker of the shard
+    """Runs all steps of a job manifest on one shard of its work."""
+    root = shard_dir(manifest, shard, num_shards)
+    fingerprint = manifest_hash(manifest)
+    marker = read_marker(root+SHARD_MARKER)
+    if marker is not None and not force:
+        if marker['manifest'] != fingerprint:
+            raise ValueError(f'{root} holds the outputs of a different manifest (use force to overwrite them).')
+        if verbose:
+            print(f'Shard {shard}/{num_shards} finished already.')
+        return marker
+    os.makedirs(root, exist_ok=True)
+    t0 = time.time()
+    summaries = []
+    for step in manifest['steps']:
+        done = read_marker(root+step['path']+STEP_MARKER)
+        if done is not None and done['manifest'] == fingerprint and not force:
+            summaries.append(done)
+            if verbose:
+                print(f"{step['step']} ({step['path']}) finished already.")
+            continue
+        # A step which did not finish starts over from an empty directory, so its outputs stay deterministic.
+        shutil.rmtree(root+step['path'], ignore_errors=True)
+        os.makedirs(root+step['path'])
+        t = time.time()
+        count = STEPS[step['step']](step, root, shard, num_shards, workers, verbose)
+        summary = {'manifest': fingerprint, 'step': step['step'], 'path': step['path'], 'count': count,
+                   'seconds': round(time.time() - t, 3)}
+        write_marker(root+step['path']+STEP_MARKER, summary)
+        summaries.append(summary)
+        if verbose:
+            print(f"{step['step']} ({step['path']}): {count} item(s), {summary['seconds']}s")
+    marker = {'manifest': fingerprint, 'name': manifest['name'], 'shard': shard, 'num_shards': num_shards,
+              'host': socket.gethostname(), 'finished': time.strftime('%Y-%m-%d %H:%M:%S'),
+              'seconds': round(time.time() - t0, 3), 'steps': summaries}
+    if routing.metrics.ENABLED:
+        marker['metrics'] = routing.metrics.snapshot()
+    write_marker(root+SHARD_MARKER, marker)
+    return marker
+
+
+def shard_status(manifest, num_shards):
+    """Returns the completion marker of each shard (None: not finished, or finished with a different manifest)."""
+    fingerprint = manifest_hash(manifest)
+    status = {}
+    for shard in range(num_shards):
+        marker = read_marker(shard_dir(manifest, shard, num_shards)+SHARD_MARKER)
+        status[shard] = marker if marker is not None and marker['manifest'] == fingerprint else None
+    return status
+
+
+def merge_shards(
+    manifest,           # (dict) - job manifest (see manifest.py)
+    num_shards,         # (int)  - number of shards the job was split into
+    allow_partial=False,# (bool) - merge the finished shards even if others did not finish
+    verbose=1           # (int)  - report progress (0: nothing)
+):  # -> Returns: dict of the merge marker (also saved to the output directory)
+    """Collects the outputs of all shards of a job into its output directory."""
+    status = shard_status(manifest, num_shards)
+    missing = [shard for shard, marker in status.items() if marker is None]
+    if missing and not allow_partial:
+        raise RuntimeError(f'Shards {missing} of {num_shards} did not finish (see shard_status).')
+    roots = [shard_dir(manifest, shard, num_shards) for shard, marker in status.items() if marker is not None]
+    counts = {}
+    for step in manifest['steps']:
+        target = manifest['output'] + step['path']
+        shutil.rmtree(target, ignore_errors=True)
+        os.makedirs(target)
+        counts[step['path']] = MERGES[step['step']](step, roots, target)
+        if verbose:
+            print(f"{step['step']} ({step['path']}): merged {counts[step['path']]} item(s) from {len(roots)} shard(s)")
+    marker = {'manifest': manifest_hash(manifest), 'name': manifest['name'], 'num_shards': num_shards,
+              'merged_shards': len(roots), 'missing_shards': missing, 'counts': counts,
+              'finished': time.strftime('%Y-%m-%d %H:%M:%S')}
+    write_marker(manifest['output']+MERGE_MARKER, marker)
+    return marker
+
+
+
+################################ STEPS ###################################
+
+
+
+def run_generate(step, root, shard, num_shards, workers, verbose):
+    """Generates (and optionally solves) the instances of the shard, each from the root seed and its index."""
+    indices = [index for index in range(step['start_count'], step['start_count'] + step['num_instances'])
+               if in_shard(index, shard, num_shards)]
+    tasks = [(root+step['path'], index, step['seed'], step['variant'], step['solver'] if step['solve'] else None,
+              step['filetypes']) for index in indices]
+    return len(run_tasks(generate_task, tasks, workers))
+
+
+def run_solve(step, root, shard, num_shards, workers, verbose):
+    """Solves the instances of the shard with the solver settings of the step."""
+    source, files = input_files(step, root, shard, num_shards)
+    tasks = [(source, filename, root+step['path'], step['solver'] or {}, step['filetypes']) for filename in files]
+    return len(run_tasks(solve_task, tasks, workers))
+
+
+def run_features(step, root, shard, num_shards, workers, verbose):
+    """Extracts the features (and solution distances) of the instances of the shard."""
+    import pandas as pd
+    source, files = input_files(step, root, shard, num_shards)
+    rows = run_tasks(features_task, [(source, filename) for filename in files], workers)
+    pd.DataFrame(rows).to_csv(root+step['path']+FEATURES_FILE, index=False)
+    return len(rows)
+
+
+def run_evaluate(step, root, shard, num_shards, workers, verbose):
+    """Predicts the solution distances of the shard's instances with a trained model and evaluates the predictions."""
+    import pandas as pd
+    import models
+    if step['internal']:
+        features = pd.read_csv(root+step['input']+FEATURES_FILE)
+    else:
+        filename = step['input'] if step['input'].endswith('.csv') else step['input']+FEATURES_FILE
+        features = pd.read_csv(filename)
+        features = features[[in_shard(str(name), shard, num_shards) for name in features['name']]]
+    features = features[features['distance'].notna()].reset_index(drop=True) if 'distance' in features else features.iloc[:0]
+    predictor = models.distancePredictor.load(step['model'], step['feature_names'])
+    predictions = features[['name'] + segment_keys(step, features)].assign(
+        y_true=features['distance'], y_pred=predictor.predict(features) if len(features) else [])
+    predictions.to_csv(root+step['path']+PREDICTIONS_FILE, index=False)
+    evaluate_predictions(step, predictions, root+step['path'])
+    return len(predictions)
+
+
+STEPS = {'generate': run_generate, 'solve': run_solve, 'features': run_features, 'evaluate': run_evaluate}
+
+
+
+################################ MERGES ###################################
+
+
+
+def merge_instances(step, roots, target):
+    """Copies the instance files of all shards into one directory and concatenates their metadata index logs."""
+    count = 0
+    with open(target+routing.INDEX_LOG, 'w') as index_log:
+        for root in roots:
+            with os.scandir(root+step['path']) as entries:
+                for entry in sorted(entries, key=lambda entry: entry.name):
+                    if entry.name == routing.INDEX_LOG:
+                        with open(entry.path, 'r') as f:
+                            shutil.copyfileobj(f, index_log)
+                    elif entry.is_file() and entry.name != STEP_MARKER:
+                        shutil.copy2(entry.path, target+entry.name)
+                        count += entry.name.endswith('.'+step['filetypes'][0])
+    return count
+
+
+def merge_features(step, roots, target):
+    """Concatenates the feature tables of all shards (sorted by instance name)."""
+    import pandas as pd
+    features = pd.concat([pd.read_csv(root+step['path']+FEATURES_FILE) for root in roots], ignore_index=True)
+    if 'name' in features:
+        features = features.sort_values('name', kind='stable')
+    features.to_csv(target+FEATURES_FILE, index=False)
+    return len(features)
+
+
+def merge_evaluations(step, roots, target):
+    """Concatenates the predictions of all shards and evaluates them together."""
+    import pandas as pd
+    predictions = pd.concat([pd.read_csv(root+step['path']+PREDICTIONS_FILE) for root in roots], ignore_index=True)
+    predictions = predictions.sort_values('name', kind='stable').reset_index(drop=True)
+    predictions.to_csv(target+PREDICTIONS_FILE, index=False)
+    evaluate_predictions(step, predictions, target)
+    return len(predictions)
+
+
+MERGES = {'generate': merge_instances, 'solve': merge_instances, 'features': merge_features,
+          'evaluate': merge_evaluations}
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def run_tasks(func, tasks, workers):
+    """Runs tasks (tuples of arguments) in a local process pool (their metrics are collected, see metrics.py)."""
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(routing.metrics.worker_task(func), *zip(*tasks),
+                                   chunksize=max(1, len(tasks) // (4 * workers)))
+            return list(map(routing.metrics.collect, results))
+    return [func(*task) for task in tasks]
+
+
+def generate_task(path, index, seed, variant, solver, filetypes):
+    """Generates, (optionally) solves, and saves a single instance (runs in the worker processes)."""
+    instance = generation.regenerate_instance(seed, index, variant)
+    if solver is not None:
+        instance = solve_dataset_instance(instance, **solver)
+    for filetype in filetypes:
+        instance.save(path, instance.name, filetype=filetype, reduce_size=True)
+    return instance.name
+
+
+def solve_task(source, filename, path, solver, filetypes):
+    """Loads, solves, and saves a single instance (runs in the worker processes)."""
+    instance = routing.load_instance(source+filename)
+    instance = solve_dataset_instance(instance, **solver)
+    instance.first_solution = solver.get('first_solution', 'PATH_CHEAPEST_ARC')
+    instance.local_search = solver.get('local_search', 'GUIDED_LOCAL_SEARCH')
+    instance.time_limit_m = solver.get('time_limit_m', 3)
+    for filetype in filetypes:
+        instance.save(path, instance.name, filetype=filetype, reduce_size=True)
+    return instance.name
+
+
+def features_task(source, filename):
+    """Extracts the features of a single instance, with its solution distance and generation parameters."""
+    instance = routing.load_instance(source+filename)
+    row = generation.extract_features_instance(instance)
+    row['distance'] = getattr(instance, 'solution_distance', None)
+    row.setdefault('variant', instance.variant)
+    for key, value in getattr(instance, 'gen_params', {}).items():
+        row.setdefault(key, value)
+    return row
+
+
+def input_files(step, root, shard, num_shards):
+    """Returns the input directory of a step and the files of it the shard works on."""
+    if step['internal']:
+        source = root + step['input']
+        return source, routing.dataset_files(source, step['filetype'])
+    files = routing.dataset_files(step['input'], step['filetype'])
+    return step['input'], [filename for filename in files if in_shard(filename, shard, num_shards)]
+
+
+def segment_keys(step, features):
+    """Returns the feature columns the evaluation segments are derived from ('size': num_customers)."""
+    keys = ['num_customers' if key == 'size' else key for key in (step['by'] or [])]
+    missing = [key for key in keys if key not in features]
+    if missing:
+        raise ValueError(f'The features lack the segment columns {missing} (set "by" of the evaluate step).')
+    return keys
+
+
+def evaluate_predictions(step, predictions, path):
+    """Evaluates predictions (overall and per segment) and saves the metrics table."""
+    import models
+    evaluator = models.streamingEvaluator(by=step['by'], bootstrap=step['bootstrap'])
+    evaluator.update(predictions['y_true'], predictions['y_pred'], predictions if step['by'] else None)
+    evaluator.results().to_csv(path+EVALUATION_FILE, index=False)
+    return None
+
+
+def read_marker(filename):
+    """Reads a completion marker (None if it does not exist)."""
+    if not os.path.exists(filename):
+        return None
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def write_marker(filename, marker):
+    """Writes a completion marker atomically (a crash never leaves a partial marker behind)."""
+    with open(filename+'.tmp', 'w') as f:
+        json.dump(marker, f, indent=4)
+    os.replace(filename+'.tmp', filename)
+    return None
@@ -4,4 +4,8 @@ Author: Jens Mueller
 Python Version: 3.9.7
 """
 
-from .model_evaluation import *
\ No newline at end of file
+from .model_evaluation import *
+from .predictor import distancePredictor
+from .streaming_evaluation import streamingEvaluator
+from .approximation import approximationEstimator
+from .export import export_model, load_exported, check_parity
\ No newline at end of file
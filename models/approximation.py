@@ -0,0 +1,124 @@
+""" A module for continuous-approximation estimators of the solution distance (closed-form terms, least-squares fit)."""
+
+import routing
+import time
+import numpy as np
+from .model_evaluation import evaluate
+
+
+TERMS = ['intercept', 'sqrt_nA', 'line_haul', 'num_vehicles']
+
+# Terms of an instance with n customers in a bounding box of area A, mean depot distance r and m vehicles
+# (Beardwood et al., 1959; Daganzo, 1984):  d ~ b0 + b1 sqrt(nA) + b2 2rm + b3 m
+# All terms are computed from the concatenated arrays of a routingBatch, so no per-instance Python code runs.
+
+
+class approximationEstimator:
+    """A class to estimate solution distances with continuous approximation formulas fitted by least squares."""
+
+    def __init__(
+        self,
+        terms=TERMS     # (list) - terms of the formula (subset of TERMS)
+    ):
+        """Initializes an unfitted estimator."""
+        unknown = [term for term in terms if term not in TERMS]
+        if unknown:
+            raise ValueError(f'Unknown terms {unknown} (choose from {TERMS}).')
+        self.terms = list(terms)
+        self.coef_ = None
+
+    def fit(
+        self,
+        X,              # (routingBatch/list) - routing instances
+        y=None          # (np.array)          - solution distances (default: the solution_distance of the instances)
+    ):  # -> Returns: self
+        """Fits the coefficients of the terms by least squares."""
+        batch = as_batch(X)
+        if y is None:
+            if batch.solution_distance is None:
+                raise ValueError('The instances have no solution_distance: pass the labels as y.')
+            y = batch.solution_distance
+        y = np.asarray(y, dtype=float)
+        T = self.transform(batch)
+        known = ~np.isnan(y)
+        self.coef_ = np.linalg.lstsq(T[known], y[known], rcond=None)[0]
+        return self
+
+    def predict(
+        self,
+        X               # (routingBatch/list) - routing instances
+    ):  # -> Returns: np.array of the estimated solution distances
+        """Estimates the solution distances of routing instances."""
+        if self.coef_ is None:
+            raise ValueError('The estimator is not fitted yet (call fit first).')
+        return self.transform(X) @ self.coef_
+
+    def transform(
+        self,
+        X               # (routingBatch/list) - routing instances
+    ):  # -> Returns: np.array of shape (num_instances, num_terms)
+        """Computes the terms of the formula for each instance."""
+        terms = approximation_terms(as_batch(X))
+        return np.column_stack([terms[term] for term in self.terms])
+
+    def benchmark(
+        self,
+        X,              # (routingBatch/list) - routing instances with solution distances (e.g. the GLS labels)
+        y=None          # (np.array)          - solution distances (default: the solution_distance of the instances)
+    ):  # -> Returns: np.array of the estimated solution distances
+        """Prints the scoring time and the model evaluation (see model_evaluation.py) against the labels."""
+        batch = as_batch(X)
+        y = batch.solution_distance if y is None else np.asarray(y, dtype=float)
+        start = time.perf_counter()
+        y_pred = self.predict(batch)
+        elapsed = time.perf_counter() - start
+        print(f'Scored {len(batch)} instances in {elapsed:.3f} s ({1e6 * elapsed / max(1, len(batch)):.2f} us per instance)')
+        known = ~np.isnan(y)
+        evaluate(y[known], y_pred[known])
+        return y_pred
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def as_batch(X):
+    """Returns X as a routingBatch (lists of instances are converted once)."""
+    return X if isinstance(X, routing.routingBatch) else routing.routingBatch.frominstances(X)
+
+
+def approximation_terms(batch):
+    """Computes all terms of TERMS for each instance of a batch (vectorized over the concatenated arrays)."""
+    num_instances = len(batch)
+    counts = np.diff(batch.offsets)
+    n = counts - 1
+    starts = batch.offsets[:-1]
+    x, y = np.asarray(batch.locations, dtype=float).T
+    # Mean depot distance of the customers (the depot's own distance is 0)
+    dx = np.abs(x - np.repeat(x[starts], counts))
+    dy = np.abs(y - np.repeat(y[starts], counts))
+    dist = dx + dy if batch.distance_metric == 'manhattan' else np.hypot(dx, dy)
+    r = np.add.reduceat(dist, starts) / np.maximum(n, 1)
+    # Bounding box area of the customers: reducing at [start+1, next start, ...] gives the customer segments at
+    # even positions (odd positions are the single depots), so no customer array has to be copied.
+    bounds = np.empty(2 * num_instances - 1, dtype=np.int64)
+    bounds[0::2] = np.minimum(starts + 1, len(x) - 1)
+    bounds[1::2] = starts[1:]
+    width = np.maximum.reduceat(x, bounds)[0::2] - np.minimum.reduceat(x, bounds)[0::2]
+    height = np.maximum.reduceat(y, bounds)[0::2] - np.minimum.reduceat(y, bounds)[0::2]
+    area = np.where(n > 0, width * height, 0.0)
+    # Number of vehicles needed by capacity (one route for instances without demands)
+    if batch.demands is not None and batch.vehicle_capacities is not None:
+        demand = np.add.reduceat(np.asarray(batch.demands, dtype=float), starts)
+        num_vehicles = np.diff(batch.vehicle_offsets)
+        capacity = np.add.reduceat(np.asarray(batch.vehicle_capacities, dtype=float), batch.vehicle_offsets[:-1])
+        m = np.maximum(np.ceil(demand * np.maximum(num_vehicles, 1) / np.maximum(capacity, 1e-12)), 1.0)
+    else:
+        m = np.ones(num_instances)
+    return {
+        'intercept': np.ones(num_instances),
+        'sqrt_nA': np.sqrt(n * area),
+        'line_haul': 2 * r * m,
+        'num_vehicles': m,
+    }
@@ -0,0 +1,319 @@
+""" A module to export trained estimators to plain NumPy arrays (.npz) and to serve them with NumPy only.
+
+Exported models are a sequence of steps applied to the feature matrix:
+    affine - x * scale + offset (StandardScaler, keras Normalization)
+    poly   - polynomial features (PolynomialFeatures: product of x**powers)
+    linear - x @ coef + intercept (linear models)
+    mlp    - dense layers with activations (MLPRegressor, keras Dense layers)
+    trees  - flattened node arrays of all trees (random forests, gradient boosting, xgboost)
+
+Loading (load_exported) only imports numpy and json: scikit-learn, xgboost and tensorflow are needed for exporting only."""
+
+import json
+import numpy as np
+
+
+EXPORT_VERSION = 1
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'identity': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 1 / (1 + np.exp(-x)),
+    'logistic': lambda x: 1 / (1 + np.exp(-x)),
+    'softplus': lambda x: np.logaddexp(0, x),
+    'elu': lambda x: np.where(x > 0, x, np.expm1(np.minimum(x, 0))),
+}
+
+
+class exportedModel:
+    """A class to predict with an exported model (NumPy forward pass and vectorized tree traversal)."""
+
+    def __init__(
+        self,
+        steps,              # (list) - step descriptions (kind and parameters)
+        arrays,             # (list) - one dict of arrays per step
+        feature_names=None  # (list) - training feature columns
+    ):
+        """Initializes the model from its steps."""
+        self.steps = steps
+        self.arrays = arrays
+        self.feature_names = feature_names
+        if feature_names is not None:
+            self.feature_names_in_ = np.array(feature_names, dtype=object)
+
+    def predict(self, X):
+        """Predicts the targets of a feature matrix (DataFrames are reordered to the training columns)."""
+        if self.feature_names is not None and hasattr(X, 'columns'):
+            X = X[self.feature_names]
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        for step, arrays in zip(self.steps, self.arrays):
+            X = STEPS[step['kind']](step, arrays, X)
+        return X.reshape(-1) if X.ndim == 2 and X.shape[1] == 1 else X
+
+
+def export_model(
+    model,              # (object) - trained estimator (scikit-learn, xgboost, or keras model; pipelines of supported steps)
+    filename,           # (str)    - file to save the exported model to (.npz)
+    feature_names=None  # (list)   - training feature columns (default: model.feature_names_in_)
+):  # -> Returns: exportedModel
+    """Exports a trained estimator to plain arrays in a single .npz file."""
+    if feature_names is None and hasattr(model, 'feature_names_in_'):
+        feature_names = [str(name) for name in model.feature_names_in_]
+    steps, arrays = [], []
+    for step, step_arrays in convert(model):
+        steps.append(step)
+        arrays.append(step_arrays)
+    meta = {'version': EXPORT_VERSION, 'steps': steps, 'feature_names': feature_names}
+    flat = {f'{i}.{name}': value for i, step_arrays in enumerate(arrays) for name, value in step_arrays.items()}
+    np.savez(filename, meta=np.array(json.dumps(meta)), **flat)
+    return exportedModel(steps, arrays, feature_names)
+
+
+def load_exported(
+    filename    # (str) - exported model (.npz, see export_model)
+):  # -> Returns: exportedModel
+    """Loads an exported model (needs NumPy only)."""
+    with np.load(filename, allow_pickle=False) as data:
+        meta = json.loads(str(data['meta']))
+        if meta['version'] > EXPORT_VERSION:
+            raise ValueError(f'{filename} was exported with a newer format (version {meta["version"]}).')
+        arrays = [{} for _ in meta['steps']]
+        for key in data.files:
+            if key != 'meta':
+                i, name = key.split('.', 1)
+                arrays[int(i)][name] = data[key]
+    return exportedModel(meta['steps'], arrays, meta['feature_names'])
+
+
+def check_parity(
+    model,          # (object)        - original trained estimator
+    exported,       # (exportedModel) - exported model (or the filename of the .npz)
+    X,              # (np.array)      - feature matrix to compare the predictions on
+    rtol=1e-6,      # (float)         - relative tolerance
+    atol=1e-6       # (float)         - absolute tolerance
+):  # -> Returns: dict with the maximum absolute and relative differences and whether all are within the tolerance
+    """Compares the predictions of an exported model with those of the original estimator."""
+    if isinstance(exported, str):
+        exported = load_exported(exported)
+    y_model = np.asarray(model.predict(X), dtype=float).reshape(-1)
+    y_exported = np.asarray(exported.predict(X), dtype=float).reshape(-1)
+    diff = np.abs(y_model - y_exported)
+    return {
+        'max_abs_diff': float(diff.max()) if diff.size else 0.0,
+        'max_rel_diff': float((diff / np.maximum(np.abs(y_model), np.finfo(float).eps)).max()) if diff.size else 0.0,
+        'ok': bool(np.allclose(y_exported, y_model, rtol=rtol, atol=atol)),
+    }
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def convert(model):
+    """Yields the (step, arrays) of a trained estimator (recursing into pipelines)."""
+    name = type(model).__name__
+    if hasattr(model, 'steps'):  # scikit-learn Pipeline
+        for _, estimator in model.steps:
+            if estimator is not None and estimator != 'passthrough':
+                yield from convert(estimator)
+    elif name == 'StandardScaler':
+        scale = 1 / model.scale_ if model.scale_ is not None else np.ones_like(model.mean_)
+        offset = -model.mean_ * scale if model.mean_ is not None else np.zeros_like(scale)
+        yield {'kind': 'affine'}, {'scale': scale, 'offset': offset}
+    elif name == 'PolynomialFeatures':
+        yield {'kind': 'poly'}, {'powers': np.asarray(model.powers_)}
+    elif hasattr(model, 'coefs_') and hasattr(model, 'intercepts_'):  # MLPRegressor
+        activations = [model.activation] * (len(model.coefs_) - 1) + [model.out_activation_]
+        yield mlp_step(model.coefs_, model.intercepts_, activations)
+    elif hasattr(model, 'coef_') and hasattr(model, 'intercept_'):  # linear models
+        coef = np.asarray(model.coef_, dtype=float)
+        yield {'kind': 'linear'}, {'coef': coef.T if coef.ndim == 2 else coef[:, None],
+                                   'intercept': np.atleast_1d(np.asarray(model.intercept_, dtype=float))}
+    elif hasattr(model, 'tree_') or hasattr(model, 'estimators_') or hasattr(model, '_predictors'):
+        yield sklearn_trees(model)
+    elif hasattr(model, 'get_booster'):  # xgboost scikit-learn interface
+        yield xgboost_trees(model.get_booster())
+    elif name == 'Booster':
+        yield xgboost_trees(model)
+    elif hasattr(model, 'layers'):  # keras model
+        yield from keras_steps(model)
+    else:
+        raise ValueError(f'Cannot export models of type {name}.')
+
+
+def mlp_step(weights, biases, activations):
+    """Creates an mlp step from the weights, biases and activation of each dense layer."""
+    unknown = [a for a in activations if a not in ACTIVATIONS]
+    if unknown:
+        raise ValueError(f'Cannot export activations {unknown}.')
+    arrays = {}
+    for i, (W, b) in enumerate(zip(weights, biases)):
+        arrays[f'W{i}'] = np.asarray(W, dtype=float)
+        arrays[f'b{i}'] = np.asarray(b, dtype=float)
+    return {'kind': 'mlp', 'activations': list(activations)}, arrays
+
+
+def keras_steps(model):
+    """Yields the steps of a keras model of Normalization and Dense layers."""
+    weights, biases, activations = [], [], []
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind == 'Dense':
+            W, b = layer.get_weights()
+            weights.append(W)
+            biases.append(b)
+            activations.append(layer.get_config()['activation'])
+        elif kind == 'Normalization':
+            if weights:
+                yield mlp_step(weights, biases, activations)
+                weights, biases, activations = [], [], []
+            mean = np.asarray(layer.mean, dtype=float).reshape(-1)
+            scale = 1 / np.sqrt(np.maximum(np.asarray(layer.variance, dtype=float).reshape(-1), 1e-7))
+            yield {'kind': 'affine'}, {'scale': scale, 'offset': -mean * scale}
+        elif kind not in ('InputLayer', 'Dropout', 'Flatten'):
+            raise ValueError(f'Cannot export keras layers of type {kind}.')
+    if weights:
+        yield mlp_step(weights, biases, activations)
+
+
+def tree_step(trees, base=0.0, weight=1.0, strict=False):
+    """Creates a trees step by concatenating the node arrays of all trees.
+
+    trees: list of dicts with the node arrays feature, threshold, left, right, value and missing_left
+    (left/right: -1 at leaves). The prediction is base + weight * sum of the reached leaf values."""
+    sizes = [len(tree['feature']) for tree in trees]
+    roots = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+    arrays = {name: np.concatenate([tree[name] for tree in trees]) for name in ['feature', 'threshold', 'value']}
+    arrays['missing_left'] = np.concatenate([tree['missing_left'] for tree in trees]).astype(bool)
+    leaf = np.concatenate([tree['left'] for tree in trees]) < 0
+    # Children become global indices; leaves point to themselves, so traversal can run a fixed number of steps.
+    for side in ['left', 'right']:
+        children = np.concatenate([tree[side] + root for tree, root in zip(trees, roots)]).astype(np.int64)
+        arrays[side] = np.where(leaf, np.arange(len(leaf)), children)
+    arrays['feature'] = np.where(leaf, 0, arrays['feature']).astype(np.int64)
+    arrays['roots'] = roots
+    depth = max(tree_depth(tree['left'], tree['right']) for tree in trees)
+    return {'kind': 'trees', 'depth': depth, 'base': float(base), 'weight': float(weight), 'strict': strict}, arrays
+
+
+def tree_depth(left, right):
+    """Returns the depth of a tree given by its child arrays (-1 at leaves)."""
+    depth, nodes = 0, np.array([0])
+    while True:
+        nodes = np.concatenate([left[nodes], right[nodes]])
+        nodes = nodes[nodes >= 0]
+        if nodes.size == 0:
+            return depth
+        depth += 1
+
+
+def sklearn_tree(tree):
+    """Returns the node arrays of a fitted scikit-learn tree (tree_ attribute)."""
+    return {'feature': tree.feature, 'threshold': tree.threshold, 'value': tree.value[:, 0, 0],
+            'left': tree.children_left, 'right': tree.children_right,
+            'missing_left': getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool))}
+
+
+def sklearn_trees(model):
+    """Returns the trees step of a scikit-learn tree model (decision tree, forests, gradient boosting)."""
+    name = type(model).__name__
+    if hasattr(model, 'tree_'):
+        return tree_step([sklearn_tree(model.tree_)])
+    if hasattr(model, '_predictors'):  # HistGradientBoostingRegressor
+        trees = []
+        for (predictor,) in model._predictors:
+            nodes = predictor.nodes
+            trees.append({'feature': nodes['feature_idx'], 'threshold': nodes['num_threshold'], 'value': nodes['value'],
+                          'left': np.where(nodes['is_leaf'], -1, nodes['left'].astype(np.int64)),
+                          'right': np.where(nodes['is_leaf'], -1, nodes['right'].astype(np.int64)),
+                          'missing_left': nodes['missing_go_to_left']})
+        return tree_step(trees, base=np.ravel(model._baseline_prediction)[0])
+    if name.startswith('GradientBoosting'):
+        if model.init_ == 'zero':
+            base = 0.0
+        elif hasattr(model.init_, 'constant_'):
+            base = np.ravel(model.init_.constant_)[0]
+        else:
+            raise ValueError('Cannot export gradient boosting with a custom init estimator.')
+        return tree_step([sklearn_tree(tree.tree_) for tree in np.ravel(model.estimators_)], base, model.learning_rate)
+    # Forests: average of the trees
+    return tree_step([sklearn_tree(tree.tree_) for tree in model.estimators_], weight=1 / len(model.estimators_))
+
+
+def xgboost_trees(booster):
+    """Returns the trees step of an xgboost booster (regression with a single output)."""
+    config = json.loads(booster.save_config())
+    base = float(config['learner']['learner_model_param']['base_score'].strip('[]'))
+    trees = []
+    for dump in booster.get_dump(dump_format='json'):
+        nodes = {}
+        stack = [json.loads(dump)]
+        while stack:
+            node = stack.pop()
+            nodes[node['nodeid']] = node
+            stack.extend(node.get('children', []))
+        size = max(nodes) + 1
+        tree = {'feature': np.full(size, -1), 'threshold': np.zeros(size), 'value': np.zeros(size),
+                'left': np.full(size, -1), 'right': np.full(size, -1), 'missing_left': np.zeros(size, dtype=bool)}
+        for i, node in nodes.items():
+            if 'leaf' in node:
+                tree['value'][i] = node['leaf']
+            else:
+                split = node['split']
+                tree['feature'][i] = int(split[1:]) if split[0] == 'f' and split[1:].isdigit() \
+                    else booster.feature_names.index(split)
+                tree['threshold'][i] = node['split_condition']
+                tree['left'][i], tree['right'][i] = node['yes'], node['no']
+                tree['missing_left'][i] = node['missing'] == node['yes']
+        trees.append(tree)
+    return tree_step(trees, base=base, strict=True)
+
+
+def predict_affine(step, arrays, X):
+    """Applies an affine step."""
+    return X * arrays['scale'] + arrays['offset']
+
+
+def predict_poly(step, arrays, X):
+    """Applies a polynomial features step."""
+    powers = arrays['powers']
+    return np.stack([np.prod(X ** p, axis=1) for p in powers], axis=1)
+
+
+def predict_linear(step, arrays, X):
+    """Applies a linear step."""
+    return X @ arrays['coef'] + arrays['intercept']
+
+
+def predict_mlp(step, arrays, X):
+    """Applies an mlp step (dense layers)."""
+    for i, activation in enumerate(step['activations']):
+        X = ACTIVATIONS[activation](X @ arrays[f'W{i}'] + arrays[f'b{i}'])
+    return X
+
+
+def predict_trees(step, arrays, X):
+    """Traverses all trees for all rows at once (one vectorized step per tree level)."""
+    feature, threshold, left, right = arrays['feature'], arrays['threshold'], arrays['left'], arrays['right']
+    X = np.ascontiguousarray(X)
+    flat = X.reshape(-1)
+    row_starts = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+    missing = bool(np.isnan(flat).any())
+    node = np.repeat(arrays['roots'][None, :], X.shape[0], axis=0)
+    for _ in range(step['depth']):
+        x = flat[row_starts + feature[node]]
+        t = threshold[node]
+        go_left = x < t if step['strict'] else x <= t
+        if missing:
+            go_left = np.where(np.isnan(x), arrays['missing_left'][node], go_left)
+        node = np.where(go_left, left[node], right[node])
+    return step['base'] + step['weight'] * arrays['value'][node].sum(axis=1)
+
+
+STEPS = {'affine': predict_affine, 'poly': predict_poly, 'linear': predict_linear, 'mlp': predict_mlp,
+         'trees': predict_trees}
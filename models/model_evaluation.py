@@ -1,15 +1,14 @@
 """ A module to evaluate model performance:"""
 
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.metrics import mean_squared_error
-from sklearn.metrics import mean_absolute_error
-from sklearn.metrics import mean_absolute_percentage_error
-from sklearn.metrics import r2_score
 
 
 def evaluate(y_true, y_pred, mse=True, rmse=True, mae=True, mape=True, r2=True):
     """Prints and plots a model evaluation:"""
+    from sklearn.metrics import mean_squared_error # imported at first use (slow import, not needed for predictions)
+    from sklearn.metrics import mean_absolute_error
+    from sklearn.metrics import mean_absolute_percentage_error
+    from sklearn.metrics import r2_score
 
     print("Model performance")
     print("--------------------------------------")
@@ -28,6 +27,7 @@ def evaluate(y_true, y_pred, mse=True, rmse=True, mae=True, mape=True, r2=True):
     
 def plot_performance(y_true, y_pred):
     """Plots model performance."""
+    import matplotlib.pyplot as plt
 
     residuals = y_true - y_pred
     fig, axs = plt.subplots(1, 3, figsize=(12,4))
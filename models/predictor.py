@@ -0,0 +1,173 @@
+""" A module to serve a trained distance estimator: batched feature extraction, pinned feature schema, micro-batching."""
+
+import routing
+import generation
+import pickle
+import queue
+import threading
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+
+class distancePredictor:
+    """A class to predict solution distances for batches of routing instances with a trained estimator."""
+
+    @classmethod
+    def load(
+        cls,
+        path,               # (str)  - saved model (.pkl/.dill: pickled estimator, directory: keras model)
+        feature_names=None, # (list) - training feature columns (default: stored in the estimator)
+        **kwargs            # (dict) - further arguments of distancePredictor
+    ):  # -> Returns: distancePredictor
+        """Loads a trained estimator once and wraps it in a predictor."""
+        if path.endswith('.pkl') or path.endswith('.pickle') or path.endswith('.dill'):
+            try:
+                import dill as loader # the thesis models were saved with dill (lambdas in pipelines)
+            except ImportError:
+                loader = pickle
+            with open(path, 'rb') as f:
+                model = loader.load(f)
+        else:
+            import tensorflow as tf
+            model = tf.keras.models.load_model(path)
+        return cls(model, feature_names, **kwargs)
+
+    def __init__(
+        self,
+        model,              # (object) - trained estimator with a predict method (scikit-learn, keras, or callable)
+        feature_names=None, # (list)   - training feature columns (default: model.feature_names_in_)
+        batch_size=256,     # (int)    - maximum micro-batch size of submitted requests
+        max_delay=0.005,    # (float)  - maximum seconds a submitted request waits for a micro-batch to fill
+        workers=1,          # (int)    - number of processes extracting features (large batches only)
+        history=10000       # (int)    - number of recent latencies kept for the percentiles
+    ):
+        """Initializes the predictor with the feature schema the estimator was trained on."""
+        self.model = model
+        if feature_names is None:
+            feature_names = getattr(model, 'feature_names_in_', None)
+        if feature_names is None:
+            raise ValueError('The feature schema is unknown: pass the training feature columns as feature_names.')
+        self.feature_names = [str(name) for name in feature_names]
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.workers = workers
+        self.latencies = deque(maxlen=history)
+        self.lock = threading.Lock()
+        self.requests = None
+        self.thread = None
+        self.executor = None # feature extraction processes (started at the first large batch, kept until close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def features(self, X):
+        """Returns the feature matrix of a batch in the training column order."""
+        import pandas as pd # imported at first use (slow import, not needed to load exported models)
+        if isinstance(X, routing.routingInstance):
+            X = [X]
+        if isinstance(X, routing.routingBatch) or (
+                isinstance(X, (list, tuple)) and len(X) and isinstance(X[0], routing.routingInstance)):
+            X = self.extract(list(X))
+        if isinstance(X, pd.DataFrame):
+            missing = [name for name in self.feature_names if name not in X.columns]
+            if missing:
+                raise ValueError(f'Missing features: {missing}')
+            return X[self.feature_names].to_numpy(dtype=float)
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != len(self.feature_names):
+            raise ValueError(f'Expected {len(self.feature_names)} features per row, got {X.shape[1]}.')
+        return X
+
+    def extract(self, instances):
+        """Extracts the features of routing instances (in parallel for large batches)."""
+        import pandas as pd
+        if self.workers > 1 and len(instances) >= 4 * self.workers:
+            if self.executor is None:
+                with self.lock:
+                    if self.executor is None:
+                        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            rows = list(self.executor.map(generation.extract_features_instance, instances,
+                                          chunksize=max(1, len(instances) // (4 * self.workers))))
+        else:
+            rows = [generation.extract_features_instance(instance) for instance in instances]
+        return pd.DataFrame(rows)
+
+    def predict(self, X):
+        """Predicts the solution distances of a batch (routing instances, routingBatch, DataFrame, or feature array)."""
+        t = time.perf_counter()
+        features = self.features(X)
+        if hasattr(self.model, 'feature_names_in_'):
+            import pandas as pd
+            features = pd.DataFrame(features, columns=self.feature_names) # avoids scikit-learn name warnings
+        predict = self.model.predict if hasattr(self.model, 'predict') else self.model
+        y_pred = np.asarray(predict(features), dtype=float).reshape(-1)
+        with self.lock:
+            self.latencies.append(time.perf_counter() - t)
+        return y_pred
+
+    def latency(self):
+        """Returns the p50 and p99 latencies of recent predict calls (in milliseconds)."""
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+        if latencies.size == 0:
+            return {'calls': 0, 'p50_ms': None, 'p99_ms': None}
+        return {'calls': latencies.size, 'p50_ms': float(np.percentile(latencies, 50)),
+                'p99_ms': float(np.percentile(latencies, 99))}
+
+    def submit(self, x):
+        """Submits a single instance (or feature row) from any thread; returns a Future of its distance estimate."""
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.requests = queue.Queue()
+                    self.thread = threading.Thread(target=self.serve, daemon=True)
+                    self.thread.start()
+        future = Future()
+        self.requests.put((x, future))
+        return future
+
+    def serve(self):
+        """Micro-batching loop (thread): collects submitted requests and predicts them together."""
+        while True:
+            item = self.requests.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.max_delay
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.requests.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.requests.put(None) # stop after this batch
+                    break
+                batch.append(item)
+            xs, futures = zip(*batch)
+            try:
+                if all(isinstance(x, routing.routingInstance) for x in xs):
+                    y_pred = self.predict(list(xs)) # features are extracted as one batch
+                else:
+                    y_pred = self.predict(np.vstack([self.features(x) for x in xs]))
+                for future, y in zip(futures, y_pred):
+                    future.set_result(float(y))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+
+    def close(self):
+        """Stops the micro-batching thread (pending requests are still answered) and the feature extraction processes."""
+        if self.thread is not None:
+            self.requests.put(None)
+            self.thread.join()
+            self.thread = None
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
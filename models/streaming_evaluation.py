@@ -0,0 +1,219 @@
+""" A module to evaluate model performance in one pass over chunks (segmented by generation parameters, bootstrap CIs)."""
+
+import warnings
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+
+STATS = ['n', 'sum_y', 'sum_y2', 'sse', 'sae', 'sape']  # weighted sums accumulated per replicate and segment
+SIZE_BINS = (0, 25, 50, 100, 200, 500, 1000, np.inf)    # default num_customers buckets of the 'size' segment
+MISSING = object()  # stands in for missing segment values while factorizing (pandas < 1.5 has no use_na_sentinel)
+
+
+class streamingEvaluator:
+    """A class to accumulate MSE, RMSE, MAE, MAPE and R2 over chunks of predictions without keeping them."""
+
+    def __init__(
+        self,
+        by=('variant', 'loc_distr', 'size'), # (tuple) - segment columns ('size': num_customers bucket, None: no segments)
+        size_bins=SIZE_BINS,                 # (tuple) - num_customers bucket edges of the 'size' segment
+        bootstrap=0,                         # (int)   - number of (Poisson) bootstrap replicates (0: no CIs)
+        workers=4,                           # (int)   - number of threads accumulating the bootstrap replicates
+        seed=0                               # (int)   - seed of the bootstrap weights (use different seeds for
+                                             #           evaluators which are merged later)
+    ):
+        """Initializes an empty accumulator."""
+        self.by = tuple(by) if by else ()
+        self.size_bins = np.asarray(size_bins, dtype=float)
+        self.bootstrap = bootstrap
+        self.workers = workers
+        self.seed = np.random.SeedSequence(seed)
+        self.chunks = 0     # number of chunks added (with the replicate, it selects the bootstrap weights generator)
+        self.segments = {}  # segment key -> column of self.stats
+        self.stats = np.zeros((1 + bootstrap, 0, len(STATS)))  # (replicate, segment, stat); replicate 0: all data
+        self.shift = None   # y is accumulated relative to the first chunk's mean (keeps the R2 sums well-conditioned)
+
+    def update(
+        self,
+        y_true,         # (np.array) - true values of the chunk
+        y_pred,         # (np.array) - predicted values of the chunk
+        segments=None   # (pd.DataFrame/dict/list) - segment columns of the chunk rows (e.g. load_dataset info='combined'),
+                        #                            or gen_params dicts / routing instances, one per row
+    ):  # -> Returns: self
+        """Adds a chunk of predictions to the accumulated metrics."""
+        y_true = np.asarray(y_true, dtype=float).reshape(-1)
+        y_pred = np.asarray(y_pred, dtype=float).reshape(-1)
+        if y_true.shape != y_pred.shape:
+            raise ValueError(f'y_true and y_pred differ in length ({y_true.size} vs {y_pred.size}).')
+        if y_true.size == 0:
+            return self
+        if self.shift is None:
+            self.shift = float(y_true.mean())
+        chunk = self.chunks
+        self.chunks += 1
+        idx = self.segment_index(segments, y_true.size)
+        y = y_true - self.shift
+        e = y_true - y_pred
+        values = np.stack([np.ones_like(y), y, y**2, e**2, np.abs(e),
+                           np.abs(e) / np.maximum(np.abs(y_true), np.finfo(float).eps)])
+        num_segments = len(self.segments)
+        sums = np.zeros((1 + self.bootstrap, num_segments, len(STATS)))
+        sums[0] = weighted_sums(idx, values, None, num_segments)
+        if self.bootstrap:
+            # Each (chunk, replicate) pair gets its own generator, so the workers only split the work and the
+            # results do not depend on their number.
+            blocks = np.array_split(np.arange(1, 1 + self.bootstrap), max(1, min(self.workers, self.bootstrap)))
+            def accumulate(block):
+                seeds = [np.random.SeedSequence(self.seed.entropy, spawn_key=(chunk, r)) for r in block]
+                weights = np.stack([np.random.default_rng(seed).poisson(1.0, y.size) for seed in seeds])
+                sums[block] = weighted_sums(idx, values, weights, num_segments)
+            if self.workers > 1 and len(blocks) > 1:
+                with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    list(executor.map(accumulate, blocks))
+            else:
+                for block in blocks:
+                    accumulate(block)
+        self.stats = self.stats + sums
+        return self
+
+    def merge(self, other):
+        """Adds the accumulated metrics of another evaluator (e.g. of another process or shard)."""
+        if other.bootstrap != self.bootstrap or other.by != self.by:
+            raise ValueError('Only evaluators with the same segments and number of replicates can be merged.')
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.shift = other.shift
+        self.chunks += other.chunks
+        stats = rebase(other.stats, other.shift - self.shift)
+        for key, i in other.segments.items():
+            j = self.segments.setdefault(key, len(self.segments))
+            if j == self.stats.shape[1]:
+                self.stats = np.concatenate([self.stats, np.zeros_like(self.stats[:, :1])], axis=1)
+            self.stats[:, j] += stats[:, i]
+        return self
+
+    def results(
+        self,
+        segments=True,  # (bool)  - include one row per segment (otherwise only the overall row)
+        alpha=0.05      # (float) - significance level of the bootstrap confidence intervals
+    ):  # -> Returns: pd.DataFrame with one row per segment ('all' first), metrics and CI bounds as columns
+        """Computes the metrics from the accumulated sums."""
+        import pandas as pd # imported at first use (slow import, not needed to load exported models)
+        keys = [('all',) * max(1, len(self.by))]
+        stats = [self.stats.sum(axis=1)]
+        if segments and self.by:
+            order = sorted(self.segments, key=lambda key: [str(k) for k in key])
+            keys += order
+            stats += [self.stats[:, self.segments[key]] for key in order]
+        stats = np.stack(stats, axis=1)  # (replicate, row, stat)
+        metrics = compute_metrics(stats)
+        df = pd.DataFrame(list(keys), columns=list(self.by) or ['segment'])
+        for name, values in metrics.items():
+            df[name] = values[0].astype(int) if name == 'n' else values[0]
+            if self.bootstrap and name != 'n':
+                with warnings.catch_warnings(): # all-NaN rows (e.g. R2 of a constant segment) stay NaN
+                    warnings.simplefilter('ignore', RuntimeWarning)
+                    df[name+'_low'] = np.nanquantile(values[1:], alpha/2, axis=0)
+                    df[name+'_high'] = np.nanquantile(values[1:], 1-alpha/2, axis=0)
+        return df
+
+    def report(self, alpha=0.05):
+        """Prints the overall metrics (as evaluate in model_evaluation.py, with CIs if bootstrapped)."""
+        row = self.results(segments=False, alpha=alpha).iloc[0]
+        print("Model performance")
+        print("--------------------------------------")
+        for name, label, scale, unit in [('mse', 'MSE', 1, ''), ('rmse', 'RMSE', 1, ''), ('mae', 'MAE', 1, ''),
+                                         ('mape', 'MAPE', 100, '%'), ('r2', 'R2', 1, '')]:
+            line = '{}: {}{}'.format(label, round(scale * row[name], 2), unit)
+            if self.bootstrap:
+                line += ' [{}, {}]'.format(round(scale * row[name+'_low'], 2), round(scale * row[name+'_high'], 2))
+            print(line)
+        print("\n")
+
+    def segment_index(self, segments, num_rows):
+        """Maps the rows of a chunk to segment columns of self.stats (new segments are added)."""
+        if not self.by:
+            keys = [()]
+            inverse = np.zeros(num_rows, dtype=np.intp)
+        else:
+            if segments is None:
+                raise ValueError(f'Segment columns {self.by} are required (or create the evaluator with by=None).')
+            columns = segment_columns(segments, self.by, self.size_bins)
+            codes, uniques = zip(*(factorize(col) for col in columns))
+            combined = np.ravel_multi_index(codes, [len(u) for u in uniques]) if len(codes) > 1 else codes[0]
+            first, inverse = np.unique(combined, return_inverse=True)
+            keys = [tuple(u[c] for u, c in zip(uniques, np.unravel_index(f, [len(u) for u in uniques])))
+                    for f in first]
+        mapping = np.array([self.segments.setdefault(key, len(self.segments)) for key in keys], dtype=np.intp)
+        missing = len(self.segments) - self.stats.shape[1]
+        if missing:
+            self.stats = np.concatenate([self.stats, np.zeros((self.stats.shape[0], missing, len(STATS)))], axis=1)
+        return mapping[inverse]
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def segment_columns(segments, by, size_bins):
+    """Returns one array per segment column (the 'size' bucket is derived from num_customers)."""
+    if isinstance(segments, (list, tuple)):
+        rows = [s if isinstance(s, dict) else {**s.gen_params, 'variant': s.variant} for s in segments]
+        segments = {key: [row.get(key) for row in rows] for key in ['num_customers' if k == 'size' else k for k in by]}
+    columns = []
+    for key in by:
+        if key == 'size':
+            num_customers = np.asarray(segments['num_customers'], dtype=float)
+            bucket = np.digitize(num_customers, size_bins[1:-1], right=True)
+            labels = [f'{size_bins[i]:g}-{size_bins[i+1]:g}' for i in range(len(size_bins) - 1)]
+            columns.append(np.array(labels, dtype=object)[bucket])
+        else:
+            columns.append(np.asarray(segments[key], dtype=object))
+    return columns
+
+
+def factorize(col):
+    """Encodes a column as codes and unique values (missing values form one segment, None; pandas 1.3 compatible)."""
+    import pandas as pd
+    col = pd.Series(col, dtype=object)
+    missing = col.isna()
+    codes, uniques = pd.factorize(col.mask(missing, MISSING))
+    return codes, np.array([None if u is MISSING else u for u in uniques], dtype=object)
+
+
+def weighted_sums(idx, values, weights, num_segments):
+    """Sums the per-row values per segment, once per replicate weight row (weights None: a single unweighted sum)."""
+    if weights is None:
+        return np.stack([np.bincount(idx, v, minlength=num_segments) for v in values], axis=-1)
+    # Replicate r and segment s are flattened into bin r*num_segments+s (one bincount per statistic)
+    bins = (np.arange(weights.shape[0])[:, None] * num_segments + idx).reshape(-1)
+    return np.stack([np.bincount(bins, (weights * v).reshape(-1), minlength=weights.shape[0] * num_segments)
+                     for v in values], axis=-1).reshape(weights.shape[0], num_segments, len(values))
+
+
+def rebase(stats, delta):
+    """Re-expresses sums of (y - shift) relative to shift - delta."""
+    stats = stats.copy()
+    n, sum_y = stats[..., 0], stats[..., 1]
+    stats[..., 2] = stats[..., 2] + 2 * delta * sum_y + delta**2 * n
+    stats[..., 1] = sum_y + delta * n
+    return stats
+
+
+def compute_metrics(stats):
+    """Computes the metrics from accumulated sums (any leading shape)."""
+    n, sum_y, sum_y2, sse, sae, sape = np.moveaxis(stats, -1, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sst = sum_y2 - sum_y**2 / n
+        # (near-)constant y: sst is cancellation noise of the order of eps * sum_y2, so R2 is undefined
+        defined = sst > 1e-12 * sum_y2
+        return {
+            'n': n,
+            'mse': sse / n,
+            'rmse': np.sqrt(sse / n),
+            'mae': sae / n,
+            'mape': sape / n,
+            'r2': np.where(defined, 1 - sse / sst, np.nan),
+        }
@@ -6,18 +6,32 @@ Python Version: 3.9.7
 MODULES:
 
     instance.py - Class to represent several types of routing problems (variants include TSP, CVRP, and CVRPTW).
+    batch.py    - Class to represent a batch of routing instances as concatenated arrays (struct-of-arrays).
     solve.py    - Solves a given routing problem (based on Google's open source project Operations Research Tools (ORTools)).
     plot.py     - Plots a given routing problem.
+    render.py   - Renders many routing problems to image files (headless, in parallel, optionally as contact sheets).
     save.py     - Saves a given routing problem or dataset (including benchmarks).
     load.py     - Loads a given routing problem or dataset (including benchmarks).
+    index.py    - Maintains a columnar metadata index of the instances saved to a directory.
+    shards.py   - Saves and loads sharded archives (many instances per file with an offset table).
+    codec.py    - Encodes instances in a compact binary format (native arrays, optional compression).
+    benchmarks.py - Loads the benchmark instances and solutions (Solomon and Gehring-Homberger) from the zip archive.
+    metrics.py  - Stage-level timers and counters (off by default, aggregated across worker processes).
     utils.py    - Contains useful helper functions (e.g. computation of the distance matrix)
 """
 
+from . import metrics
 from .instance import routingInstance
+from .batch import routingBatch
 from .solve import solve_instance, solve_dataset
-from .plot import plot_instance
+from .plot import plot_instance, draw_instance
+from .render import render_instances
 from .save import save_instance
 from .load import *
+from .index import *
+from .shards import shardWriter, shardReader, iter_shards, recover_shard
+from .codec import encode_instance, decode_instance, load_fields
+from .benchmarks import benchmark_names, benchmark_instance, iter_benchmarks, solomon_solutions, BENCHMARK_ZIP
 from .utils import *
 
 
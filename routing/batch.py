@@ -0,0 +1,143 @@
+""" A module containing the routingBatch class (struct-of-arrays storage for many routing instances).
+
+A batch can be saved as flat .npy files plus offsets and loaded memory-mapped, so materialising instance i
+only slices the mapped arrays (zero-copy) and many processes share the same page cache."""
+
+import routing
+import os
+import json
+import numpy as np
+
+
+BATCH_META = 'batch.json'   # variant, distance metric, and generation parameters of a saved batch (written last)
+
+
+class routingBatch:
+    """A class to represent a batch of routing instances as concatenated arrays with offsets."""
+
+    # Node attributes: one entry per location (depot included), instance i owns [offsets[i], offsets[i+1]).
+    node_attributes = ['locations', 'demands', 'service_times', 'time_windows']
+
+    @classmethod
+    def frominstances(cls, instances):
+        """Constructs a batch from a list of routing instances (all of the same variant)."""
+        instances = list(instances)
+        first = instances[0]
+        d = {'variant': first.variant, 'distance_metric': getattr(first, 'distance_metric', 'euclidean')}
+        d['offsets'] = np.concatenate(([0], np.cumsum([inst.locations.shape[0] for inst in instances])))
+        for attr in cls.node_attributes:
+            if hasattr(first, attr):
+                d[attr] = np.concatenate([getattr(inst, attr) for inst in instances])
+        if hasattr(first, 'vehicle_capacities'):
+            d['vehicle_offsets'] = np.concatenate(([0], np.cumsum([len(inst.vehicle_capacities) for inst in instances])))
+            d['vehicle_capacities'] = np.concatenate([inst.vehicle_capacities for inst in instances])
+        if hasattr(first, 'name'):
+            d['names'] = np.array([inst.name for inst in instances])
+        if any(hasattr(inst, 'solution_distance') for inst in instances):
+            d['solution_distance'] = np.array([getattr(inst, 'solution_distance', np.nan) for inst in instances], dtype=float)
+        if hasattr(first, 'gen_params'):
+            d['gen_params'] = {k: np.array([inst.gen_params.get(k) for inst in instances]) for k in first.gen_params}
+        return cls(**d)
+
+    def __init__(
+        self,
+        variant,                    # (str)      - type of routing problem (tsp, cvrp, or cvrptw)
+        offsets,                    # (np.array) - node offsets of each instance (length: num_instances+1)
+        locations,                  # (np.array) - concatenated 2D locations
+        distance_metric='euclidean',# (str)      - distance metric (euclidean or manhattan)
+        demands=None,               # (np.array) - concatenated demands
+        service_times=None,         # (np.array) - concatenated service times
+        time_windows=None,          # (np.array) - concatenated time windows
+        vehicle_offsets=None,       # (np.array) - vehicle offsets of each instance (length: num_instances+1)
+        vehicle_capacities=None,    # (np.array) - concatenated vehicle capacities
+        names=None,                 # (np.array) - instance names
+        gen_params=None,            # (dict)     - generation parameters (one array per parameter)
+        solution_distance=None      # (np.array) - solution distance of each instance
+    ):
+        """Initializes a batch from concatenated arrays."""
+        self.variant = variant
+        self.distance_metric = distance_metric
+        self.offsets = np.asarray(offsets)
+        self.locations = locations
+        self.demands = demands
+        self.service_times = service_times
+        self.time_windows = time_windows
+        self.vehicle_offsets = vehicle_offsets
+        self.vehicle_capacities = vehicle_capacities
+        self.names = names
+        self.gen_params = gen_params if gen_params is not None else {}
+        self.solution_distance = solution_distance
+
+    @classmethod
+    def load(
+        cls,
+        path,           # (str) - directory of the saved batch
+        mmap_mode='r'   # (str) - memory-map the arrays (r: read-only, c: copy-on-write, None: load into memory)
+    ):  # -> Returns: routingBatch whose arrays are backed by the files in path
+        """Loads a batch saved with routingBatch.save (memory-mapped, so only the accessed slices are read)."""
+        with open(path+BATCH_META, 'r') as f:
+            meta = json.load(f)
+        d = {'variant': meta['variant'], 'distance_metric': meta['distance_metric'],
+             'gen_params': {k: np.array(v) for k, v in meta['gen_params'].items()}}
+        for attr in meta['arrays']:
+            d[attr] = np.load(path+attr+'.npy', mmap_mode=mmap_mode)
+        return cls(**d)
+
+    def save(self, path):
+        """Saves the batch as one flat .npy file per array attribute (see routingBatch.load)."""
+        os.makedirs(path, exist_ok=True)
+        arrays = [attr for attr in ['offsets', *self.node_attributes, 'vehicle_offsets', 'vehicle_capacities',
+                                    'names', 'solution_distance'] if getattr(self, attr) is not None]
+        for attr in arrays:
+            np.save(path+attr+'.npy', np.ascontiguousarray(getattr(self, attr)))
+        meta = {'variant': self.variant, 'distance_metric': self.distance_metric, 'arrays': arrays,
+                'gen_params': {k: np.asarray(v).tolist() for k, v in self.gen_params.items()}}
+        # The metadata is written last (and atomically), so a batch directory is only loadable once complete.
+        with open(path+BATCH_META+'.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path+BATCH_META+'.tmp', path+BATCH_META)
+        return None
+
+    def __len__(self):
+        """Returns the number of instances in the batch."""
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        """Materialises the i-th routing instance of the batch."""
+        return self.instance(i)
+
+    def __iter__(self):
+        """Iterates over the materialised routing instances of the batch."""
+        for i in range(len(self)):
+            yield self.instance(i)
+
+    @property
+    def num_customers(self):
+        """Returns the number of customers of each instance."""
+        return np.diff(self.offsets) - 1
+
+    def instance(self, i, distance_matrix=False):
+        """Materialises the i-th routing instance of the batch (array attributes are views into the batch)."""
+        if i < 0:
+            i += len(self)
+        start, end = self.offsets[i], self.offsets[i+1]
+        d = {'variant': self.variant, 'distance_metric': self.distance_metric}
+        for attr in self.node_attributes:
+            if getattr(self, attr) is not None:
+                d[attr] = getattr(self, attr)[start:end]
+        if self.vehicle_capacities is not None:
+            d['vehicle_capacities'] = self.vehicle_capacities[self.vehicle_offsets[i]:self.vehicle_offsets[i+1]]
+        if self.names is not None:
+            d['name'] = str(self.names[i])
+        if self.gen_params:
+            d['gen_params'] = {k: v[i].item() if isinstance(v[i], np.generic) else v[i] for k, v in self.gen_params.items()}
+        if self.solution_distance is not None and not np.isnan(self.solution_distance[i]):
+            d['solution_distance'] = float(self.solution_distance[i])
+        instance = routing.routingInstance.fromdict(d)
+        if distance_matrix:
+            instance.compute_distance_matrix()
+        return instance
+
+    def to_instances(self, distance_matrix=False):
+        """Materialises all routing instances of the batch."""
+        return [self.instance(i, distance_matrix) for i in range(len(self))]
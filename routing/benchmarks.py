@@ -0,0 +1,134 @@
+""" A module for loading the benchmark instances and solutions (Solomon and Gehring-Homberger) from data/benchmarks.zip."""
+
+import routing
+import os
+import zipfile
+import functools
+import numpy as np
+
+
+BENCHMARK_ZIP = 'data/benchmarks.zip'  # default source (a directory containing benchmarks/ works as well)
+SOLOMON_SOLUTIONS = 'benchmarks/solomon_solutions/solomon_{}/'
+
+
+def benchmark_names(
+    family='solomon',       # (str) - benchmark family (solomon or gehring_homberger)
+    source=BENCHMARK_ZIP    # (str) - zip archive or directory containing benchmarks/
+):  # -> Returns: sorted list of instance names (as used by benchmark_instance)
+    """Lists the benchmark instances of a family."""
+    return sorted(name for name, member in benchmark_catalog(source).items() if f'/{family}_instances/' in '/'+member)
+
+
+def benchmark_instance(
+    name,                   # (str) - instance name (e.g. c101 or C1_2_1) or file name relative to source
+    num_customers=25,       # (int) - number of customers (the first num_customers of the file)
+    source=BENCHMARK_ZIP    # (str) - zip archive or directory containing benchmarks/
+):  # -> Returns: routing instance object
+    """Loads a benchmark instance (each file is read and parsed only once, customer counts are slices)."""
+    member = benchmark_catalog(source).get(name.lower(), name)
+    title, capacity, nodes = parse_benchmark(source, member)
+    nodes = nodes[:num_customers+1]
+    d = {
+        'variant': 'cvrptw',
+        'name': title+'.'+str(num_customers),
+        'locations': nodes[:, 1:3].copy(),
+        'demands': nodes[:, 3].copy(),
+        'time_windows': nodes[:, 4:6].copy(),
+        'service_times': nodes[:, 6].copy(),
+        'vehicle_capacities': np.full(capacity[0], capacity[1]),
+    }
+    instance = routing.routingInstance.fromdict(d)
+    instance.compute_distance_matrix('euclidean')
+    return instance
+
+
+def iter_benchmarks(
+    family='solomon',               # (str)  - benchmark family (solomon or gehring_homberger)
+    num_customers=(25, 50, 100),    # (list) - customer counts to load of each instance
+    source=BENCHMARK_ZIP            # (str)  - zip archive or directory containing benchmarks/
+):  # -> Returns: generator of routing instance objects
+    """Iterates over all instances of a benchmark family in all requested customer counts."""
+    for name in benchmark_names(family, source):
+        for num in num_customers:
+            yield benchmark_instance(name, num, source)
+
+
+def solomon_solutions(
+    solution_accuracy='best_known', # (str) - optimal, heuristic, or best_known (optimal where known, else heuristic)
+    source=BENCHMARK_ZIP            # (str) - zip archive or directory containing benchmarks/
+):  # -> Returns: pd.DataFrame (a copy of the cached table)
+    """Loads the solutions to the benchmarks by Solomon (1987)."""
+    return cached_solutions(solution_accuracy, source).copy()
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+@functools.lru_cache(maxsize=None)
+def benchmark_catalog(source):
+    """Maps the lower-case instance names to their files (relative to source)."""
+    if source.endswith('.zip'):
+        with zipfile.ZipFile(source) as z:
+            members = z.namelist()
+    else:
+        members = [os.path.relpath(os.path.join(root, f), source).replace(os.sep, '/')
+                   for root, dirs, files in os.walk(source) for f in files]
+    return {os.path.basename(m).rsplit('.', 1)[0].lower(): m for m in members
+            if '_instances/' in m and m.lower().endswith('.txt')}
+
+
+def read_text(source, member):
+    """Reads a text file from a zip archive or a directory."""
+    if source.endswith('.zip'):
+        with zipfile.ZipFile(source) as z:
+            return z.read(member).decode('utf-8')
+    with open(os.path.join(source, member), 'r') as f:
+        return f.read()
+
+
+@functools.lru_cache(maxsize=None)
+def parse_benchmark(source, member):
+    """Parses a benchmark file into its title, (number of vehicles, capacity), and node table (one row per node)."""
+    lines = read_text(source, member).splitlines()
+    title = lines[0].split()[0]
+    capacity = tuple(int(v) for v in lines[4].split()[:2])
+    nodes = np.array(' '.join(lines[9:]).split(), dtype=int).reshape(-1, 7)
+    nodes.flags.writeable = False # shared by all customer-count slices
+    return title, capacity, nodes
+
+
+@functools.lru_cache(maxsize=None)
+def cached_solutions(solution_accuracy, source):
+    """Loads (and caches) a Solomon solution table."""
+    import pandas as pd # imported at first use (slow import, not needed to load benchmark instances)
+    if solution_accuracy == 'best_known':
+        opt = cached_solutions('optimal', source)
+        heu = cached_solutions('heuristic', source)
+        comb = pd.merge(opt, heu, on='name', how='outer')
+        known = comb['sol_opt_distance'].fillna('') != ''
+        best = pd.DataFrame({'name': comb['name']})
+        for col in ['vehicles', 'distance', 'authors']:
+            best[f'sol_best_{col}'] = comb[f'sol_opt_{col}'].where(known, comb[f'sol_heu_{col}'])
+        return best
+    folder = SOLOMON_SOLUTIONS.format(solution_accuracy)
+    if source.endswith('.zip'):
+        with zipfile.ZipFile(source) as z:
+            members = [m for m in z.namelist() if m.startswith(folder) and '/' not in m[len(folder):]]
+    else:
+        members = [folder+f for f in os.listdir(os.path.join(source, folder))]
+    frames = []
+    for member in sorted(m for m in members if m.endswith('.txt')):
+        # Records of 8 lines (name, NV, distance, authors, each followed by an empty line) after 2 header records.
+        lines = read_text(source, member).splitlines()[16:]
+        lines += [''] * (-len(lines) % 8)
+        records = np.char.strip(np.array(lines, dtype=str).reshape(-1, 8)[:, [0, 2, 4, 6]])
+        frames.append(pd.DataFrame(records, columns=['name', 'sol_vehicles', 'sol_distance', 'sol_authors']))
+    sol_df = pd.concat(frames, ignore_index=True)
+    if solution_accuracy == 'heuristic':
+        sol_df['name'] = sol_df['name'] + '.100'
+    sol_df = sol_df[(sol_df['name'] != '') & (sol_df['name'] != '.100')].reset_index(drop=True)
+    abr = solution_accuracy[:3]
+    sol_df.columns = ['name', f'sol_{abr}_vehicles', f'sol_{abr}_distance', f'sol_{abr}_authors']
+    return sol_df
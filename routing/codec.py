@@ -0,0 +1,125 @@
+""" A module for encoding routing instances in a compact binary format (native arrays, optional compression)."""
+
+import json
+import pickle
+import struct
+import zlib
+import numpy as np
+
+
+CODEC_MAGIC = b'RINST001'           # first bytes of an encoded instance
+HEADER = struct.Struct('<8sI')      # CODEC_MAGIC and length of the field table
+INT_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+
+# Layout: HEADER | field table (json) | field blobs
+# The field table maps each attribute to its blob (offset, length) and how to decode it: arrays are stored
+# with their raw bytes in the smallest lossless dtype (restored to the original dtype when decoding),
+# all other attributes are pickled, so every attribute round-trips with its exact type.
+
+
+def encode_instance(
+    instance,       # (object) - routingInstance object
+    exclude=(),     # (list)   - attributes not to encode (e.g. distance_matrix)
+    compress=6,     # (int)    - zlib compression level (0: no compression)
+    cached=True     # (bool)   - also encode derived attributes which are recomputed on access
+):  # -> Returns: bytes
+    """Encodes a routing instance (reads its attributes directly, no copy of the instance is made)."""
+    table = {}
+    blobs = []
+    offset = 0
+    for key, value in instance.to_dict(cached).items():
+        if key in exclude:
+            continue
+        if isinstance(value, np.ndarray) and value.dtype.kind in 'biuf':
+            stored = compact_array(value)
+            field = {'kind': 'array', 'dtype': value.dtype.str, 'stored': stored.dtype.str, 'shape': value.shape}
+            blob = np.ascontiguousarray(stored).tobytes()
+        else:
+            field = {'kind': 'pickle'}
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if compress:
+            compressed = zlib.compress(blob, compress)
+            if len(compressed) < len(blob):
+                field['zlib'] = True
+                blob = compressed
+        field['offset'], field['length'] = offset, len(blob)
+        table[key] = field
+        blobs.append(blob)
+        offset += len(blob)
+    table = json.dumps(table, separators=(',', ':')).encode('utf-8')
+    return b''.join([HEADER.pack(CODEC_MAGIC, len(table)), table, *blobs])
+
+
+def decode_instance(
+    data,           # (bytes) - encoded instance (see encode_instance)
+    fields=None     # (list)  - attributes to decode (None: all)
+):  # -> Returns: dict of the decoded attributes
+    """Decodes the attributes of an encoded routing instance (only the requested fields are decoded)."""
+    table, start = decode_table(data)
+    data = memoryview(data)
+    return {key: decode_field(table[key], data[start+table[key]['offset']:start+table[key]['offset']+table[key]['length']])
+            for key in (table if fields is None else fields) if key in table}
+
+
+def load_fields(
+    filename,       # (str)  - encoded instance file (.bin)
+    fields=None     # (list) - attributes to load (None: all)
+):  # -> Returns: dict of the decoded attributes
+    """Loads only the requested attributes of an encoded instance file (reads only their blobs)."""
+    with open(filename, 'rb') as f:
+        magic, table_length = HEADER.unpack(f.read(HEADER.size))
+        if magic != CODEC_MAGIC:
+            raise ValueError(f'{filename} is not an encoded routing instance.')
+        table = json.loads(f.read(table_length))
+        start = HEADER.size + table_length
+        loaded = {}
+        for key in (table if fields is None else fields):
+            if key in table:
+                f.seek(start + table[key]['offset'])
+                loaded[key] = decode_field(table[key], f.read(table[key]['length']))
+    return loaded
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def compact_array(a):
+    """Returns the array in the smallest dtype which represents all its values exactly."""
+    if a.size == 0:
+        return a
+    if a.dtype.kind == 'f':
+        if np.all(np.isfinite(a)) and np.array_equal(a, np.round(a)):
+            candidate = compact_array(a.astype(np.int64)) if np.abs(a).max() < 2**62 else a
+            if np.array_equal(candidate.astype(a.dtype), a):
+                return candidate
+        if a.dtype.itemsize > 4 and np.array_equal(a.astype(np.float32).astype(a.dtype), a, equal_nan=True):
+            return a.astype(np.float32)
+        return a
+    if a.dtype.kind in 'iu':
+        low, high = a.min(), a.max()
+        for dtype in INT_DTYPES:
+            if np.dtype(dtype).itemsize >= a.dtype.itemsize:
+                break
+            if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+                return a.astype(dtype)
+    return a
+
+
+def decode_table(data):
+    """Decodes the header and field table of an encoded instance."""
+    magic, table_length = HEADER.unpack_from(data)
+    if magic != CODEC_MAGIC:
+        raise ValueError('Data is not an encoded routing instance.')
+    return json.loads(bytes(data[HEADER.size:HEADER.size+table_length])), HEADER.size + table_length
+
+
+def decode_field(field, blob):
+    """Decodes a single attribute from its blob."""
+    if field.get('zlib'):
+        blob = zlib.decompress(blob)
+    if field['kind'] == 'array':
+        stored = np.frombuffer(blob, dtype=field['stored']).reshape(field['shape'])
+        return stored.astype(field['dtype']) # always a (writable) copy in the original dtype
+    return pickle.loads(blob)
@@ -0,0 +1,153 @@
+""" A module for maintaining a columnar metadata index (one row per saved instance file) of a directory."""
+
+import routing
+import os
+import json
+import numpy as np
+
+
+INDEX_LOG = 'index.jsonl'        # append-only log, one json row per save (written by save_instance)
+INDEX_TABLE = 'index.parquet'    # columnar snapshot (log rows are merged into it by compact_index)
+
+
+def index_row(instance, filename):
+    """Creates the index row (metadata only) of a saved instance."""
+    row = {
+        'name': getattr(instance, 'name', None),
+        'file': filename,
+        'filetype': filename.rsplit('.', 1)[-1],
+        'variant': getattr(instance, 'variant', None),
+        'num_customers': instance.locations.shape[0] - 1 if hasattr(instance, 'locations') else None,
+        'first_solution': getattr(instance, 'first_solution', None),
+        'local_search': getattr(instance, 'local_search', None),
+        'time_limit_m': getattr(instance, 'time_limit_m', None),
+        'solution_distance': getattr(instance, 'solution_distance', None),
+        'num_vehicles_used': (sum([1 for route in instance.solution_routes if len(route) > 2])
+                              if hasattr(instance, 'solution_routes') else None),
+    }
+    # generation parameters (as in load_dataset with info='combined')
+    for key, value in getattr(instance, 'gen_params', {}).items():
+        row.setdefault(key, value)
+    return row
+
+
+def append_index(path, row):
+    """Appends a row to the index log of a directory (a single small append, safe for concurrent writers, but not
+    while compact_index runs on the directory)."""
+    line = json.dumps(row, default=json_default) + '\n'
+    with open(path+INDEX_LOG, 'a') as f:
+        f.write(line)
+    return None
+
+
+def load_index(
+    path,           # (str)  - directory of the instances
+    compact=False   # (bool) - merge the log into the columnar snapshot first (only while nothing saves to path)
+):  # -> Returns: pd.DataFrame with one row per saved instance file
+    """Loads the metadata index of a directory (columnar snapshot plus rows logged since)."""
+    import pandas as pd # imported at first use (slow import, not needed to save or load instances)
+    if compact:
+        compact_index(path)
+    frames = []
+    if os.path.exists(path+INDEX_TABLE):
+        frames.append(pd.read_parquet(path+INDEX_TABLE))
+    if os.path.exists(path+INDEX_LOG) and os.path.getsize(path+INDEX_LOG) > 0:
+        frames.append(read_index_log(path+INDEX_LOG))
+    if not frames:
+        return pd.DataFrame(columns=['name', 'file', 'filetype'])
+    index = pd.concat(frames, ignore_index=True)
+    # a file (or instance in a shard) which was saved several times is indexed by its latest save
+    return index.drop_duplicates(subset=['file', 'name'], keep='last').reset_index(drop=True)
+
+
+def compact_index(path):
+    """Merges the index log of a directory into its columnar snapshot (run it while no writers are active: a row
+    appended to the log while it is moved aside can be lost)."""
+    import pandas as pd
+    if not os.path.exists(path+INDEX_LOG):
+        return None
+    # Move the log aside first, so saves after the move start a new log (a writer which opened the old log before
+    # the move still appends to it, which is why no writers may be active).
+    compacting = path+INDEX_LOG+'.compacting'
+    os.replace(path+INDEX_LOG, compacting)
+    frames = []
+    if os.path.exists(path+INDEX_TABLE):
+        frames.append(pd.read_parquet(path+INDEX_TABLE))
+    if os.path.getsize(compacting) > 0:
+        frames.append(read_index_log(compacting))
+    index = pd.concat(frames, ignore_index=True).drop_duplicates(subset=['file', 'name'], keep='last')
+    write_index_table(index.reset_index(drop=True), path)
+    os.remove(compacting)
+    return None
+
+
+def build_index(
+    path,                  # (str) - directory of the instances
+    filetypes=('pickle',)  # (tuple) - which file-types to index (pickle, json, txt, or shard)
+):  # -> Returns: pd.DataFrame, but also saves it as the columnar snapshot of path
+    """Builds the metadata index of an existing directory (loads every instance file once)."""
+    import pandas as pd
+    rows = []
+    for filename in sorted(os.listdir(path)):
+        if filename.rsplit('.', 1)[-1] in filetypes and not filename.startswith('index.'):
+            if filename.endswith('.shard'):
+                rows.extend(index_row(instance, filename) for instance in routing.shardReader(path+filename))
+            else:
+                rows.append(index_row(routing.load_instance(path+filename), filename))
+    index = pd.DataFrame(rows)
+    write_index_table(index, path)
+    if os.path.exists(path+INDEX_LOG):
+        os.remove(path+INDEX_LOG)
+    return index
+
+
+def load_indexed(
+    path,   # (str)          - directory of the instances
+    rows    # (pd.DataFrame) - selected rows of the index (e.g. load_index(path).query(...))
+):  # -> Returns: list of routing instance objects
+    """Loads only the instances of the selected index rows."""
+    instances = []
+    readers = {}
+    for filename, name in zip(rows['file'], rows['name']):
+        if filename.endswith('.shard'):
+            if filename not in readers:
+                readers[filename] = routing.shardReader(path+filename)
+            instances.append(readers[filename].get(name))
+        else:
+            instances.append(routing.load_instance(path+filename))
+    return instances
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def read_index_log(filename):
+    """Reads the rows of an index log."""
+    import pandas as pd
+    with open(filename, 'r') as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+
+
+def write_index_table(index, path):
+    """Writes the columnar snapshot atomically (mixed-type columns and huge integers are stored as strings)."""
+    for column in index.columns:
+        if index[column].dtype == object:
+            values = index[column].dropna()
+            numeric = values.map(lambda v: isinstance(v, (int, float, bool, np.number))).all()
+            huge = values.map(lambda v: isinstance(v, int) and abs(v) >= 2**63).any()
+            if (values.map(type).nunique() > 1 and not numeric) or huge:
+                index[column] = index[column].map(lambda v: None if v is None else str(v))
+    index.to_parquet(path+INDEX_TABLE+'.tmp', index=False)
+    os.replace(path+INDEX_TABLE+'.tmp', path+INDEX_TABLE)
+    return None
+
+
+def json_default(value):
+    """Converts numpy values in index rows to json-serializable types."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
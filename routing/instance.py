@@ -1,13 +1,59 @@
 """ A module containing the routingInstance class and its methods."""
 
 import routing
+import hashlib
 import numpy as np
-from deepdiff import DeepDiff
+
+
+# Derived attributes and the attributes they are computed from. Derived attributes are computed on first
+# access and cached; derived values (computed, loaded, or set directly) are dropped when one of their source
+# attributes is set or deleted.
+DERIVED = {
+    'distance_matrix': ('locations', 'distance_metric'),
+    'num_vehicles': ('variant', 'vehicle_capacities'),
+    'max_time': ('time_windows',),
+    'wait_time': ('max_time',),
+    'solution_distances': ('solution_routes', 'distance_matrix'),
+    'solution_loads': ('solution_routes', 'demands'),
+}
+DEPENDENTS = {source: [k for k, sources in DERIVED.items() if source in sources]
+              for source in {source for sources in DERIVED.values() for source in sources}}
+# Derived attributes which are compared and hashed by their value (they may be set to differ from the derived value);
+# the other derived attributes are determined by their sources and ignored.
+COMPARED_DERIVED = ('num_vehicles', 'max_time', 'wait_time')
 
 
 class routingInstance:
     """A class to represent a routing instance."""
     
+    # Declared attributes (unset attributes raise AttributeError, so hasattr works as before)
+    fields = (
+        'name',                 # (str)      - can be used as an identifier 
+        'variant',              # (str)      - type of routing problem (tsp, cvrp, or cvrptw)
+        'locations',            # (np.array) - array of 2D locations
+        'distance_metric',      # (str)      - distance metric (euclidean or manhattan)
+        'distance_matrix',      # (np.array) - matrix of distances between the locations
+        'demands',              # (np.array) - demands at each location
+        'vehicle_capacities',   # (np.array) - available capacities for each vehicle
+        'service_times',        # (np.array) - service times at each location
+        'time_windows',         # (np.array) - time window start- and end-points at each location
+        'max_time',             # (float)    - maximum solution time (usually the depot time window)
+        'wait_time',            # (float)    - maximum wait time at each location
+        'solution_distance',    # (float)    - total distance of all routes in the solution
+        'solution_routes',      # (list)     - routes that were found to minimize the solution distance
+        'solution_times',       # (list)     - possible start times at each location in the solution
+        'solution_loads',       # (list)     - accumulated vehicle loads in the solution routes
+        'solution_distances',   # (list)     - accumulated vehicle distances in the solution routes
+        'gen_params',           # (dict)     - generation parameters (automatically generated)
+        'num_vehicles',         # (int)      - number of vehicles available to the solver
+        'first_solution',       # (str)      - initial solution strategy (all options in routing/solve.py)
+        'local_search',         # (str)      - local search strategy (all options in routing/solve.py)
+        'time_limit_m',         # (int)      - search time limit multiplier per customer in instance
+        'depot',                # (int)      - index of the depot location (always 0)
+    )
+    array_fields = ('locations', 'distance_matrix', 'demands', 'vehicle_capacities', 'service_times', 'time_windows')
+    __slots__ = fields + ('_hash', '_cached')
+    
     @classmethod
     def fromdict(cls, d):
         """Constructs a routing instance from a dictionary."""
@@ -15,56 +61,147 @@ class routingInstance:
     
     def __init__(self, **kwargs):
         """Initializes a routing instance from a list of allowed attributes."""
-        allowed_kwargs = {
-            'name',                 # (str)      - can be used as an identifier 
-            'variant',              # (str)      - type of routing problem (tsp, cvrp, or cvrptw)
-            'locations',            # (np.array) - array of 2D locations
-            'distance_metric',      # (str)      - distance metric (euclidean or manhattan)
-            'distance_matrix',      # (np.array) - matrix of distances between the locations
-            'demands',              # (np.array) - demands at each location
-            'vehicle_capacities',   # (np.array) - available capacities for each vehicle
-            'service_times',        # (np.array) - service times at each location
-            'time_windows',         # (np.array) - time window start- and end-points at each location
-            'max_time',             # (float)    - maximum solution time (usually the depot time window)
-            'wait_time',            # (float)    - maximum wait time at each location
-            'solution_distance',    # (float)    - total distance of all routes in the solution
-            'solution_routes',      # (list)     - routes that were found to minimize the solution distance
-            'solution_times',       # (list)     - possible start times at each location in the solution
-            'solution_loads',       # (list)     - accumulated vehicle loads in the solution routes
-            'solution_distances',   # (list)     - accumulated vehicle distances in the solution routes
-            'gen_params',           # (dict)     - generation parameters (automatically generated)
-            'num_vehicles',         # (int)      - number of vehicles available to the solver
-            'first_solution',       # (str)      - initial solution strategy (all options in routing/solve.py)
-            'local_search',         # (str)      - local search strategy (all options in routing/solve.py)
-            'time_limit_m'          # (int)      - search time limit multiplier per customer in instance
-        }
-        self.__dict__.update((k, v) for k, v in kwargs.items() if k in allowed_kwargs)
+        for k, v in kwargs.items():
+            if k in self.fields and k != 'depot':
+                setattr(self, k, np.asarray(v) if k in self.array_fields and isinstance(v, (list, tuple)) else v)
         self.depot = 0
-        if hasattr(self, 'variant'):
-            if self.variant == 'cvrptw':
-                self.determine_max_time()
-                self.determine_wait_time() 
+    
+    def __setattr__(self, key, value):
+        """Sets an attribute (and drops the cached values computed from it)."""
+        if key in DERIVED:
+            self.cache(key, value) # dropped like a computed value when its sources change
+            return
+        object.__setattr__(self, key, value)
+        if key[0] != '_':
+            self.invalidate(key)
+    
+    def __delattr__(self, key):
+        """Deletes an attribute (and drops the cached values computed from it)."""
+        object.__delattr__(self, key)
+        self.invalidate(key)
+    
+    def __getattr__(self, key):
+        """Computes and caches a derived attribute on first access (only called for unset attributes)."""
+        if key in DERIVED:
+            value = self.derive(key)
+            if value is not None:
+                self.cache(key, value)
+                return value
+        raise AttributeError(f"'routingInstance' object has no attribute '{key}'")
+    
+    def derive(self, key):
+        """Computes a derived attribute from its sources (None if the sources are not set)."""
+        if key == 'distance_matrix' and self.is_set('locations'):
+            return routing.compute_distance_matrix(self.locations, getattr(self, 'distance_metric', 'euclidean'))
+        if key == 'num_vehicles' and self.is_set('variant'):
+            return 1 if self.variant == 'tsp' else len(getattr(self, 'vehicle_capacities', []))
+        if key == 'max_time' and self.is_set('time_windows'):
+            return self.time_windows[0][1] # depot time window
+        if key == 'wait_time' and hasattr(self, 'max_time'):
+            return self.max_time
+        if key == 'solution_distances' and self.is_set('solution_routes') and hasattr(self, 'distance_matrix'):
+            return routing.get_route_distances(self.solution_routes, self.distance_matrix)
+        if key == 'solution_loads' and self.is_set('solution_routes') and self.is_set('demands'):
+            return routing.get_route_loads(self.solution_routes, self.demands)
+        return None
+    
+    def cache(self, key, value):
+        """Stores a derived attribute (dropped again when its sources change)."""
+        object.__setattr__(self, key, value)
+        self.invalidate(key)
+        if getattr(self, '_cached', None) is None:
+            object.__setattr__(self, '_cached', set())
+        self._cached.add(key)
+    
+    def invalidate(self, key):
+        """Marks an attribute as changed: resets the content hash and drops the cached values derived from it."""
+        cached = getattr(self, '_cached', None)
+        if cached:
+            cached.discard(key)
+            for dependent in DEPENDENTS.get(key, []):
+                if dependent in cached:
+                    self.__delattr__(dependent)
+        if key not in DERIVED or key in COMPARED_DERIVED:
+            object.__setattr__(self, '_hash', None)
+    
+    def is_set(self, key):
+        """Checks if an attribute is set (without computing derived attributes)."""
+        try:
+            object.__getattribute__(self, key)
+            return True
+        except AttributeError:
+            return False
+    
+    @property
+    def __dict__(self):
+        """Returns the set attributes as a new dictionary (for code written against the former dict-based class)."""
+        return self.to_dict()
+    
+    def to_dict(self, cached=True):
+        """Returns the set attributes as a dictionary (cached: include derived attributes which can be recomputed)."""
+        skip = set(getattr(self, '_cached', None) or ()) - set(COMPARED_DERIVED) if not cached else ()
+        return {k: object.__getattribute__(self, k) for k in self.fields if self.is_set(k) and k not in skip}
+    
+    def __getstate__(self):
+        """Returns the pickle state (the set attributes)."""
+        return self.to_dict()
+    
+    def __setstate__(self, state):
+        """Restores the pickle state (also of instances pickled by the former dict-based class)."""
+        if isinstance(state, tuple): # (dict state, slot state)
+            state = {**(state[0] or {}), **(state[1] or {})}
+        for k, v in state.items():
+            if k in self.fields:
+                setattr(self, k, v)
     
     def __eq__(self, other, verbose=False):
-        """Checks if two routing instances are equal."""
+        """Checks if two routing instances are equal (array-aware, stops at the first difference, see COMPARED_DERIVED)."""
         if self.__class__ != other.__class__:
             if verbose: print('Different class')
             return False
-        eq = DeepDiff(self.__dict__, other.__dict__)
-        if eq != {}:
-            if verbose: print(eq)
+        keys = [k for k in self.fields if k not in DERIVED and self.is_set(k)]
+        if keys != [k for k in other.fields if k not in DERIVED and other.is_set(k)]:
+            if verbose: print('Different attributes')
             return False
+        for k in keys:
+            if not values_equal(getattr(self, k), getattr(other, k)):
+                if verbose: print(f'Different {k}')
+                return False
+        for k in COMPARED_DERIVED:
+            if not values_equal(getattr(self, k, None), getattr(other, k, None)):
+                if verbose: print(f'Different {k}')
+                return False
         return True
     
+    def __hash__(self):
+        """Returns a hash of the instance content (see content_hash)."""
+        return int(self.content_hash()[:16], 16)
+    
+    def content_hash(self):
+        """Returns a stable hash of all set attributes and COMPARED_DERIVED (cached until an attribute is set or deleted).
+
+        Arrays modified in place are not detected: call invalidate(key) afterwards (or set the attribute again)."""
+        if getattr(self, '_hash', None) is None:
+            h = hashlib.blake2b(digest_size=16)
+            for k in self.fields:
+                if k not in DERIVED and self.is_set(k):
+                    h.update(k.encode())
+                    hash_value(h, getattr(self, k))
+            for k in COMPARED_DERIVED:
+                h.update(k.encode())
+                hash_value(h, getattr(self, k, None))
+            object.__setattr__(self, '_hash', h.hexdigest())
+        return self._hash
+    
     
     def solve(self, first_solution='AUTOMATIC', local_search=None, time_limit=1, scaling=True, verbose=1):
         """Solves the routing instance (for details see solve.py)."""
         return routing.solve_instance(self, first_solution, local_search, time_limit, scaling, verbose)
     
     
-    def save(self, path, filename, filetype='pickle', reduce_size=False):
+    def save(self, path, filename, filetype='pickle', reduce_size=False, index=True, cached=True):
         """Saves the routing instance (for details see save.py)."""
-        return routing.save_instance(self, path, filename, filetype, reduce_size)
+        return routing.save_instance(self, path, filename, filetype, reduce_size, index, cached)
     
     
     def plot(self, title=None, solved=False, details=None, scaled=False, 
@@ -77,38 +214,66 @@ class routingInstance:
         """Computes the distance matrix for the instance (for details see utils.py)."""
         if distance_metric:
             self.distance_metric = distance_metric
-        self.distance_matrix = routing.compute_distance_matrix(self.locations, self.distance_metric)
+        self.cache('distance_matrix', self.derive('distance_matrix'))
         return self.distance_matrix
     
     
     def compute_num_vehicles(self):
         """Computes the number of vehicles for the instance."""
-        if self.variant == 'tsp':
-            self.num_vehicles = 1
-        elif hasattr(self, 'vehicle_capacities'):
-            self.num_vehicles = len(self.vehicle_capacities)
-        else:
-            self.num_vehicles = 0
+        self.cache('num_vehicles', self.derive('num_vehicles'))
         return self.num_vehicles
     
     
     def determine_max_time(self):
-        """Determines the maximum time horizon."""
-        if hasattr(self, 'max_time'):
-            return self.max_time
-        elif hasattr(self, 'time_windows'):
-            self.max_time = self.time_windows[0][1] # depot time window
-            return self.max_time
-        else:
-            return None
+        """Determines the maximum time horizon (the depot time window, computed on first access)."""
+        return getattr(self, 'max_time', None)
         
         
     def determine_wait_time(self):
-        """Determines the maximum waiting time."""
-        if hasattr(self, 'wait_time'):
-            return self.wait_time
-        elif hasattr(self, 'max_time'):
-            self.wait_time = self.max_time.copy()
-            return self.wait_time
-        else:
-            return None
+        """Determines the maximum waiting time (the maximum time horizon, computed on first access)."""
+        return getattr(self, 'wait_time', None)
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def values_equal(a, b):
+    """Checks if two attribute values are equal (same types, arrays of any subclass compared element-wise)."""
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray): # e.g. np.memmap of instances loaded with mmap_mode
+        if not (isinstance(a, np.ndarray) and isinstance(b, np.ndarray)):
+            return False
+        a, b = np.asarray(a), np.asarray(b)
+        if a.shape != b.shape or a.dtype != b.dtype:
+            return False
+        return bool(np.array_equal(a, b, equal_nan=a.dtype.kind in 'fc'))
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(values_equal(v, b[k]) for k, v in a.items())
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(values_equal(x, y) for x, y in zip(a, b))
+    if isinstance(a, (float, np.floating)) and a != a:
+        return b != b # both nan
+    return bool(a == b)
+
+
+def hash_value(h, value):
+    """Feeds an attribute value into a hash (arrays of any subclass by dtype, shape, and raw bytes)."""
+    if isinstance(value, np.ndarray):
+        h.update(b'ndarray') # not the class name, so np.memmap hashes like an in-memory array
+        h.update(f'{value.dtype.str}{value.shape}'.encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+        return None
+    h.update(type(value).__name__.encode())
+    if isinstance(value, dict):
+        for k in sorted(value, key=str):
+            h.update(str(k).encode())
+            hash_value(h, value[k])
+    elif isinstance(value, (list, tuple)):
+        h.update(str(len(value)).encode())
+        for v in value:
+            hash_value(h, v)
+    else:
+        h.update(repr(value).encode())
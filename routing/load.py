@@ -5,12 +5,21 @@ import os
 import pickle
 import json
 import numpy as np
-import pandas as pd
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from .metrics import timed
 
 
-def load_instance(path):
-    """Loads a routing instance from a file."""
+@timed('io.load')
+def load_instance(path, name=None):
+    """Loads a routing instance from a file (or the instance with the given name from a shard)."""
+    # Load from shard.
+    if path[-6:] == '.shard':
+        return routing.shardReader(path).get(name)
+    # Load compact binary.
+    if path[-4:] == '.bin':
+        with open(path, 'rb') as f:
+            return routing.routingInstance.fromdict(routing.decode_instance(f.read()))
     # Load pickle.
     if path[-7:] == '.pickle':
         with open(path, 'rb') as f:
@@ -42,41 +51,109 @@ def undo_json_serializable(instance_dict):
 
 def load_dataset(
     path,                 # (str) - path from where to load
-    filetype,             # (str) - which filetype to load (pickle, json, or txt)
+    filetype,             # (str) - which filetype to load (pickle, json, txt, bin, or shard)
     num_instances='all',  # (str/int) - 'all': load all instances in path, int: how many instances to load
     info='instance',      # (str) - which information to load (instance, gen_params, or combined)
-    verbose=10            # (int) - after how many instances report progress?
-):  # -> Returns: pd.DataFrame
+    verbose=10,           # (int) - after how many instances report progress (if no progress callback is given)?
+    workers=1,            # (int) - number of loading workers (processes for json/txt, threads for pickle/bin/shard)
+    progress=None,        # (callable) - called with (instances loaded, files decoded, files total) after each instance
+    chunk_size=64         # (int) - number of files decoded per task (shards: one per task)
+):  # -> Returns: pd.DataFrame (rows in sorted file name order)
     """Loads a dataset of instances as pandas DataFrame."""
     t0 = time.time()
+    if progress is None and verbose:
+        progress = lambda loaded, files, total: (
+            print(f'{loaded} instances loaded ({round(time.time()-t0, 2)}s)') if loaded % verbose == 0 else None)
+    filelist = dataset_files(path, filetype, num_instances)
+    # A task decodes a chunk of files (or a single shard)
+    chunk_size = 1 if filetype == 'shard' else chunk_size
+    chunks = [filelist[i:i+chunk_size] for i in range(0, len(filelist), chunk_size)]
+    executor = None
+    task = load_rows
+    if workers > 1:
+        executor = (ProcessPoolExecutor if filetype in ['json', 'txt'] else ThreadPoolExecutor)(max_workers=workers)
+        if filetype in ['json', 'txt']:
+            task = routing.metrics.worker_task(load_rows) # worker processes ship their metrics with the rows
+    # Collect the rows (in file order) column by column
+    columns = {}
+    loaded = 0
+    files = 0
+    try:
+        results = (map(routing.metrics.collect, executor.map(task, [path]*len(chunks), chunks, [info]*len(chunks)))
+                   if executor is not None else (load_rows(path, chunk, info) for chunk in chunks))
+        for chunk, rows in zip(chunks, results):
+            files += len(chunk)
+            routing.metrics.count('io.files_decoded', len(chunk))
+            if num_instances != 'all':
+                rows = rows[:num_instances - loaded] # shards hold many instances each
+            for row in rows:
+                for key in columns.keys() - row.keys():
+                    columns[key].append(None)
+                for key, value in row.items():
+                    if key not in columns:
+                        columns[key] = [None] * loaded
+                    columns[key].append(value)
+                loaded += 1
+                if progress is not None:
+                    progress(loaded, files, len(filelist))
+            if num_instances != 'all' and loaded >= num_instances:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    import pandas as pd # imported at first use (slow import, not needed to load single instances)
+    return pd.DataFrame(columns)
+
+
+def iter_dataset(
+    path,                 # (str) - path from where to load
+    filetype,             # (str) - which filetype to load (pickle, json, txt, bin, or shard)
+    num_instances='all'   # (str/int) - 'all': load all instances in path, int: how many instances to load
+):  # -> Returns: generator of routing instance objects
+    """Iterates over the instances of a dataset (single files or shards, sorted by file name)."""
+    # Load shards sequentially
+    if filetype == 'shard':
+        yield from routing.iter_shards(path, num_instances)
+        return
     # Loop through files
-    filelist = os.listdir(path)
-    if num_instances != 'all':
+    for filename in dataset_files(path, filetype, num_instances):
+        yield routing.load_instance(path+filename)
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def dataset_files(path, filetype, num_instances='all'):
+    """Lists the files of a filetype in a directory (sorted by name, so the order is deterministic)."""
+    with os.scandir(path) as entries:
+        filelist = sorted(entry.name for entry in entries
+                          if entry.is_file() and entry.name.endswith('.'+filetype) and not entry.name.startswith('index.'))
+    if num_instances != 'all' and filetype != 'shard':
         filelist = filelist[:num_instances]
+    return filelist
+
+
+def load_rows(path, filelist, info):
+    """Loads the DataFrame rows of the instances in a list of files (runs in the loading workers)."""
     rows = []
-    loaded = 0
     for filename in filelist:
-        # Load instance
-        if filename.endswith('.'+filetype):
-            instance = routing.load_instance(path+filename)
+        instances = routing.shardReader(path+filename) if filename.endswith('.shard') else [load_instance(path+filename)]
+        for instance in instances:
             # Load instance characteristics
-            if info=='instance':
-                rows.append(instance.__dict__)
+            if info == 'instance':
+                rows.append(instance.to_dict())
             # Load generation parameters
             elif info == 'gen_params':
-                rows.append(instance.__dict__['gen_params'])
+                rows.append(instance.gen_params)
             # Load instance characteristics and generation parameters
             elif info == 'combined':
-                dict_instance = instance.__dict__
+                dict_instance = instance.to_dict()
                 dict_gen_params = dict_instance['gen_params'].copy()
                 del dict_instance['gen_params']
                 rows.append({**dict_instance, **dict_gen_params})
-            loaded += 1
-            # Print loading progress
-            if verbose:
-                if loaded % verbose == 0:
-                    print(f'{loaded} instances loaded ({round(time.time()-t0, 2)}s)')
-    return pd.DataFrame(rows)
+    return rows
 
 
 
@@ -84,86 +161,18 @@ def load_dataset(
 
 
 
-def load_benchmark_instance(filename, num_customers=25, path='data/benchmarks/solomon_instances/'):
-    """Loads a single benchmark instance (Solomon or Gehring-Homberger)."""
-    # Create an empty instance dictionary
-    d = {'variant': 'cvrptw', 'locations': [], 'demands': [], 'time_windows': [], 'service_times': []}
-    # Read the file and fill the instance dictionary
-    with open (path+filename+'.txt', 'r') as f:
-        for i, line in enumerate(f):
-            row = line.split() # Split on any whitespace (including tabs)
-            if i == 0: # get title
-                d['name'] = str(row[0])+'.'+str(num_customers)
-            elif i == 4: # get num_vehicles and capacities
-                num_vehicles = int(row[0])
-                d['vehicle_capacities'] = np.array([int(row[1])] * num_vehicles)
-            elif i > 8 and i < 10 + num_customers: # get locations, time-windows, demands, service time
-                d['locations'].append((int(row[1]), int(row[2])))
-                d['demands'].append(int(row[3]))
-                d['time_windows'].append((int(row[4]), int(row[5])))
-                d['service_times'].append(int(row[6]))
-    # Convert lists to arrays
-    for k, v in d.items():
-        if isinstance(v, list):
-            d[k] = np.array(v)
-    # Create and return instance
-    instance = routing.routingInstance.fromdict(d)
-    instance.compute_distance_matrix('euclidean')
-    # instance.depot = 0
-    return(instance)
-
-
-def load_solomon_solutions(solution_accuracy='best_known'):
+def load_benchmark_instance(filename, num_customers=25, path='data/benchmarks.zip'):
+    """Loads a single benchmark instance (Solomon or Gehring-Homberger) from the zip archive or a directory."""
+    if path.endswith('.zip'):
+        return routing.benchmark_instance(filename, num_customers, source=path)
+    return routing.benchmark_instance(filename+'.txt', num_customers, source=path)
+
+
+def load_solomon_solutions(solution_accuracy='best_known', source='data/benchmarks.zip'):
     """Loads the solutions to the benchmarks by Solomon (1987)."""
-    if solution_accuracy == 'best_known':
-        return mix_solomon_solutions()
-    elif solution_accuracy == 'optimal' or solution_accuracy == 'heuristic':
-        # set correct path
-        path = f'data/benchmarks/solomon_solutions/solomon_{solution_accuracy}/'
-        # Create dict
-        sol_dict = {'name': [], 'sol_vehicles': [], 'sol_distance': [], 'sol_authors': []}
-        # Loop through files and read lines
-        filelist = os.listdir(path)
-        for f in filelist:
-            if f.endswith(".txt"):
-                with open (path+f, 'r') as f:
-                    for i, line in enumerate(f):
-                        if i > 15:
-                            row = line.strip()
-                            if i % 8 == 0:
-                                if solution_accuracy == 'optimal':
-                                    sol_dict['name'].append(row)
-                                elif solution_accuracy == 'heuristic':
-                                    sol_dict['name'].append(row+'.100')
-                            elif i % 8 == 2:
-                                sol_dict['sol_vehicles'].append(row)
-                            elif i % 8 == 4:
-                                sol_dict['sol_distance'].append(row)
-                            elif i % 8 == 6:
-                                sol_dict['sol_authors'].append(row)
-        # Return as DataFrame
-        sol_df = pd.DataFrame.from_dict(sol_dict)
-        sol_df = sol_df[(sol_df['name'] != '')]
-        sol_df = sol_df[(sol_df['name'] != '.100')]
-        abr = solution_accuracy[:3]
-        sol_df.columns = ['name', f'sol_{abr}_vehicles', f'sol_{abr}_distance', f'sol_{abr}_authors']
-        return sol_df
+    return routing.solomon_solutions(solution_accuracy, source)
     
     
-def mix_solomon_solutions():
+def mix_solomon_solutions(source='data/benchmarks.zip'):
     """Combines the known optimal and best heuristic solutions for the benchmarks by Solomon (1987)."""
-    sol_opt_df = load_solomon_solutions(solution_accuracy='optimal')
-    sol_heu_df = load_solomon_solutions(solution_accuracy='heuristic')
-    sol_comb_df = pd.merge(sol_opt_df, sol_heu_df, on='name', how='outer')
-    sol_best_df = pd.DataFrame({'name': [], 'sol_best_vehicles': [], 'sol_best_distance': [], 'sol_best_authors': []})
-    for i in range(sol_comb_df.shape[0]):
-        sol_best_df.loc[i, 'name'] = sol_comb_df.loc[i, 'name']
-        if sol_comb_df.loc[i, 'sol_opt_distance'] !='':#if not pd.isnull(solomon_df.loc[i, 'sol_opt_distance']):
-            sol_best_df.loc[i, 'sol_best_vehicles'] = sol_comb_df.loc[i, 'sol_opt_vehicles']
-            sol_best_df.loc[i, 'sol_best_distance'] = sol_comb_df.loc[i, 'sol_opt_distance']
-            sol_best_df.loc[i, 'sol_best_authors'] = sol_comb_df.loc[i, 'sol_opt_authors']
-        else:
-            sol_best_df.loc[i, 'sol_best_vehicles'] = sol_comb_df.loc[i, 'sol_heu_vehicles']
-            sol_best_df.loc[i, 'sol_best_distance'] = sol_comb_df.loc[i, 'sol_heu_distance']
-            sol_best_df.loc[i, 'sol_best_authors'] = sol_comb_df.loc[i, 'sol_heu_authors']
-    return sol_best_df
\ No newline at end of file
+    return routing.solomon_solutions('best_known', source)
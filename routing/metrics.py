@@ -0,0 +1,224 @@
+""" A module for lightweight stage-level instrumentation: named timers and counters, aggregated across processes.
+
+Metrics are off by default (set ROUTING_METRICS=1 or call metrics.enable()). While disabled, every call only checks
+a module flag, so instrumented code can stay in place in production.
+
+    metrics.timer('solve.search')       - context manager timing a block
+    metrics.timed('generate.locations') - decorator timing every call of a function
+    metrics.lap('features.demands', t)  - records the time since t and returns the current time (for sequential stages)
+    metrics.count('instances.loaded')   - adds to a counter
+
+Pool workers ship their metrics back with their results (worker_task / collect), so snapshot() covers all workers."""
+
+import os
+import json
+import time
+import threading
+import functools
+
+
+ENABLED = os.environ.get('ROUTING_METRICS', '0') not in ('', '0')
+TIMERS = {}     # name -> [calls, total seconds, max seconds]
+COUNTERS = {}   # name -> value
+LOCK = threading.Lock()
+
+
+def enable(on=True):
+    """Enables (or disables) metrics in this process and in worker processes started afterwards."""
+    global ENABLED
+    ENABLED = bool(on)
+    os.environ['ROUTING_METRICS'] = '1' if on else '0' # inherited by spawned workers
+    return None
+
+
+def record(name, seconds):
+    """Records one timed call of a stage."""
+    if not ENABLED:
+        return None
+    with LOCK:
+        stats = TIMERS.get(name)
+        if stats is None:
+            TIMERS[name] = [1, seconds, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+            if seconds > stats[2]:
+                stats[2] = seconds
+    return None
+
+
+def lap(name, t):
+    """Records the time since t (from time.perf_counter) for a stage and returns the current time."""
+    now = time.perf_counter()
+    if ENABLED:
+        record(name, now - t)
+    return now
+
+
+def count(name, value=1):
+    """Adds a value to a counter."""
+    if not ENABLED:
+        return None
+    with LOCK:
+        COUNTERS[name] = COUNTERS.get(name, 0) + value
+    return None
+
+
+class stageTimer:
+    """A class to time a block (context manager) and record it for a stage."""
+
+    __slots__ = ('name', 't')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        record(self.name, time.perf_counter() - self.t)
+        return False
+
+
+class nullTimer:
+    """A class standing in for stageTimer while metrics are disabled (does nothing)."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+NULL_TIMER = nullTimer()
+
+
+def timer(name):
+    """Returns a context manager which times the enclosed block for a stage."""
+    return stageTimer(name) if ENABLED else NULL_TIMER
+
+
+def timed(name):
+    """Decorates a function to time each of its calls for a stage."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            t = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - t)
+        return wrapper
+    return decorate
+
+
+def snapshot(reset=False):
+    """Returns the metrics of this process (including those collected from workers) as a dict."""
+    with LOCK:
+        snap = {
+            'timers': {name: {'calls': calls, 'total_s': total, 'max_s': longest}
+                       for name, (calls, total, longest) in sorted(TIMERS.items())},
+            'counters': dict(sorted(COUNTERS.items())),
+        }
+        if reset:
+            TIMERS.clear()
+            COUNTERS.clear()
+    return snap
+
+
+def reset():
+    """Clears all metrics of this process."""
+    snapshot(reset=True)
+    return None
+
+
+def merge(snap):
+    """Adds a snapshot (e.g. of a worker process) to the metrics of this process."""
+    with LOCK:
+        for name, stats in snap['timers'].items():
+            current = TIMERS.setdefault(name, [0, 0.0, 0.0])
+            current[0] += stats['calls']
+            current[1] += stats['total_s']
+            current[2] = max(current[2], stats['max_s'])
+        for name, value in snap['counters'].items():
+            COUNTERS[name] = COUNTERS.get(name, 0) + value
+    return None
+
+
+def export_json(filename=None):
+    """Exports the metrics as json (returns the json string, also saves it if a filename is given)."""
+    text = json.dumps({'pid': os.getpid(), 'time': time.time(), **snapshot()}, indent=4)
+    if filename:
+        with open(filename, 'w') as f:
+            f.write(text)
+    return text
+
+
+def export_prometheus(prefix='routing'):
+    """Exports the metrics in the Prometheus text exposition format."""
+    snap = snapshot()
+    lines = [f'# HELP {prefix}_stage_seconds_total Total seconds spent in a stage.',
+             f'# TYPE {prefix}_stage_seconds_total counter']
+    lines += [f'{prefix}_stage_seconds_total{{stage="{name}"}} {stats["total_s"]:.9g}' for name, stats in snap['timers'].items()]
+    lines += [f'# HELP {prefix}_stage_calls_total Number of timed calls of a stage.',
+              f'# TYPE {prefix}_stage_calls_total counter']
+    lines += [f'{prefix}_stage_calls_total{{stage="{name}"}} {stats["calls"]}' for name, stats in snap['timers'].items()]
+    lines += [f'# HELP {prefix}_stage_seconds_max Longest timed call of a stage.',
+              f'# TYPE {prefix}_stage_seconds_max gauge']
+    lines += [f'{prefix}_stage_seconds_max{{stage="{name}"}} {stats["max_s"]:.9g}' for name, stats in snap['timers'].items()]
+    lines += [f'# HELP {prefix}_events_total Counted events.', f'# TYPE {prefix}_events_total counter']
+    lines += [f'{prefix}_events_total{{name="{name}"}} {value}' for name, value in snap['counters'].items()]
+    return '\n'.join(lines) + '\n'
+
+
+def summary():
+    """Returns the metrics as a readable table (one line per timer and counter)."""
+    snap = snapshot()
+    lines = [f'{"stage":<36} {"calls":>9} {"total_s":>10} {"mean_ms":>10} {"max_ms":>10}']
+    for name, stats in snap['timers'].items():
+        lines.append(f'{name:<36} {stats["calls"]:>9} {stats["total_s"]:>10.3f} '
+                     f'{1000*stats["total_s"]/stats["calls"]:>10.3f} {1000*stats["max_s"]:>10.3f}')
+    for name, value in snap['counters'].items():
+        lines.append(f'{name:<36} {value:>9}')
+    return '\n'.join(lines)
+
+
+class workerResult:
+    """A class to ship a worker's result together with the metrics it recorded."""
+
+    __slots__ = ('value', 'metrics')
+
+    def __init__(self, value, metrics):
+        self.value = value
+        self.metrics = metrics
+
+
+class workerTask:
+    """A class to wrap a pool task such that it returns its metrics with its result (picklable)."""
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, *args, **kwargs):
+        enable()
+        reset()
+        value = self.func(*args, **kwargs)
+        return workerResult(value, snapshot(reset=True))
+
+
+def worker_task(func):
+    """Returns a pool task which ships its metrics back (func itself while metrics are disabled)."""
+    return workerTask(func) if ENABLED else func
+
+
+def collect(result):
+    """Merges the metrics shipped with a worker result into this process and returns the plain result."""
+    if isinstance(result, workerResult):
+        merge(result.metrics)
+        return result.value
+    return result
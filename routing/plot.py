@@ -2,9 +2,6 @@
 
 import routing
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib import cm
-import seaborn as sns
 
     
 def plot_instance(
@@ -20,6 +17,7 @@ def plot_instance(
     c_cust='cornflowerblue'     # (str) - customer node color (good: 'cornflowerblue', 'darkorange')
 ):  # -> Returns None, but shows the plot.
     """Plots a routing instance."""
+    import matplotlib.pyplot as plt # imported at first use (slow import, not needed to generate, load, or solve)
     
     # Check if locations are given.
     if not hasattr(instance, 'locations'):
@@ -29,68 +27,64 @@ def plot_instance(
         print('\nNo locations are given for plotting.')
         return None
     
+    # Setup the plot.
+    fig = plt.figure(figsize=fig_size)
+    ax = fig.gca()
+    if title:
+        ax.set_title(title)
+    if scaled:
+        ax.axis('equal')
+    
+    # Plot nodes, details, and routes, then show the plot.
+    draw_instance(ax, instance, solved, details, node_size, font_size, c_depot, c_cust)
+    plt.show()
+    return None
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def draw_instance(ax, instance, solved=False, details=None, node_size=50, font_size=5,
+                  c_depot='darkgreen', c_cust='cornflowerblue'):
+    """Draws a routing instance onto matplotlib axes (one scatter per node class, one LineCollection per route)."""
+    import matplotlib # no pyplot: draws onto any axes, also of a headless Figure (see render.py)
+    from matplotlib.collections import LineCollection
+    
     # Set color scheme.
-    cmap = cm.get_cmap('Set1') # route colors
+    cmap = matplotlib.colormaps['Set1'] # route colors
     alpha_depot = 1.0
     alpha_cust = 0.85
     ec_depot = 'black'
     ec_cust = 'black'
     
-    # Setup the plot.
-    fig = plt.figure(figsize=fig_size)
-    if title:
-        plt.title(title)
-    if scaled:
-        plt.axis('equal')
-    
     # Plot location nodes.
     locs = instance.locations
-    num_locs = instance.locations.shape[0]
-    for i in range(num_locs):    
-        if i == instance.depot:
-            plt.scatter(locs[i][0], locs[i][1], c=c_depot, s=3*node_size, alpha=alpha_depot, ec=ec_depot)
-            plt.text(locs[i][0], locs[i][1], "Depot", fontsize=2*font_size)
-        else:
-            plt.scatter(locs[i][0], locs[i][1], c=c_cust, s=node_size, alpha=alpha_cust, ec=ec_cust)
+    num_locs = locs.shape[0]
+    is_cust = np.arange(num_locs) != instance.depot
+    depot = locs[instance.depot]
+    ax.scatter(depot[0], depot[1], c=c_depot, s=3*node_size, alpha=alpha_depot, ec=ec_depot)
+    ax.text(depot[0], depot[1], "Depot", fontsize=2*font_size)
+    ax.scatter(locs[is_cust, 0], locs[is_cust, 1], c=c_cust, s=node_size, alpha=alpha_cust, ec=ec_cust)
 
     # Plot details like ids, demands, and/or time windows.
     if details:
-        if instance.variant == 'tsp':
-            for i in range(num_locs):    
-                if i != instance.depot:
-                    plt.text(locs[i][0], locs[i][1], i, fontsize=font_size)
-        elif instance.variant == 'cvrp':
-            for i in range(num_locs):    
-                if i != instance.depot:
-                    if details == 'loc_ids':
-                        plt.text(locs[i][0], locs[i][1], i, fontsize=font_size)
-                    elif details == 'all':
-                        plt.text(locs[i][0], locs[i][1], f'id: {i}, dem: {instance.demands[i]}', fontsize=font_size)
-        elif instance.variant == 'cvrptw':
+        labels = []
+        if instance.variant == 'tsp' or details == 'loc_ids':
+            labels = [str(i) for i in range(num_locs)]
+        elif details == 'all' and instance.variant == 'cvrp':
+            labels = [f'id: {i}, dem: {instance.demands[i]}' for i in range(num_locs)]
+        elif details == 'all' and instance.variant == 'cvrptw':
             tws = instance.time_windows
-            for i in range(num_locs):    
-                if i != instance.depot:
-                    if details == 'loc_ids':
-                        plt.text(locs[i][0], locs[i][1], i, fontsize=font_size)
-                    elif details == 'all':
-                        plt.text(locs[i][0], locs[i][1], 
-                                 f'{i}:[{instance.demands[i]},{instance.service_times[i]},\n{int(tws[i][0])}-{int(tws[i][1])}]',
-                                 fontsize=font_size)
+            labels = [f'{i}:[{instance.demands[i]},{instance.service_times[i]},\n{int(tws[i][0])}-{int(tws[i][1])}]'
+                      for i in range(num_locs)]
+        for i in (np.flatnonzero(is_cust) if labels else []):
+            ax.text(locs[i][0], locs[i][1], labels[i], fontsize=font_size)
 
-    # Plot routes.
-    if not solved or not hasattr(instance, 'solution_routes'):
-        plt.show()
-        return
-    connections = routing.find_connections(locs, instance.solution_routes)        
-    num_used_vehicles = -1
-    for k in range(instance.compute_num_vehicles()):
-        if len(instance.solution_routes[k]) > 2:
-            num_used_vehicles += 1
-        for i in range(num_locs):
-            for j in range(num_locs):
-                if i != j and connections[k][i][j] == 1:
-                    plt.plot([locs[i][0], locs[j][0]], [locs[i][1], locs[j][1]], c=cmap(num_used_vehicles))
-    
-    # Show plot.
-    plt.show()
-    return None
+    # Plot routes (each route as one polyline through its stops).
+    if solved and hasattr(instance, 'solution_routes'):
+        used_routes = [route for route in instance.solution_routes if len(route) > 2]
+        for k, route in enumerate(used_routes):
+            ax.add_collection(LineCollection([locs[route]], colors=[cmap(k)]))
+    return ax
@@ -0,0 +1,82 @@
+""" A module for rendering many routing instances to image files (headless, in parallel, optionally as contact sheets)."""
+
+import routing
+from concurrent.futures import ProcessPoolExecutor
+
+
+FIGURES = {}  # figures reused within a process, one per layout (fig_size, rows, cols)
+
+
+def render_instances(
+    instances,          # (list)  - routing instances to render
+    path,               # (str)   - directory to save the images to
+    filetype='png',     # (str)   - image format (png or svg)
+    solved=True,        # (bool)  - include the solutions in the images
+    details=None,       # (str)   - 'loc_ids': plot node ids, 'all': plot loads and times (see plot.py)
+    sheet=None,         # (tuple) - (rows, cols): tile that many instances per image (contact sheet)
+    fig_size=(4, 4),    # (tuple) - size of a single instance plot (one tile of a contact sheet)
+    dpi=100,            # (int)   - resolution of png images
+    node_size=20,       # (int)   - location node size
+    font_size=5,        # (int)   - title and details font size
+    workers=4,          # (int)   - number of rendering processes
+    chunk_size=16       # (int)   - number of images rendered per task
+):  # -> Returns: list of the saved file names
+    """Renders routing instances to image files without a display (Agg/SVG canvases, no pyplot)."""
+    instances = list(instances)
+    names = [getattr(instance, 'name', None) or f'instance{i+1:06d}' for i, instance in enumerate(instances)]
+    # An image shows one instance or a sheet of rows*cols instances
+    per_image = 1 if sheet is None else sheet[0] * sheet[1]
+    images = [(instances[i:i+per_image], names[i:i+per_image],
+               path+(names[i] if sheet is None else f'sheet{i//per_image+1:05d}')+'.'+filetype)
+              for i in range(0, len(instances), per_image)]
+    options = {'filetype': filetype, 'solved': solved, 'details': details, 'sheet': sheet or (1, 1),
+               'fig_size': fig_size, 'dpi': dpi, 'node_size': node_size, 'font_size': font_size}
+    # Each task renders a chunk of images with the figure of its process
+    chunks = [images[i:i+chunk_size] for i in range(0, len(images), chunk_size)]
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            filenames = executor.map(routing.metrics.worker_task(render_chunk), chunks, [options]*len(chunks))
+            return [filename for chunk in map(routing.metrics.collect, filenames) for filename in chunk]
+    return [filename for chunk in chunks for filename in render_chunk(chunk, options)]
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def render_chunk(images, options):
+    """Renders a chunk of images (runs in the rendering processes)."""
+    rows, cols = options['sheet']
+    fig = layout_figure(options['fig_size'], rows, cols)
+    filenames = []
+    for instances, names, filename in images:
+        for k, ax in enumerate(fig.axes):
+            # Remove the previous instance but keep the axes (cheaper than clearing them)
+            for artist in [*ax.collections, *ax.texts]:
+                artist.remove()
+            ax.ignore_existing_data_limits = True
+            ax.set_visible(k < len(instances))
+            if k < len(instances):
+                ax.set_title(names[k], fontsize=options['font_size'])
+                routing.draw_instance(ax, instances[k], options['solved'], options['details'],
+                                      options['node_size'], options['font_size'])
+                ax.autoscale_view()
+        fig.savefig(filename, format=options['filetype'], dpi=options['dpi'])
+        filenames.append(filename)
+    routing.metrics.count('render.images', len(filenames))
+    return filenames
+
+
+def layout_figure(fig_size, rows, cols):
+    """Returns the (reused) figure of a layout."""
+    from matplotlib.figure import Figure # imported at first use (slow import)
+    key = (tuple(fig_size), rows, cols)
+    if key not in FIGURES:
+        fig = Figure(figsize=(fig_size[0]*cols, fig_size[1]*rows))
+        for ax in fig.subplots(rows, cols, squeeze=False).flat:
+            ax.set_xticks([])
+            ax.set_yticks([])
+        fig.subplots_adjust(left=0.02, right=0.98, bottom=0.02, top=0.94, wspace=0.05, hspace=0.12)
+        FIGURES[key] = fig
+    return FIGURES[key]
@@ -1,29 +1,46 @@
 """ A module for saving routing instances."""
 
+import routing
 import numpy as np
 import pickle
 import json
 import copy
+from .metrics import timed
 
 
+@timed('io.save')
 def save_instance(
     instance,           # (object) - routingInstance object
     path,               # (str)    - path to save to
     filename,           # (str)    - name to save as
-    filetype='pickle',  # (str)    - file-type to save as (pickle, json, or txt)
-    reduce_size=False   # (bool)   - reduce file-size by ignoring distance_matrix and more
+    filetype='pickle',  # (str)    - file-type to save as (pickle, json, txt, or bin)
+    reduce_size=False,  # (bool)   - reduce file-size by ignoring distance_matrix and more
+    index=True,         # (bool)   - add the file to the metadata index of path (see index.py)
+    cached=True         # (bool)   - also save derived attributes which are recomputed on access (e.g. a cached
+                        #            distance_matrix; see instance.py)
 ):  # -> Returns None, but saves intance to a file
     """Saves a routing instance to a file."""
     
+    unwanted_attr = ['distance_matrix', 'solution_distances', 'solution_loads'] if reduce_size else []
+    
+    # Save as compact binary (encodes the attributes directly, no copy needed).
+    if filetype == 'bin':
+        with open(path+filename+'.bin', 'wb') as f:
+            f.write(routing.encode_instance(instance, exclude=unwanted_attr, cached=cached))
+        if index:
+            routing.append_index(path, routing.index_row(instance, filename+'.bin'))
+        return None
+    
     # Create a copy to modify without changing the original instance.
     inst_tosave = copy.deepcopy(instance)
     
     # Reduce instance size.
-    if reduce_size:
-        unwanted_attr = ['distance_matrix', 'solution_distances', 'solution_loads']
-        for attr in unwanted_attr:
-            if hasattr(inst_tosave, attr):
-                delattr(inst_tosave, attr)
+    if not cached:
+        kept = inst_tosave.to_dict(cached=False)
+        unwanted_attr += [attr for attr in inst_tosave.to_dict() if attr not in kept]
+    for attr in unwanted_attr:
+        if inst_tosave.is_set(attr): # hasattr would compute the derived attribute just to delete it
+            delattr(inst_tosave, attr)
     
     # Save as pickle.
     if filetype == 'pickle':
@@ -32,15 +49,19 @@ def save_instance(
     
     # Save as json.
     elif filetype == 'json':
-        instance_dict = make_json_serializable(inst_tosave.__dict__)
+        instance_dict = make_json_serializable(inst_tosave.to_dict())
         with open(path+filename+'.json', 'w', encoding='utf-8') as f:
             json.dump(instance_dict, f, ensure_ascii=False, indent=4)
 
     # Save as txt.
     elif filetype == 'txt':
-        instance_dict = make_json_serializable(inst_tosave.__dict__)
+        instance_dict = make_json_serializable(inst_tosave.to_dict())
         with open(path+filename+'.txt', 'w') as f:
             json.dump(instance_dict, f)
+    
+    # Add to the metadata index.
+    if index:
+        routing.append_index(path, routing.index_row(instance, filename+'.'+filetype))
             
     return None
 
@@ -0,0 +1,220 @@
+""" A module for saving and loading sharded archives (thousands of instances per file with an offset table)."""
+
+import routing
+import os
+import io
+import re
+import json
+import pickle
+import struct
+import threading
+
+
+SHARD_MAGIC = b'RSHARD01'   # first bytes of a shard
+FOOTER_MAGIC = b'RSHARDIX'  # last bytes of a finalised shard (preceded by the offset table and its length)
+RECORD_HEADER = struct.Struct('<IQ') # length of the instance name and of the instance data
+FOOTER = struct.Struct('<Q8s')      # length of the offset table and FOOTER_MAGIC
+
+# Shard layout:  SHARD_MAGIC | records | offset table (json) | FOOTER
+# Record layout: RECORD_HEADER | name (utf-8) | instance data (pickle)
+# Shards are written to '<name>.shard.tmp' and renamed to '<name>.shard' once the footer is written,
+# so a '.shard' file is always complete. Records of a crashed '.tmp' file can be restored with recover_shard.
+
+
+class shardWriter:
+    """A class to append routing instances to sharded archives (thread-safe)."""
+
+    def __init__(
+        self,
+        path,                # (str)  - directory to save the shards to
+        shard_size=5000,     # (int)  - number of instances per shard
+        prefix='shard',      # (str)  - shard file names (followed by a running number)
+        reduce_size=True,    # (bool) - reduce size by ignoring distance_matrix and more (see save.py)
+        index=True           # (bool) - add the instances to the metadata index of path (see index.py)
+    ):
+        """Initializes a writer which continues after the existing shards of path."""
+        self.path = path
+        self.shard_size = shard_size
+        self.prefix = prefix
+        self.reduce_size = reduce_size
+        self.index = index
+        self.lock = threading.Lock()
+        # Continue after the highest shard number (counting the files would reuse a number after a gap)
+        pattern = re.compile(re.escape(prefix) + r'(\d+)\.shard(\.tmp)?$')
+        numbers = [int(match.group(1)) for match in map(pattern.match, os.listdir(path)) if match]
+        self.shard_count = max(numbers, default=0)
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, instance, name=None):
+        """Appends an instance to the current shard (and finalises the shard once it is full)."""
+        name = name or instance.name
+        data = pickle.dumps(reduced_instance(instance, self.reduce_size), protocol=pickle.HIGHEST_PROTOCOL)
+        name_bytes = name.encode('utf-8')
+        with self.lock:
+            if self.file is None:
+                self.open_shard()
+            self.offsets.append(self.file.tell())
+            self.file.write(RECORD_HEADER.pack(len(name_bytes), len(data)))
+            self.file.write(name_bytes)
+            self.file.write(data)
+            self.names.append(name)
+            self.lengths.append(RECORD_HEADER.size + len(name_bytes) + len(data))
+            if self.index:
+                self.rows.append(routing.index_row(instance, self.filename))
+            if len(self.names) >= self.shard_size:
+                self.finalise_shard()
+        return None
+
+    def close(self):
+        """Finalises the current shard."""
+        with self.lock:
+            if self.file is not None:
+                self.finalise_shard()
+        return None
+
+    def open_shard(self):
+        """Starts a new (temporary) shard."""
+        self.shard_count += 1
+        self.filename = self.prefix+'%05d' % self.shard_count+'.shard'
+        while os.path.exists(self.path+self.filename) or os.path.exists(self.path+self.filename+'.tmp'):
+            self.shard_count += 1 # e.g. written by another writer since this one started
+            self.filename = self.prefix+'%05d' % self.shard_count+'.shard'
+        self.file = open(self.path+self.filename+'.tmp', 'wb')
+        self.file.write(SHARD_MAGIC)
+        self.names, self.offsets, self.lengths, self.rows = [], [], [], []
+
+    def finalise_shard(self):
+        """Writes the offset table and footer, then atomically renames the shard to its final name."""
+        write_footer(self.file, self.names, self.offsets, self.lengths)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        if os.path.exists(self.path+self.filename):
+            self.file = None
+            raise FileExistsError(f'{self.path+self.filename} already exists (the records are kept in its .tmp file, '
+                                  'see recover_shard).')
+        os.replace(self.path+self.filename+'.tmp', self.path+self.filename)
+        for row in self.rows:
+            routing.append_index(self.path, row)
+        self.file = None
+
+
+
+class shardReader:
+    """A class to read routing instances from a finalised shard."""
+
+    def __init__(self, filename):
+        """Reads the offset table of a shard."""
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            if f.read(len(SHARD_MAGIC)) != SHARD_MAGIC:
+                raise ValueError(f'{filename} is not a shard.')
+            f.seek(-FOOTER.size, io.SEEK_END)
+            table_length, magic = FOOTER.unpack(f.read(FOOTER.size))
+            if magic != FOOTER_MAGIC:
+                raise ValueError(f'{filename} was not finalised (see recover_shard).')
+            f.seek(-FOOTER.size - table_length, io.SEEK_END)
+            table = json.loads(f.read(table_length))
+        self.names = table['names']
+        self.offsets = table['offsets']
+        self.lengths = table['lengths']
+        self.positions = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.positions
+
+    def __iter__(self):
+        """Iterates over all instances of the shard (one sequential read)."""
+        with open(self.filename, 'rb') as f:
+            f.seek(self.offsets[0] if self.offsets else 0)
+            for length in self.lengths:
+                yield decode_record(f.read(length))[1]
+
+    def get(self, name):
+        """Loads a single instance by name."""
+        i = self.positions[name]
+        with open(self.filename, 'rb') as f:
+            f.seek(self.offsets[i])
+            return decode_record(f.read(self.lengths[i]))[1]
+
+
+
+def iter_shards(
+    path,                # (str)       - directory of the shards
+    num_instances='all'  # (str/int)   - 'all': all instances, int: how many instances to load
+):  # -> Returns: generator of routing instance objects
+    """Iterates over the instances of all shards in a directory (sorted by shard name)."""
+    loaded = 0
+    for filename in sorted(f for f in os.listdir(path) if f.endswith('.shard')):
+        for instance in shardReader(path+filename):
+            if num_instances != 'all' and loaded >= num_instances:
+                return
+            loaded += 1
+            yield instance
+
+
+def recover_shard(filename):
+    """Finalises a shard left behind as '.tmp' by a crashed writer (keeps all complete records)."""
+    names, offsets, lengths = [], [], []
+    with open(filename, 'r+b') as f:
+        if f.read(len(SHARD_MAGIC)) != SHARD_MAGIC:
+            raise ValueError(f'{filename} is not a shard.')
+        size = os.fstat(f.fileno()).st_size
+        offset = f.tell()
+        while offset + RECORD_HEADER.size <= size:
+            name_length, data_length = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+            length = RECORD_HEADER.size + name_length + data_length
+            if offset + length > size:
+                break
+            names.append(f.read(name_length).decode('utf-8'))
+            f.seek(data_length, io.SEEK_CUR)
+            offsets.append(offset)
+            lengths.append(length)
+            offset += length
+        f.seek(offset)
+        f.truncate()
+        write_footer(f, names, offsets, lengths)
+    final = filename[:-4] if filename.endswith('.tmp') else filename
+    os.replace(filename, final)
+    return final
+
+
+
+################################ HELPER FUNCTIONS ###################################
+
+
+
+def write_footer(f, names, offsets, lengths):
+    """Writes the offset table and footer to the end of a shard."""
+    table = json.dumps({'names': names, 'offsets': offsets, 'lengths': lengths}).encode('utf-8')
+    f.write(table)
+    f.write(FOOTER.pack(len(table), FOOTER_MAGIC))
+
+
+def decode_record(record):
+    """Decodes a record into the instance name and instance."""
+    name_length, data_length = RECORD_HEADER.unpack_from(record)
+    start = RECORD_HEADER.size
+    name = record[start:start+name_length].decode('utf-8')
+    return name, pickle.loads(record[start+name_length:start+name_length+data_length])
+
+
+def reduced_instance(instance, reduce_size):
+    """Returns the instance without the attributes ignored when saving with reduce_size (see save.py)."""
+    if not reduce_size:
+        return instance
+    unwanted_attr = ['distance_matrix', 'solution_distances', 'solution_loads']
+    reduced = object.__new__(type(instance))
+    for k, v in instance.to_dict().items():
+        if k not in unwanted_attr:
+            setattr(reduced, k, v)
+    return reduced
@@ -5,8 +5,6 @@ import numpy as np
 import copy
 import time
 import os
-from ortools.constraint_solver import pywrapcp
-from ortools.constraint_solver import routing_enums_pb2
 
 
 def solve_instance(
@@ -18,6 +16,9 @@ def solve_instance(
     verbose=1                    # (int)    - print solution to console (0=Nothing, 1=solution distance, 2=detailed solution)
 ):  # -> Returns None, but updates the instances solution attributes
     """Finds a solution for a given routing instance (minimizing the total distance)."""
+    from ortools.constraint_solver import pywrapcp # imported at first use (slow import, not needed to generate or load)
+    
+    t = time.perf_counter()
     
     # If distance matrix is not available -> Compute it.
     if not hasattr(instance, 'distance_matrix'):
@@ -112,11 +113,15 @@ def solve_instance(
     search_parameters = pywrapcp.DefaultRoutingSearchParameters()
     search_parameters = set_search_params(search_parameters, first_solution, local_search, time_limit)
     
+    t = routing.metrics.lap('solve.build', t)
+    
     # Solve the problem.
     solution = model.SolveWithParameters(search_parameters)
+    t = routing.metrics.lap('solve.search', t)
     
     # Format the solution and update the instance.
     if solution == None:
+        routing.metrics.count('solve.no_solution')
         if verbose >= 1:
             print('No solution found')
         return instance
@@ -126,6 +131,8 @@ def solve_instance(
         instance.solution_times = format_times(solution, instance.solution_routes, time_dimension, distance_matrix)
     if scaling:
         instance = scale_back_solution(instance)
+    routing.metrics.lap('solve.postprocess', t)
+    routing.metrics.count('solve.solved')
     
     # Print solution and return.
     routing.print_solution(instance, verbose)
@@ -135,7 +142,7 @@ def solve_instance(
 def solve_dataset(
     path_from,      # (str) - path to load instances from
     path_to,        # (str) - path to save instances to
-    filetype,       # (str) - file-type to load (also possible: 'solomon' to solve benchmark)
+    filetype,       # (str) - file-type to load (also possible: 'solomon' to solve benchmark, path_from may be the zip)
     first_solution, # (str) - initial solution strategy (all options below)
     local_search,   # (str) - local search strategy (all options below)
     time_limit_m,   # (int) - time limit multiplier depending on number of customers in instance
@@ -146,7 +153,10 @@ def solve_dataset(
     t0 = time.time()
     solved = 0
     # Loop through files
-    filelist = os.listdir(path_from)
+    if filetype == 'solomon' and path_from.endswith('.zip'):
+        filelist = [name+'.txt' for name in routing.benchmark_names('solomon', path_from)]
+    else:
+        filelist = os.listdir(path_from)
     for f in filelist:
         if num_inst != 'all':
             if solved >= num_inst:
@@ -221,6 +231,7 @@ def scale_instance(instance_toscale, scaling):
     
 def set_search_params(search_parameters, first_solution, local_search, time_limit, log=True):
     """Sets the initial solution strategy, the local search strategy, and the search time."""
+    from ortools.constraint_solver import routing_enums_pb2
     # first solution strategy
     if first_solution == 'PATH_CHEAPEST_ARC':
         search_parameters.first_solution_strategy = (routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC)
@@ -2,8 +2,10 @@
 
 import routing
 import numpy as np
+from .metrics import timed
 
 
+@timed('distance_matrix')
 def compute_distance_matrix(locations, distance_metric='euclidean'):
     """Computes the distance matrix given some locations and a distance metric."""
     if distance_metric == 'euclidean':
@@ -60,10 +62,6 @@ def print_solution(instance, verbose=1): # verbose: (0=Nothing, 1=solution dista
             print(output)
         # cvrp
         elif instance.variant == 'cvrp':
-            if not hasattr(instance, 'distance_matrix'):
-                instance.compute_distance_matrix(instance.variant)
-            instance.solution_distances = get_route_distances(instance.solution_routes, instance.distance_matrix)
-            instance.solution_loads = get_route_loads(instance.solution_routes, instance.demands)
             for vehicle_id in range(len(instance.solution_routes)):
                 output = 'Route for vehicle {0} (distance: {1}, load: {2}):\n'.format(
                     vehicle_id, 
@@ -80,10 +78,6 @@ def print_solution(instance, verbose=1): # verbose: (0=Nothing, 1=solution dista
                     print(output)
         # cvrptw
         elif instance.variant == 'cvrptw':
-            if not hasattr(instance, 'distance_matrix'):
-                instance.compute_distance_matrix(instance.variant)
-            instance.solution_distances = get_route_distances(instance.solution_routes, instance.distance_matrix)
-            instance.solution_loads = get_route_loads(instance.solution_routes, instance.demands)
             for vehicle_id in range(len(instance.solution_routes)):
                 output = 'Route for vehicle {0} (distance={1}, load={2}, time={3}):\n'.format(
                     vehicle_id, 
@@ -0,0 +1,50 @@
+""" Parity tests of exported models against the original estimators (models/export.py)."""
+
+import numpy as np
+import pytest
+import models
+
+sklearn = pytest.importorskip('sklearn')
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.neural_network import MLPRegressor
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import PolynomialFeatures, StandardScaler
+
+
+ESTIMATORS = {
+    'random_forest': lambda: RandomForestRegressor(n_estimators=10, max_depth=6, random_state=0),
+    'gradient_boosting': lambda: GradientBoostingRegressor(n_estimators=20, max_depth=3, random_state=0),
+    'hist_gradient_boosting': lambda: HistGradientBoostingRegressor(max_iter=20, random_state=0),
+    'mlp': lambda: make_pipeline(StandardScaler(), MLPRegressor(hidden_layer_sizes=(16, 8), max_iter=300,
+                                                                random_state=0)),
+    'poly_linear': lambda: make_pipeline(StandardScaler(), PolynomialFeatures(2), LinearRegression()),
+    'poly_ridge': lambda: make_pipeline(PolynomialFeatures(3), Ridge(alpha=1.0)),
+}
+
+
+def training_data(nans=False):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 5))
+    y = X[:, 0] * 3 + X[:, 1] ** 2 - X[:, 2] * X[:, 3] + rng.normal(scale=0.1, size=300)
+    if nans:
+        X[rng.random(X.shape) < 0.1] = np.nan # missing values take the learned default branch
+    return X, y
+
+
+@pytest.mark.filterwarnings('ignore::sklearn.exceptions.ConvergenceWarning')
+@pytest.mark.parametrize('name', list(ESTIMATORS))
+def test_export_parity(tmp_path, name):
+    X, y = training_data()
+    model = ESTIMATORS[name]().fit(X, y)
+    filename = str(tmp_path / 'model.npz')
+    models.export_model(model, filename)
+    assert models.check_parity(model, filename, X)['ok']
+
+
+def test_export_parity_with_nans(tmp_path):
+    X, y = training_data(nans=True)
+    model = HistGradientBoostingRegressor(max_iter=20, random_state=0).fit(X, y)
+    filename = str(tmp_path / 'model.npz')
+    models.export_model(model, filename)
+    assert models.check_parity(model, filename, X)['ok']
@@ -0,0 +1,51 @@
+""" Tests of the streaming dataset pipeline (generation/pipeline.py)."""
+
+import threading
+import pytest
+import routing
+import generation
+
+
+def run_with_timeout(func, timeout=120):
+    """Runs func in a daemon thread and returns its result or exception (fails if it does not return in time)."""
+    outcome = {}
+    def target():
+        try:
+            outcome['result'] = func()
+        except Exception as e:
+            outcome['error'] = e
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), 'the pipeline hangs'
+    return outcome
+
+
+@pytest.mark.parametrize('solved', [False, True])
+def test_failing_generator_raises(tmp_path, monkeypatch, solved):
+    regenerate = generation.regenerate_instance
+    def failing(seed, index, variant='cvrptw', **params):
+        if index == (1 if solved else 3): # solving is slow (GLS), so the solved pipeline fails before the first solve
+            raise RuntimeError('generation failed')
+        return regenerate(seed, index, variant, **params)
+    monkeypatch.setattr(generation, 'regenerate_instance', failing)
+    outcome = run_with_timeout(lambda: generation.generate_dataset_pipeline(
+        str(tmp_path)+'/', 6, variant='cvrptw', verbose=False, solved=solved, seed=0, solve_workers=1,
+        queue_size=1, filetypes=('pickle',)))
+    assert isinstance(outcome.get('error'), RuntimeError)
+
+
+def test_failing_dispatch_raises(tmp_path, monkeypatch):
+    def failing(func):
+        raise RuntimeError('dispatch failed')
+    monkeypatch.setattr(routing.metrics, 'worker_task', failing)
+    outcome = run_with_timeout(lambda: generation.generate_dataset_pipeline(
+        str(tmp_path)+'/', 6, variant='tsp', verbose=False, solved=True, seed=0, solve_workers=1,
+        queue_size=1, filetypes=('pickle',)))
+    assert isinstance(outcome.get('error'), RuntimeError)
+
+
+def test_pipeline_completes(tmp_path):
+    features, stats = generation.generate_dataset_pipeline(
+        str(tmp_path)+'/', 3, variant='cvrptw', verbose=False, solved=False, seed=0, filetypes=('pickle',))
+    assert len(features) == 3
@@ -0,0 +1,36 @@
+""" Tests of the sharded archives (routing/shards.py)."""
+
+import os
+import pytest
+import routing
+import generation
+
+
+def write_shards(path, names, shard_size=2):
+    instance = generation.regenerate_instance(1, 1)
+    with routing.shardWriter(path, shard_size=shard_size, index=False) as writer:
+        for name in names:
+            writer.write(instance, name)
+
+
+def test_writer_continues_after_highest_shard(tmp_path):
+    path = str(tmp_path)+'/'
+    write_shards(path, ['i0', 'i1', 'i2', 'i3', 'i4', 'i5'])
+    os.remove(path+'shard00001.shard') # a gap in the numbering
+    write_shards(path, ['new'])
+    assert routing.shardReader(path+'shard00003.shard').names == ['i4', 'i5']
+    assert routing.shardReader(path+'shard00004.shard').names == ['new']
+
+
+def test_finalise_does_not_replace_existing_shard(tmp_path):
+    path = str(tmp_path)+'/'
+    writer = routing.shardWriter(path, index=False)
+    writer.write(generation.regenerate_instance(1, 1), 'a')
+    other = str(tmp_path / 'other')+'/'
+    os.makedirs(other)
+    write_shards(other, ['b'])
+    os.replace(other+'shard00001.shard', path+'shard00001.shard') # finalised elsewhere under the same name first
+    with pytest.raises(FileExistsError):
+        writer.close()
+    assert routing.shardReader(path+'shard00001.shard').names == ['b']
+    assert os.path.exists(path+'shard00001.shard.tmp')
@@ -0,0 +1,7 @@
+""" Tests of the package startup (benchmarking/startup.py): no entry point imports a heavy dependency it does not need."""
+
+import benchmarking
+
+
+def test_no_unneeded_heavy_imports():
+    assert benchmarking.check_imports(verbose=0) == {}